@@ -0,0 +1,73 @@
+"""Benchmark for the columnar standings engine.
+
+Fills ranking.engine.ColumnarMatches with synthetic matches and times
+compute_standings with NumPy and with the pure Python fallback.
+
+Usage: python -m benchmarks.bench_engine [--matches 10000000] [--teams 500]
+"""
+import argparse
+import random
+import time
+from array import array
+
+from ranking import engine
+
+
+def build_columns(matches: int, teams: int, seed: int = 0) -> engine.ColumnarMatches:
+    columns = engine.ColumnarMatches()
+    for id in range(teams):
+        columns.team_id(f"team {id}")
+
+    np = engine._numpy()
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        for name in ("home_ids", "away_ids", "home_goals", "away_goals"):
+            high = teams if name.endswith("ids") else 6
+            values = rng.integers(0, high, matches, dtype=np.uint32)
+            setattr(columns, name, array("I", values.tobytes()))
+    else:
+        rng = random.Random(seed)
+        for _ in range(matches):
+            columns.home_ids.append(rng.randrange(teams))
+            columns.away_ids.append(rng.randrange(teams))
+            columns.home_goals.append(rng.randrange(6))
+            columns.away_goals.append(rng.randrange(6))
+
+    return columns
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=10_000_000)
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument(
+        "--python-matches",
+        type=int,
+        default=1_000_000,
+        help="Matches for the pure Python fallback, which is much slower.",
+    )
+    args = parser.parse_args()
+
+    if engine._numpy() is not None:
+        columns = build_columns(args.matches, args.teams)
+        elapsed = timed(engine.compute_standings, columns)
+        print(f"numpy   {args.matches:>11,} matches {elapsed:8.3f}s")
+    else:
+        print("numpy   not installed")
+
+    columns = build_columns(args.python_matches, args.teams)
+    rows = zip(
+        columns.home_ids, columns.away_ids, columns.home_goals, columns.away_goals
+    )
+    elapsed = timed(engine.standings_from_rows, columns.teams, rows)
+    print(f"python  {args.python_matches:>11,} matches {elapsed:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark for the memory and time of the exports of the matches.
+
+Writes synthetic matches in a database, then exports them all in every
+format, measuring its time and, in a second run, its peak memory with
+tracemalloc, which stays the same whatever the number of matches. arrow and
+parquet are skipped when pyarrow is not installed.
+
+Usage: python -m benchmarks.bench_export [--matches 1000000] [--teams 500]
+       [--backend binary] [--format csv --format parquet]
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ranking import bench, database, export, ranking
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--backend", choices=database.BACKENDS, default="binary")
+    parser.add_argument("--format", action="append", choices=export.EXPORT_FORMATS)
+    args = parser.parse_args()
+
+    print(f"{'format':<8} {'peak MB':>8} {'file MB':>8} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = Path(directory) / f"ranking{bench.EXTENSIONS[args.backend]}"
+        handler = database.get_database_handler(db_path, args.backend)
+        handler.init_database()
+        handler.append_matches(bench.synthetic_matches(args.matches, args.teams))
+        controller = ranking.RankingController(db_path, cache_size=0)
+
+        for format in args.format or export.EXPORT_FORMATS:
+            if format in export.COLUMNAR_FORMATS and not export.has_pyarrow():
+                print(f"{format:<8} {'skipped, pyarrow is not installed':>26}")
+                continue
+
+            output = Path(directory) / f"matches.{format}"
+            start = time.perf_counter()
+            controller.export_matches(output, format)
+            seconds = time.perf_counter() - start
+            # Timed apart, tracemalloc slows down every allocation
+            tracemalloc.start()
+            controller.export_matches(output, format)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{format:<8} {peak / 2**20:>8.1f} "
+                f"{output.stat().st_size / 2**20:>8.1f} {seconds:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
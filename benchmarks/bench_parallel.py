@@ -0,0 +1,64 @@
+"""Benchmark for the standings calculated by a pool of processes.
+
+Writes synthetic matches in every backend, then times the standings from
+scratch with 1, 2, 4... up to --workers processes, checks that every run
+returns the same standings and prints the speedup over a single process.
+
+Usage: python -m benchmarks.bench_parallel [--matches 2000000] [--teams 500]
+       [--workers 8] [--backend json --backend binary --backend sqlite]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from ranking import bench, database
+
+
+def worker_counts(workers: int):
+    count = 1
+    while count < workers:
+        yield count
+        count *= 2
+    yield workers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=2_000_000)
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backend", action="append", choices=database.BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'workers':>7} {'standings':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backend or database.BACKENDS:
+            db_path = Path(directory) / f"ranking{bench.EXTENSIONS[backend]}"
+            handler = database.get_database_handler(db_path, backend)
+            handler.init_database()
+            handler.append_matches(bench.synthetic_matches(args.matches, args.teams))
+            snapshot_path = database.sidecar_path(db_path, "standings.json")
+
+            single = expected = None
+            for workers in worker_counts(args.workers):
+                # Standings from scratch, not from the snapshot of the JSON log
+                snapshot_path.unlink(missing_ok=True)
+                start = time.perf_counter()
+                table, error = handler.read_standings(workers)
+                seconds = time.perf_counter() - start
+
+                assert not error
+                if expected is None:
+                    single, expected = seconds, table
+                assert table == expected, "Different standings"
+
+                print(
+                    f"{backend:<8} {workers:>7} {seconds:>9.3f}s "
+                    f"{single / seconds:>7.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark for parsing match lines.
+
+Generates synthetic lines like "team 12 3, team 40 1", a few of them
+invalid, and times ranking.parser.parse_many on the whole batch against
+parse_match called line by line, printing the lines parsed per second.
+
+Usage: python -m benchmarks.bench_parser [--lines 2000000] [--teams 500]
+       [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from ranking.parser import parse_many, parse_match
+
+
+def synthetic_lines(lines: int, teams: int, seed: int = 0):
+    rng = random.Random(seed)
+    for id in range(lines):
+        home, away = rng.sample(range(teams), 2)
+        if id % 1000 == 999:
+            yield f"team {home} {rng.randrange(6)}"
+        else:
+            yield f"team {home} {rng.randrange(6)}, team {away} {rng.randrange(6)}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = list(synthetic_lines(args.lines, args.teams))
+    timings = {
+        "parse_many": lambda: parse_many(lines),
+        "parse_match": lambda: [parse_match(line) for line in lines],
+    }
+
+    print(f"{'function':<12} {'seconds':>9} {'lines/s':>12}")
+    for name, function in timings.items():
+        seconds = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            function()
+            seconds = min(seconds, time.perf_counter() - start)
+        print(f"{name:<12} {seconds:>9.3f} {len(lines) / seconds:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark for the memory of the matches loaded from the database.
+
+Writes synthetic matches in a database, then loads them all as the nested
+dicts of read_matches and as the compact records of iter_records, measuring
+the memory of each list with tracemalloc and the time to load it.
+
+Usage: python -m benchmarks.bench_records [--matches 1000000] [--teams 500]
+       [--backend json --backend binary --backend sqlite]
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ranking import bench, database
+
+
+def measure(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    matches = load()
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(matches), size, seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--teams", type=int, default=500)
+    parser.add_argument("--backend", action="append", choices=database.BACKENDS)
+    args = parser.parse_args()
+
+    print(
+        f"{'backend':<8} {'matches as':<10} {'MB':>8} {'bytes/match':>12} {'seconds':>8}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backend or database.BACKENDS:
+            db_path = Path(directory) / f"ranking{bench.EXTENSIONS[backend]}"
+            # Without the read cache, which would keep the dicts alive
+            handler = database.get_database_handler(db_path, backend, cache_size=0)
+            handler.init_database()
+            handler.append_matches(bench.synthetic_matches(args.matches, args.teams))
+
+            loads = {
+                "dicts": lambda: handler.read_matches().matches_list,
+                "records": lambda: list(handler.iter_records()),
+            }
+            for name, load in loads.items():
+                count, size, seconds = measure(load)
+                print(
+                    f"{backend:<8} {name:<10} {size / 2**20:>8.1f} "
+                    f"{size / max(count, 1):>12.0f} {seconds:>8.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
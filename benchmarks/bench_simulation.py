@@ -0,0 +1,56 @@
+"""Benchmark for the Monte Carlo projection of the final table.
+
+Builds the first half of a double round-robin league on synthetic results,
+then simulates the second half with 1 to N worker processes, printing the
+seasons simulated per second.
+
+Usage: python -m benchmarks.bench_simulation [--runs 100000] [--teams 20]
+       [--workers 4] [--tie-breaker goal_difference]
+"""
+import argparse
+import random
+import time
+
+from ranking import simulation
+from ranking.standings import calculate_standings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=100_000)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tie-breaker", action="append", default=[])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    teams = [f"team {id}" for id in range(args.teams)]
+    pairs = [
+        (team_1, team_2) for team_1 in teams for team_2 in teams if team_1 < team_2
+    ]
+    played = [
+        {
+            "team_1": {"name": team_1, "goals": rng.randint(0, 4)},
+            "team_2": {"name": team_2, "goals": rng.randint(0, 3)},
+        }
+        for team_1, team_2 in pairs
+    ]
+    table = calculate_standings(played)
+    fixtures = [simulation.Fixture(team_2, team_1) for team_1, team_2 in pairs]
+    rates = simulation.goal_rates(table, fixtures)
+
+    print(f"{len(fixtures)} fixtures left, {args.runs} seasons")
+    print(f"{'workers':>7} {'seconds':>8} {'seasons/s':>10}")
+    workers = 1
+    while workers <= args.workers:
+        start = time.perf_counter()
+        simulation.simulate(
+            table, fixtures, rates, args.runs, args.tie_breaker, seed=0, workers=workers
+        )
+        seconds = time.perf_counter() - start
+        print(f"{workers:>7} {seconds:>8.3f} {args.runs / seconds:>10,.0f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
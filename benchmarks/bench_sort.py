@@ -0,0 +1,61 @@
+"""Benchmark for ordering the table rank.
+
+Builds synthetic standings with many points ties and times
+ranking.tiebreakers.sort_standings with different tie-breaker chains.
+
+Usage: python -m benchmarks.bench_sort [--teams 1000 10000 100000]
+"""
+import argparse
+import random
+import time
+
+from ranking.records import Match
+from ranking.tiebreakers import sort_standings
+
+
+def build_league(teams: int, seed: int = 0):
+    rng = random.Random(seed)
+    names = [f"team {id}" for id in range(teams)]
+    # Few distinct point totals, so almost every team is tied with others.
+    table = {
+        name: {
+            "points": rng.randrange(30),
+            "won": 0,
+            "drawn": 0,
+            "lost": 0,
+            "goals_for": rng.randrange(60),
+            "goals_against": rng.randrange(60),
+        }
+        for name in names
+    }
+    matches = [
+        Match(rng.choice(names), rng.randrange(5), rng.choice(names), rng.randrange(5))
+        for _ in range(teams * 2)
+    ]
+    return table, matches
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    chains = {
+        "name": (),
+        "goal_difference": ("goal_difference",),
+        "gd+goals+h2h": ("goal_difference", "goals_scored", "head_to_head"),
+        "h2h": ("head_to_head",),
+    }
+
+    print(f"{'teams':>8}  {'tie-breakers':<16} {'seconds':>8}")
+    for teams in args.teams:
+        table, matches = build_league(teams)
+        for label, chain in chains.items():
+            start = time.perf_counter()
+            sort_standings(table, chain, lambda: matches)
+            elapsed = time.perf_counter() - start
+            print(f"{teams:>8}  {label:<16} {elapsed:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
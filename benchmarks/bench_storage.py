@@ -0,0 +1,75 @@
+"""Benchmark for the JSON Lines and binary database formats.
+
+Writes the same synthetic matches in both formats, then compares the size
+per match and the time to compute the standings from scratch, to find the
+matches of a team and to read every match.
+
+Usage: python -m benchmarks.bench_storage [--matches 1000000] [--teams 500]
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from ranking import database
+
+
+def build_matches(matches: int, teams: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(matches):
+        home, away = rng.sample(range(teams), 2)
+        yield {
+            "team_1": {"name": f"team {home}", "goals": rng.randrange(6)},
+            "team_2": {"name": f"team {away}", "goals": rng.randrange(6)},
+        }
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--teams", type=int, default=500)
+    args = parser.parse_args()
+
+    print(
+        f"{'format':<8} {'bytes/match':>11} {'write':>8} {'standings':>10} "
+        f"{'team':>8} {'read all':>9}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for name, file_name in (("json", "ranking.json"), ("binary", "ranking.rkb")):
+            db_path = Path(directory) / file_name
+            handler = database.get_database_handler(db_path)
+            handler.init_database()
+
+            write = timed(
+                handler.append_matches, build_matches(args.matches, args.teams)
+            )
+            # Standings from scratch, not from the snapshot of the JSON log
+            database.sidecar_path(db_path, "standings.json").unlink(missing_ok=True)
+            standings = timed(handler.read_standings)
+            # The matches of a team by scanning, without the JSON team index
+            team = timed(
+                lambda: [
+                    match
+                    for match in handler.iter_matches()
+                    if "team 7" in (match["team_1"]["name"], match["team_2"]["name"])
+                ]
+                if name == "json"
+                else handler.read_team_matches("team 7")
+            )
+            read_all = timed(handler.read_matches)
+
+            print(
+                f"{name:<8} {db_path.stat().st_size / args.matches:>11.1f} "
+                f"{write:>7.3f}s {standings:>9.3f}s {team:>7.3f}s {read_all:>8.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark for concurrent writers.
+
+Starts several processes adding matches one by one to the same Ranking
+database, like many ``ranking add`` running at once, checks that no match
+was lost and reports the adds per second under contention.
+
+Usage: python -m benchmarks.bench_writers [--writers 1 2 4 8] [--matches 200]
+       [--db_path ranking.json]
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+
+from ranking import SUCCESS, database
+from ranking.ranking import RankingController
+
+
+def add_matches(db_path: Path, writer: int, matches: int) -> int:
+    controller = RankingController(db_path)
+    errors = 0
+    for id in range(matches):
+        _, error = controller.add(f"writer {writer} {id % 5}, rivals {id % 3}")
+        errors += error != SUCCESS
+    return errors
+
+
+def run_writers(db_path: Path, writers: int, matches: int) -> float:
+    database.init_database(db_path)
+    start = time.perf_counter()
+    with multiprocessing.Pool(writers) as pool:
+        errors = pool.starmap(
+            add_matches, [(db_path, writer, matches) for writer in range(writers)]
+        )
+    elapsed = time.perf_counter() - start
+
+    stored, _ = RankingController(db_path).get_all_matches()
+    if sum(errors) or len(stored) != writers * matches:
+        raise SystemExit(
+            f"{writers} writers: {sum(errors)} errors, "
+            f"{len(stored)} of {writers * matches} matches stored"
+        )
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--matches", type=int, default=200, help="Per writer.")
+    parser.add_argument(
+        "--db_path",
+        type=Path,
+        help="New database to write, its disk is what is measured. An existing "
+        "file is refused, it would be wiped. Defaults to a temporary directory.",
+    )
+    args = parser.parse_args()
+    if args.db_path is not None and args.db_path.exists():
+        parser.error(f"{args.db_path} already exists, give the path of a new file")
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = args.db_path or Path(directory) / "ranking.json"
+        print(f"{'writers':>8} {'matches':>8} {'seconds':>8} {'adds/s':>9}")
+        for writers in args.writers:
+            elapsed = run_writers(db_path, writers, args.matches)
+            total = writers * args.matches
+            print(f"{writers:>8} {total:>8} {elapsed:>8.3f} {total / elapsed:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
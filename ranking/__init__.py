@@ -13,15 +13,38 @@ __version__ = "1.0"
     MISSING_TEAM_ERROR,
     NO_SCORE_ERROR,
     SAME_TEAM_ERROR,
-) = range(10)
+    TIE_BREAKER_ERROR,
+    DAEMON_ERROR,
+    PARTITION_ERROR,
+    GOAL_MODEL_ERROR,
+    EXPORT_FORMAT_ERROR,
+    EXPORT_DEPENDENCY_ERROR,
+    EXPORT_ERROR,
+    GOALS_ERROR,
+    ENCODING_ERROR,
+) = range(19)
 
 ERRORS = {
     DIR_ERROR: "Config directory error",
     FILE_ERROR: "Config file error",
     DB_READ_ERROR: "Database read error",
     DB_WRITE_ERROR: "Database write error",
+    JSON_ERROR: "Database format error",
     ID_ERROR: "Ranking id error",
     MISSING_TEAM_ERROR: "You must provide two teams",
     NO_SCORE_ERROR: "You must provide the score for both teams",
     SAME_TEAM_ERROR: "Teams should be different, please try again!",
+    TIE_BREAKER_ERROR: "Unknown tie-breaker",
+    DAEMON_ERROR: "Ranking daemon error",
+    PARTITION_ERROR: "Invalid league or season name",
+    GOAL_MODEL_ERROR: "Unknown goal model",
+    EXPORT_FORMAT_ERROR: "Unknown export format",
+    EXPORT_DEPENDENCY_ERROR: "arrow and parquet exports need pyarrow installed",
+    EXPORT_ERROR: "Export file write error",
+    GOALS_ERROR: "A team can't score more than 65535 goals",
+    ENCODING_ERROR: "The line is not valid UTF-8",
+}
+
+ERROR_NAMES = {
+    code: name for name, code in list(globals().items()) if name.endswith("_ERROR")
 }
@@ -1,7 +1,15 @@
-from ranking import cli, __app_name__
+import sys
+
+from ranking import __app_name__, fastpath
 
 
 def main():
+    exit_code = fastpath.main(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from ranking import cli
+
     cli.app(prog_name=__app_name__)
 
 
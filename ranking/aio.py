@@ -0,0 +1,261 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ranking.database import (
+    DBResponse,
+    StandingsResponse,
+    WriteResponse,
+    get_database_handler,
+)
+from ranking.history import Checkpoints
+from ranking.parser import CurrentMatch, parse_match
+from ranking.ranking import CurrentMatches, CurrentRank, RankingController
+from ranking.ratings import Ratings
+
+
+class AsyncDatabaseHandler:
+    """Ranking database for asyncio applications, e.g. a web service.
+
+    The disk work of the backend runs in a single worker thread, so it never
+    blocks the event loop and the reads and writes of the application are
+    done in the order they were requested.
+
+    Concurrent reads of the same kind share a single load: a read requested
+    while another one is in flight waits for it and gets the same response,
+    so its lists and dicts must not be modified. Matches appended while a
+    write is in flight are written together by the next one, with a single
+    append.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        backend: Optional[str] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        """
+        Args:
+            db_path (Path): Path to the Ranking database
+            backend (str, optional): Database backend. Defaults to the one
+            matching the database file extension.
+            executor (ThreadPoolExecutor, optional): Runs the disk work. It
+            must have a single worker to keep the order of the requests.
+            Defaults to a new one, shut down by ``close``.
+        """
+        self._handler = get_database_handler(db_path, backend)
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1)
+        # Read in flight of every kind -> changes requested before it started
+        # and its future
+        self._reads: Dict[Tuple, Tuple[int, asyncio.Future]] = {}
+        # Changes requested so far, a read only joins one that saw them all
+        self._changes = 0
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._writer: Optional[asyncio.Future] = None
+        # Writes done, a batch of appends is a single write
+        self.writes = 0
+
+    async def run(self, function: Callable, *args: Any) -> Any:
+        """Run a blocking function in the worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def read_matches(self) -> DBResponse:
+        return await self._shared_read(("read_matches",), self._handler.read_matches)
+
+    async def read_team_matches(self, team: str) -> DBResponse:
+        return await self._shared_read(
+            ("read_team_matches", team), self._handler.read_team_matches, team
+        )
+
+    async def read_standings(self, workers: int = 1) -> StandingsResponse:
+        return await self._shared_read(
+            ("read_standings",), self._handler.read_standings, workers
+        )
+
+    async def append_match(self, match: Dict[str, Any]) -> DBResponse:
+        """Append a match, in the same write as the matches appended at the
+        same time.
+
+        Args:
+            match (Dict[str, Any]): The new match
+
+        Returns:
+            DBResponse: List with the appended match
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._changes += 1
+        self._pending.append((match, future))
+        if self._writer is None:
+            self._writer = asyncio.ensure_future(self._write_pending())
+
+        return DBResponse([match], await future)
+
+    async def append_matches(self, matches: List[Dict[str, Any]]) -> WriteResponse:
+        self._changes += 1
+        await self.flush()
+        self.writes += 1
+        return await self.run(self._handler.append_matches, matches)
+
+    async def write_matches(self, matches_list: List[Dict[str, Any]]) -> DBResponse:
+        self._changes += 1
+        await self.flush()
+        self.writes += 1
+        return await self.run(self._handler.write_matches, matches_list)
+
+    async def flush(self) -> None:
+        """Wait until every match appended so far is written."""
+        while self._writer is not None:
+            await asyncio.shield(self._writer)
+
+    async def close(self) -> None:
+        """Write the pending matches and stop the worker thread, unless the
+        executor was given."""
+        await self.flush()
+        if self._own_executor:
+            self._executor.shutdown()
+
+    async def _shared_read(
+        self, key: Tuple, function: Callable[..., Any], *args: Any
+    ) -> Any:
+        changes, read = self._reads.get(key, (None, None))
+        if read is None or changes != self._changes:
+            read = asyncio.ensure_future(self._read(key, function, *args))
+            self._reads[key] = (self._changes, read)
+        # A cancelled caller doesn't cancel the read of the others
+        return await asyncio.shield(read)
+
+    async def _read(self, key: Tuple, function: Callable[..., Any], *args: Any) -> Any:
+        try:
+            # Reads see every match appended before them
+            await self.flush()
+            return await self.run(function, *args)
+        finally:
+            if self._reads.get(key, (None, None))[1] is asyncio.current_task():
+                del self._reads[key]
+
+    async def _write_pending(self) -> None:
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                self.writes += 1
+                try:
+                    write = await self.run(
+                        self._handler.append_matches, [match for match, _ in batch]
+                    )
+                except Exception as error:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(write.error)
+        finally:
+            self._writer = None
+
+
+class AsyncRankingController:
+    """RankingController for asyncio applications.
+
+    Returns the same CurrentMatch, CurrentMatches and CurrentRank as
+    RankingController, doing the disk work in the worker thread of an
+    AsyncDatabaseHandler. Adds made at the same time are written together,
+    and table ranks requested at the same time read the standings once.
+
+    Example::
+
+        controller = AsyncRankingController(Path("ranking_db.json"))
+        match, error = await controller.add("Lions 3, Snakes 3")
+        table, error = await controller.show_table_ranking()
+        await controller.close()
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        tie_breakers: Sequence[str] = (),
+        backend: Optional[str] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        """
+        Args:
+            db_path (Path): Path to the Ranking database
+            tie_breakers (Sequence[str], optional): Tie-breakers applied, in
+            order, to teams with the same points. See ranking.tiebreakers.
+            Defaults to ().
+            backend (str, optional): Database backend. Defaults to the one
+            matching the database file extension.
+            executor (ThreadPoolExecutor, optional): Runs the disk work, see
+            AsyncDatabaseHandler. Defaults to a new one.
+        """
+        self._db_handler = AsyncDatabaseHandler(db_path, backend, executor)
+        self._controller = RankingController(db_path, tie_breakers, backend)
+        self._db_path = db_path
+
+    async def __aenter__(self) -> "AsyncRankingController":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def add(self, match: str) -> CurrentMatch:
+        """Adds a new match to the Ranking database, see
+        RankingController.add.
+
+        Args:
+            match (str): Example: Lions 2, Snakes 3
+
+        Returns:
+            CurrentMatch: A match object
+        """
+        match, error = parse_match(match)
+
+        if error:
+            return CurrentMatch(match, error)
+
+        write = await self._db_handler.append_match(match)
+
+        return CurrentMatch(match, write.error)
+
+    async def get_all_matches(self) -> CurrentMatches:
+        read = await self._db_handler.read_matches()
+
+        return CurrentMatches(read.matches_list, read.error)
+
+    async def get_team_matches(self, team: str) -> CurrentMatches:
+        read = await self._db_handler.read_team_matches(team)
+
+        return CurrentMatches(read.matches_list, read.error)
+
+    async def show_table_ranking(self) -> CurrentRank:
+        """Return the table rank for the league, see
+        RankingController.show_table_ranking.
+
+        Returns:
+            CurrentRank: The teams ordered by points in descending order
+        """
+        read = await self._db_handler.read_standings()
+
+        if read.error:
+            return CurrentRank({}, read.error)
+
+        return await self._run(self._controller.rank_standings, read.table)
+
+    async def clean_db(self) -> CurrentMatches:
+        """Removes all matches from the Ranking database."""
+        write = await self._db_handler.write_matches([])
+        await self._run(Checkpoints(self._db_path).clear)
+        await self._run(Ratings(self._db_path).clear)
+
+        return CurrentMatches([], write.error)
+
+    async def close(self) -> None:
+        """Write the pending matches and stop the worker thread."""
+        await self._db_handler.close()
+
+    def _run(self, function: Callable, *args: Any) -> Awaitable[Any]:
+        return self._db_handler.run(function, *args)
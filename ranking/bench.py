@@ -0,0 +1,231 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ranking import __app_name__, __version__, database, engine
+from ranking.ranking import RankingController
+
+# Matches in the synthetic leagues, the bigger ones take minutes
+SIZES = (1_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_SIZES = (1_000, 100_000)
+TEAMS = 500
+# Matches added one by one for the add timing
+ADDS = 100
+# Slowdown allowed against a baseline, 0.25 is 25%
+DEFAULT_THRESHOLD = 0.25
+# Differences smaller than this, in seconds, are noise
+NOISE_FLOOR = 0.001
+
+EXTENSIONS = {
+    database.JSON_BACKEND: ".json",
+    database.SQLITE_BACKEND: ".db",
+    database.BINARY_BACKEND: ".rkb",
+}
+
+
+def synthetic_matches(
+    matches: int, teams: int = TEAMS, seed: int = 0
+) -> Iterator[Dict[str, Any]]:
+    """Generate a reproducible league, the same for the same arguments."""
+    rng = random.Random(seed)
+    for _ in range(matches):
+        home, away = rng.sample(range(teams), 2)
+        yield {
+            "team_1": {"name": f"team {home}", "goals": rng.randrange(6)},
+            "team_2": {"name": f"team {away}", "goals": rng.randrange(6)},
+        }
+
+
+def best_time(
+    function: Callable[[], Any], repeat: int, setup: Optional[Callable] = None
+) -> float:
+    """Return the fastest of ``repeat`` runs, the least disturbed by the
+    rest of the system."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    backend: Optional[str] = None,
+    repeat: int = 3,
+    echo: Callable[[str], None] = print,
+) -> Dict[str, Any]:
+    """Time the hot paths of the application on synthetic leagues.
+
+    Args:
+        sizes (Sequence[int], optional): Matches of every league. Defaults
+        to DEFAULT_SIZES.
+        backend (str, optional): Database backend. Defaults to json.
+        repeat (int, optional): Runs of every timing, the fastest one is
+        kept. Defaults to 3.
+        echo (Callable[[str], None], optional): Prints every timing as soon
+        as it is measured. Defaults to print.
+
+    Returns:
+        Dict[str, Any]: The environment and the seconds of every timing,
+        named like "show_table_ranking@100000".
+    """
+    backend = backend or database.JSON_BACKEND
+    results = {}
+
+    def record(name: str, seconds: float) -> None:
+        results[name] = seconds
+        echo(f"{name:<34} {seconds * 1000:>12.3f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            db_path = Path(directory) / f"league_{size}{EXTENSIONS[backend]}"
+            handler = database.get_database_handler(db_path, backend)
+            handler.init_database()
+            controller = RankingController(db_path, backend=backend)
+            snapshot_path = database.sidecar_path(db_path, "standings.json")
+
+            start = time.perf_counter()
+            handler.append_matches(synthetic_matches(size))
+            record(f"import@{size}", time.perf_counter() - start)
+
+            def add() -> None:
+                for id in range(ADDS):
+                    controller.add(f"team {id % TEAMS} 2, team {(id + 1) % TEAMS} 1")
+
+            record(f"add@{size}", best_time(add, repeat) / ADDS)
+            record(
+                f"show_table_ranking@{size}",
+                best_time(controller.show_table_ranking, repeat),
+            )
+
+            def drop_snapshot() -> None:
+                if snapshot_path.exists():
+                    snapshot_path.unlink()
+
+            record(
+                f"show_table_ranking_cold@{size}",
+                best_time(controller.show_table_ranking, repeat, drop_snapshot),
+            )
+            record(
+                f"get_all_matches@{size}",
+                best_time(controller.get_all_matches, repeat),
+            )
+            record(f"read_matches@{size}", best_time(handler.read_matches, repeat))
+
+            matches_list = handler.read_matches().matches_list
+            record(
+                f"write_matches@{size}",
+                best_time(lambda: handler.write_matches(matches_list), repeat),
+            )
+            del matches_list
+
+            rng = random.Random(size)
+            points = [(f"team {id}", rng.randrange(size)) for id in range(size)]
+            record(
+                f"_sort_ranking@{size}",
+                best_time(lambda: controller._sort_ranking(points), repeat),
+            )
+            del points
+
+            handler = controller = None
+            for path in Path(directory).iterdir():
+                if path.is_file():
+                    path.unlink()
+
+        for args in (["--version"], ["add", "team 1 1, team 2 0"]):
+            startup = _startup_time(args, Path(directory), backend, repeat)
+            if startup is not None:
+                record(f"startup {args[0]}", startup)
+
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": engine._numpy() is not None,
+        "backend": backend,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def _startup_time(
+    args: List[str], directory: Path, backend: str, repeat: int
+) -> Optional[float]:
+    """Time a whole run of the application in a new process, with its own
+    config file and database."""
+    if args[0] == "add" and sys.platform in ("win32", "darwin"):
+        # Only XDG_CONFIG_HOME is used to point the app to another config
+        return None
+
+    db_path = directory / f"startup{EXTENSIONS[backend]}"
+    database.init_database(db_path, backend)
+    config_dir = directory / __app_name__
+    config_dir.mkdir(exist_ok=True)
+    (config_dir / "config.ini").write_text(
+        f"[General]\ndatabase = {db_path}\nbackend = {backend}\n"
+    )
+    # The package is found even when it is not installed
+    package_parent = str(Path(__file__).resolve().parent.parent)
+    python_path = os.pathsep.join(
+        filter(None, [package_parent, os.environ.get("PYTHONPATH")])
+    )
+    env = dict(os.environ, XDG_CONFIG_HOME=str(directory), PYTHONPATH=python_path)
+
+    return best_time(
+        lambda: subprocess.run(
+            [sys.executable, "-m", __app_name__, *args],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        ),
+        repeat,
+    )
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Tuple[str, float, float]]:
+    """Find the timings slower than in a baseline run.
+
+    Args:
+        results (Dict[str, Any]): What ``run`` returned
+        baseline (Dict[str, Any]): What ``run`` returned in a previous run
+        threshold (float, optional): Slowdown allowed, 0.25 is 25%. Defaults
+        to DEFAULT_THRESHOLD.
+
+    Returns:
+        List[Tuple[str, float, float]]: Name, baseline seconds and seconds of
+        every timing slower than allowed.
+    """
+    regressions = []
+    for name, seconds in results["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        if seconds > before * (1 + threshold) and seconds - before > NOISE_FLOOR:
+            regressions.append((name, before, seconds))
+    return regressions
+
+
+def load(path: Path) -> Dict[str, Any]:
+    """Read the results saved by a previous run."""
+    with path.open("r") as file:
+        return json.load(file)
+
+
+def save(results: Dict[str, Any], path: Path) -> None:
+    """Write the results as JSON, to compare them with later runs."""
+    with path.open("w") as file:
+        json.dump(results, file, indent=4)
@@ -0,0 +1,583 @@
+import mmap
+import os
+import struct
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from ranking import DB_READ_ERROR, DB_WRITE_ERROR, JSON_ERROR, SUCCESS
+from ranking import engine
+from ranking.database import (
+    BaseDatabaseHandler,
+    DBResponse,
+    IndexedResponse,
+    StandingsResponse,
+    WriteResponse,
+    lock_database,
+    replace_file,
+)
+from ranking.journal import (
+    ADD_OPERATION,
+    JOURNAL_COMPACT_BYTES,
+    JOURNAL_MAX_BATCH,
+    REPLACE_OPERATION,
+    Journal,
+)
+from ranking.records import Match
+
+MAGIC = b"RKB1"
+# Magic, capacity and used bytes of the team dictionary, number of teams
+HEADER = struct.Struct("<4sIII")
+NAME_LENGTH = struct.Struct("<H")
+# Ids of both teams and their goals
+RECORD = struct.Struct("<IIHH")
+
+# Bytes reserved for team names in a new database, doubled when full
+DICTIONARY_CAPACITY = 4096
+
+
+class BinaryDatabaseFormatError(ValueError):
+    """The file is not a binary Ranking database."""
+
+
+def _encode_names(names: Iterable[str]) -> bytes:
+    return b"".join(
+        NAME_LENGTH.pack(len(encoded)) + encoded
+        for encoded in (name.encode() for name in names)
+    )
+
+
+def _header(teams: List[str], capacity: int) -> bytes:
+    names = _encode_names(teams)
+    while len(names) > capacity:
+        capacity *= 2
+    return (
+        HEADER.pack(MAGIC, capacity, len(names), len(teams))
+        + names
+        + bytes(capacity - len(names))
+    )
+
+
+def _read_header(data) -> Tuple[List[str], int, int]:
+    """Return the team names, the dictionary bytes used and where the
+    records start."""
+    if len(data) < HEADER.size:
+        raise BinaryDatabaseFormatError("File too short")
+
+    magic, capacity, used, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or HEADER.size + capacity > len(data) or used > capacity:
+        raise BinaryDatabaseFormatError("Not a binary Ranking database")
+
+    teams = []
+    position = HEADER.size
+    for _ in range(count):
+        (length,) = NAME_LENGTH.unpack_from(data, position)
+        position += NAME_LENGTH.size
+        teams.append(bytes(data[position : position + length]).decode())
+        position += length
+
+    return teams, used, HEADER.size + capacity
+
+
+def _records_dtype(np):
+    return np.dtype(
+        [
+            ("home_ids", "<u4"),
+            ("away_ids", "<u4"),
+            ("home_goals", "<u2"),
+            ("away_goals", "<u2"),
+        ]
+    )
+
+
+def _shard_standings(task: Tuple[str, int, int]) -> Dict[str, Dict[str, int]]:
+    """Calculate the standings of a range of records. Runs in the workers of
+    parallel.sharded_standings."""
+    path, start, stop = task
+    handler = BinaryDatabaseHandler(Path(path))
+    teams, view = handler._map()
+    return handler._standings(teams, view[start * RECORD.size : stop * RECORD.size])
+
+
+class BinaryDatabaseHandler(BaseDatabaseHandler):
+    """To read and write in a binary Ranking database.
+
+    The file starts with a header holding the team dictionary, the name of
+    every team id, followed by one fixed-width record per match: the ids of
+    both teams as uint32 and their goals as uint16, 12 bytes per match.
+
+    The dictionary has spare room, so new teams are added in place, and the
+    file is only replaced when it is full or when matches are removed. Reads
+    map the file in memory: with NumPy the records are used as columns
+    without copying them, and standings and team filters never build a dict
+    per match.
+
+    Small writes go to a journal next to the database (see ranking.journal)
+    and are folded into it by the next read, by compact, or once the journal
+    grows past JOURNAL_COMPACT_BYTES. A fold that didn't finish is folded
+    again from the journal, so the records and the dictionary are flushed to
+    disk once per fold instead of on every write.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(db_path)
+        self._journal = Journal(db_path)
+
+    def init_database(self) -> int:
+        """Create the Ranking database"""
+        try:
+            with lock_database(self._db_path):
+                replace_file(self._db_path, [_header([], DICTIONARY_CAPACITY)])
+                self._journal.clear()
+            return SUCCESS
+        except OSError:
+            return DB_WRITE_ERROR
+
+    def _map(self) -> Tuple[List[str], memoryview]:
+        """Map the database and return the teams and a view of the records.
+
+        The map is not closed explicitly, views and NumPy arrays may still be
+        using it, it is released with the last of them.
+        """
+        with lock_database(self._db_path, shared=True), self._db_path.open("rb") as db:
+            try:
+                data = mmap.mmap(db.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as error:
+                raise BinaryDatabaseFormatError("Empty file") from error
+
+        teams, _, start = _read_header(data)
+        # A record cut by a crash is ignored, the next write drops it
+        end = start + (len(data) - start) // RECORD.size * RECORD.size
+        return teams, memoryview(data)[start:end]
+
+    def _read_head(self, db) -> bytes:
+        """Read the header and the team dictionary, not the records."""
+        head = db.read(HEADER.size)
+        if len(head) == HEADER.size:
+            _, capacity, _, _ = HEADER.unpack(head)
+            head += db.read(capacity)
+        return head
+
+    def _records(self, view: memoryview):
+        np = engine._numpy()
+        if np is None:
+            return None
+        return np.frombuffer(view, dtype=_records_dtype(np))
+
+    def iter_matches(self) -> Iterator[Dict[str, Any]]:
+        """Stream the matches in the Ranking database one by one.
+
+        Raises:
+            OSError: The database can't be read
+            BinaryDatabaseFormatError: The file is not a binary Ranking database
+
+        Yields:
+            Dict[str, Any]: A match
+        """
+        self._replay()
+        teams, view = self._map()
+        for home, away, home_goals, away_goals in RECORD.iter_unpack(view):
+            yield {
+                "team_1": {"name": teams[home], "goals": home_goals},
+                "team_2": {"name": teams[away], "goals": away_goals},
+            }
+
+    def iter_records(self) -> Iterator[Match]:
+        """Stream the matches as compact records, straight from the mapped
+        records and the names of the header.
+
+        Raises:
+            OSError: The database can't be read
+            BinaryDatabaseFormatError: The file is not a binary Ranking database
+
+        Yields:
+            Match: A match
+        """
+        self._replay()
+        teams, view = self._map()
+        for home, away, home_goals, away_goals in RECORD.iter_unpack(view):
+            yield Match(teams[home], home_goals, teams[away], away_goals)
+
+    def iter_matches_from(self, start: int) -> Iterator[Dict[str, Any]]:
+        """Stream the matches after the first ``start`` ones, jumping to
+        their records.
+
+        Raises:
+            OSError: The database can't be read
+            BinaryDatabaseFormatError: The file is not a binary Ranking database
+
+        Yields:
+            Dict[str, Any]: A match
+        """
+        self._replay()
+        teams, view = self._map()
+        for home, away, home_goals, away_goals in RECORD.iter_unpack(
+            view[start * RECORD.size :]
+        ):
+            yield {
+                "team_1": {"name": teams[home], "goals": home_goals},
+                "team_2": {"name": teams[away], "goals": away_goals},
+            }
+
+    def read_matches(self) -> DBResponse:
+        """Read all the matches in the Ranking database.
+
+        Returns:
+            DBResponse: List of matches
+        """
+        return self._read(lambda teams, view: self.iter_matches())
+
+    def read_indexed_matches(
+        self, team: str, rival: Optional[str] = None
+    ) -> IndexedResponse:
+        """Read the matches played by a team, or between two teams. Only the
+        matching records are converted into matches.
+
+        Args:
+            team (str): Name of the team
+            rival (str, optional): Name of the other team. Defaults to None,
+            every match of ``team``.
+
+        Returns:
+            IndexedResponse: The matches with their ids
+        """
+        return IndexedResponse(
+            *self._read(lambda teams, view: self._filter(teams, view, team, rival))
+        )
+
+    def _read(self, matches) -> DBResponse:
+        try:
+            self._replay()
+            teams, view = self._map()
+            return DBResponse(list(matches(teams, view)), SUCCESS)
+        except BinaryDatabaseFormatError:
+            return DBResponse([], JSON_ERROR)
+        except OSError:
+            return DBResponse([], DB_READ_ERROR)
+
+    def _filter(
+        self, teams: List[str], view: memoryview, team: str, rival: Optional[str] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """The matches of ``team``, or between ``team`` and ``rival``, with
+        their ids, the positions of their records starting at 1."""
+        if team not in teams or (rival is not None and rival not in teams):
+            return
+
+        team_id = teams.index(team)
+        rival_id = None if rival is None else teams.index(rival)
+        records = self._records(view)
+
+        if records is not None:
+            home, away = records["home_ids"], records["away_ids"]
+            if rival_id is None:
+                mask = (home == team_id) | (away == team_id)
+            else:
+                mask = ((home == team_id) & (away == rival_id)) | (
+                    (home == rival_id) & (away == team_id)
+                )
+            rows = zip((mask.nonzero()[0] + 1).tolist(), records[mask].tolist())
+        else:
+            team_ids = {team_id} if rival_id is None else {team_id, rival_id}
+            rows = (
+                (id, row)
+                for id, row in enumerate(RECORD.iter_unpack(view), 1)
+                if (row[0] in team_ids or row[1] in team_ids)
+                and (rival_id is None or {row[0], row[1]} == team_ids)
+            )
+
+        for id, (home, away, home_goals, away_goals) in rows:
+            yield id, {
+                "team_1": {"name": teams[home], "goals": home_goals},
+                "team_2": {"name": teams[away], "goals": away_goals},
+            }
+
+    def append_match(self, match: Dict[str, Any]) -> DBResponse:
+        """Append a single match.
+
+        Args:
+            match (Dict[str, Any]): The new match
+
+        Returns:
+            DBResponse: List with the appended match
+        """
+        return DBResponse([match], self.append_matches([match]).error)
+
+    def append_matches(self, matches: Iterable[Dict[str, Any]]) -> WriteResponse:
+        """Append several matches.
+
+        Up to JOURNAL_MAX_BATCH matches are only appended to the journal,
+        flushed to disk, and folded into the database later. More matches
+        are folded right away, with the journal.
+
+        Args:
+            matches (Iterable[Dict[str, Any]]): The new matches
+
+        Returns:
+            WriteResponse: How many matches were appended
+        """
+        matches = iter(matches)
+        batch = list(islice(matches, JOURNAL_MAX_BATCH + 1))
+        try:
+            with lock_database(self._db_path):
+                if len(batch) > JOURNAL_MAX_BATCH:
+                    count = self._compact(chain(batch, matches))
+                    return WriteResponse(count, SUCCESS)
+                self._journal_operation(ADD_OPERATION, batch)
+        except BinaryDatabaseFormatError:
+            return WriteResponse(0, JSON_ERROR)
+        except (OSError, struct.error):
+            return WriteResponse(0, DB_WRITE_ERROR)
+
+        return WriteResponse(len(batch), SUCCESS)
+
+    def write_matches(self, matches_list: List[Dict[str, Any]]) -> DBResponse:
+        """Replace all the matches, atomically.
+
+        Up to JOURNAL_MAX_BATCH matches, e.g. none to clean the database,
+        are journaled like an append. More matches replace the database.
+
+        Args:
+            matches_list (List[Dict[str, Any]]): List of matches
+
+        Returns:
+            DBResponse: List of matches
+        """
+        try:
+            with lock_database(self._db_path):
+                if len(matches_list) <= JOURNAL_MAX_BATCH:
+                    self._journal_operation(REPLACE_OPERATION, matches_list)
+                    return DBResponse(matches_list, SUCCESS)
+
+                teams: List[str] = []
+                records = self._pack(teams, matches_list)
+                replace_file(
+                    self._db_path, [_header(teams, DICTIONARY_CAPACITY), *records]
+                )
+                self._journal.clear()
+        except BinaryDatabaseFormatError:
+            return DBResponse(matches_list, JSON_ERROR)
+        except (OSError, struct.error):
+            return DBResponse(matches_list, DB_WRITE_ERROR)
+
+        return DBResponse(matches_list, SUCCESS)
+
+    def compact(self) -> int:
+        """Fold the journal into the database and remove it.
+
+        Returns:
+            int: The error code
+        """
+        try:
+            with lock_database(self._db_path):
+                self._compact()
+        except BinaryDatabaseFormatError:
+            return JSON_ERROR
+        except (OSError, struct.error):
+            return DB_WRITE_ERROR
+
+        return SUCCESS
+
+    def _replay(self) -> None:
+        """Fold the journal, left by the last writes or by a crash, before
+        reading the database."""
+        if self._journal.exists():
+            with lock_database(self._db_path):
+                self._compact()
+
+    def _journal_operation(self, operation: str, matches: List[Dict[str, Any]]) -> None:
+        """Journal a write for a caller holding the database lock.
+
+        Raises:
+            BinaryDatabaseFormatError: The file is not a binary Ranking database
+            OSError: The journal can't be written
+            struct.error: A match doesn't fit in a record
+        """
+        # Checked now, a match that can't be folded would stop every read
+        self._pack([], matches)
+
+        with self._db_path.open("rb") as db:
+            teams, _, start = _read_header(self._read_head(db))
+            stat = os.fstat(db.fileno())
+            try:
+                base = self._journal.base()
+            except ValueError as error:
+                raise BinaryDatabaseFormatError("Not a Ranking journal") from error
+            # A journal of a replaced database was folded into it already
+            if base is None or base["ino"] != stat.st_ino:
+                self._journal.start(
+                    {
+                        "ino": stat.st_ino,
+                        "teams": len(teams),
+                        "count": (stat.st_size - start) // RECORD.size,
+                    }
+                )
+
+        self._journal.append(operation, matches)
+        if self._journal.size() > JOURNAL_COMPACT_BYTES:
+            self._compact()
+
+    def _compact(self, extra: Iterable[Dict[str, Any]] = ()) -> int:
+        """Fold the journal and then ``extra`` into the database, for a
+        caller holding the database lock, and remove the journal.
+
+        The journaled matches are folded on top of the database as it was
+        when the journal started: the records and teams added by a previous
+        fold that didn't finish are written again.
+
+        Raises:
+            BinaryDatabaseFormatError: The file is not a binary Ranking
+            database, or the journal doesn't match it
+            OSError: The database can't be written
+            struct.error: A match doesn't fit in a record
+
+        Returns:
+            int: How many matches of ``extra`` were folded
+        """
+        try:
+            state = self._journal.read()
+        except ValueError as error:
+            raise BinaryDatabaseFormatError("Not a Ranking journal") from error
+
+        with self._db_path.open("r+b") as db:
+            teams, _, start = _read_header(self._read_head(db))
+            size = db.seek(0, os.SEEK_END)
+            end = start + (size - start) // RECORD.size * RECORD.size
+
+            journaled = 0
+            if state is not None and state.base["ino"] == os.fstat(db.fileno()).st_ino:
+                count, known_teams = state.base["count"], state.base["teams"]
+                if start + count * RECORD.size > end or known_teams > len(teams):
+                    raise BinaryDatabaseFormatError("The journal is not of this file")
+                del teams[0 if state.replaced else known_teams :]
+                end = start if state.replaced else start + count * RECORD.size
+                journaled = len(state.matches)
+                extra = chain(state.matches, extra)
+            elif state is None and extra == ():
+                return 0
+
+            folded = self._fold(db, teams, start, end, extra)
+
+        self._journal.clear()
+        return folded - journaled
+
+    def _pack(self, teams: List[str], matches: Iterable[Dict[str, Any]]) -> List[bytes]:
+        """Return the records of the matches, adding their new teams to
+        ``teams``."""
+        team_ids = {name: id for id, name in enumerate(teams)}
+        records = []
+        for match in matches:
+            ids = []
+            for side in ("team_1", "team_2"):
+                name = match[side]["name"]
+                if name not in team_ids:
+                    NAME_LENGTH.pack(len(name.encode()))
+                    team_ids[name] = len(teams)
+                    teams.append(name)
+                ids.append(team_ids[name])
+            records.append(
+                RECORD.pack(*ids, match["team_1"]["goals"], match["team_2"]["goals"])
+            )
+        return records
+
+    def _fold(self, db, teams: List[str], start: int, end: int, matches) -> int:
+        """Write the matches after the record ending at ``end``, and their new
+        teams after ``teams`` in the dictionary, and flush the database.
+
+        Readers map the file without holding the lock, so it is only changed
+        in place when the matches are appended to it and their teams fit in
+        the dictionary. Otherwise, when records after ``end`` are dropped or
+        the dictionary is full, a new file, with a bigger dictionary when
+        needed, replaces it and the maps of the old one stay valid.
+
+        Returns:
+            int: How many matches were written
+        """
+        known_teams = len(teams)
+        records = self._pack(teams, matches)
+        used = len(_encode_names(teams[:known_teams]))
+        new_names = _encode_names(teams[known_teams:])
+        capacity = start - HEADER.size
+
+        size = db.seek(0, os.SEEK_END)
+        if used + len(new_names) > capacity or end < size:
+            if used + len(new_names) > capacity:
+                capacity *= 2
+            db.seek(start)
+            replace_file(
+                self._db_path,
+                [_header(teams, capacity), db.read(end - start), *records],
+            )
+            return len(records)
+
+        db.seek(HEADER.size + used)
+        db.write(new_names)
+        db.seek(0)
+        db.write(HEADER.pack(MAGIC, capacity, used + len(new_names), len(teams)))
+        db.seek(end)
+        db.write(b"".join(records))
+        db.flush()
+        os.fsync(db.fileno())
+        return len(records)
+
+    def _standings(
+        self, teams: List[str], view: memoryview
+    ) -> Dict[str, Dict[str, int]]:
+        records = self._records(view)
+        if records is not None:
+            return engine.standings_from_columns(
+                teams,
+                records["home_ids"],
+                records["away_ids"],
+                records["home_goals"],
+                records["away_goals"],
+            )
+
+        return engine.standings_from_rows(teams, RECORD.iter_unpack(view))
+
+    def read_standings(self, workers: int = 1) -> StandingsResponse:
+        """Read the standings of every team by scanning the mapped records,
+        as NumPy columns when it is installed.
+
+        With several workers the records are split into shards of at least
+        parallel.MIN_SHARD_MATCHES, every worker maps the file and scans its
+        own shard.
+
+        Args:
+            workers (int, optional): Processes scanning the records.
+            Defaults to 1.
+
+        Returns:
+            StandingsResponse: Teams with their aggregates
+        """
+        try:
+            self._replay()
+            # Held until the workers are done, so the file is not replaced
+            with lock_database(self._db_path, shared=True):
+                teams, view = self._map()
+                shards = [(0, len(view) // RECORD.size)]
+                if workers > 1:
+                    from ranking import parallel
+
+                    shards = parallel.split(
+                        *shards[0], workers, parallel.MIN_SHARD_MATCHES
+                    )
+                if len(shards) > 1:
+                    tasks = [
+                        (str(self._db_path), start, stop) for start, stop in shards
+                    ]
+                    table = parallel.sharded_standings(_shard_standings, tasks, workers)
+                else:
+                    table = self._standings(teams, view)
+        except BinaryDatabaseFormatError:
+            return StandingsResponse({}, JSON_ERROR)
+        except OSError:
+            return StandingsResponse({}, DB_READ_ERROR)
+
+        # Teams saved by a write interrupted before its matches
+        return StandingsResponse(
+            {
+                team: stats
+                for team, stats in table.items()
+                if stats["won"] or stats["drawn"] or stats["lost"]
+            },
+            SUCCESS,
+        )
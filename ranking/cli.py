@@ -1,10 +1,59 @@
+import json
+import time
 import typer
-from typing import Dict, List, Optional, Any
+from itertools import chain, islice
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Any,
+    Sequence,
+    Tuple,
+)
 from pathlib import Path
-from ranking import __app_name__, __version__, ERRORS, config, database, ranking
+from ranking import (
+    __app_name__,
+    __version__,
+    DB_READ_ERROR,
+    FILE_ERROR,
+    JSON_ERROR,
+    PARTITION_ERROR,
+    SUCCESS,
+    ERROR_NAMES,
+    ERRORS,
+    client,
+    config,
+    database,
+    fastpath,
+    profiling,
+    ranking,
+)
+from ranking.parser import normalize_name
+from ranking.records import Match
+from ranking.standings import calculate_standings
 
 app = typer.Typer()
 
+# Lines printed with a single write
+OUTPUT_CHUNK_SIZE = 1000
+# Matches used to fit the columns of the all_matches table
+TABLE_WIDTH_ROWS = 1000
+
+# Matches of a league and season are kept apart, see database.partition_path
+LEAGUE_OPTION = typer.Option(
+    None, "--league", "-L", help="League of the matches, e.g. premier."
+)
+SEASON_OPTION = typer.Option(
+    None, "--season", "-S", help="Season of the matches, e.g. 2026."
+)
+
+PROFILE_TEXT_FORMAT = "text"
+PROFILE_JSON_FORMAT = "json"
+PROFILE_FORMATS = (PROFILE_TEXT_FORMAT, PROFILE_JSON_FORMAT)
+
 
 @app.command()
 def init(
@@ -14,9 +63,17 @@ def init(
         "-db",
         prompt="Ranking database location?",
     ),
+    backend: Optional[str] = typer.Option(
+        None,
+        "--backend",
+        "-b",
+        help="Database backend, json, sqlite or binary. Defaults to sqlite "
+        "for .db, .sqlite and .sqlite3 files, binary for .rkb files and json "
+        "otherwise.",
+    ),
 ) -> None:
     """Initialize the Ranking database"""
-    app_init_error = config.init_app(db_path)
+    app_init_error = config.init_app(db_path, backend)
     if app_init_error:
         typer.secho(
             f"Creating config file failed with '{ERRORS[app_init_error]}'",
@@ -24,7 +81,7 @@ def init(
         )
         raise typer.Exit(1)
 
-    db_init_error = database.init_database(Path(db_path))
+    db_init_error = database.init_database(Path(db_path), backend)
     if db_init_error:
         typer.secho(
             f"Creating database failed with '{ERRORS[db_init_error]}'",
@@ -36,43 +93,363 @@ def init(
 
 
 @app.command(name="add")
-def add(match: str = typer.Argument(...)) -> None:
+def add(
+    match: str = typer.Argument(...),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
     """**add** command -> Add a new match into Ranking database
 
     Args:
         match (str, optional): Receives an string with the name of
         the two teams with their goals. Defaults to typer.Argument(...).
+        league (str, optional): League of the match. Defaults to None.
+        season (str, optional): Season of the match. Defaults to None.
 
     Raises:
         typer.Exit: 1
     """
-    ranking_controller = get_rankin_controller()
-    match_added, error = ranking_controller.add(match)
+    exit_code = fastpath.add(match, typer.secho, league, season)
+    if exit_code:
+        raise typer.Exit(exit_code)
+
+
+@app.command(name="import")
+def import_matches(
+    file: typer.FileBinaryRead = typer.Argument(
+        ..., help="UTF-8 file with one match per line, '-' for stdin."
+    ),
+    format: Optional[str] = typer.Option(
+        None,
+        "--format",
+        "-f",
+        help="text ('Lions 3, Snakes 3'), csv or jsonl. Defaults to the file "
+        "extension, or text.",
+    ),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """**import** command -> Add all the matches of a file into Ranking database
+    with a single write. Invalid lines are reported and skipped, the file is
+    read completely before the database is written.
+
+    Raises:
+        typer.Exit: 1
+    """
+    if format is None:
+        # Files without a known extension, and stdin, are read as text. Some
+        # binary streams of stdin have no name.
+        format = Path(getattr(file, "name", "")).suffix.lstrip(".").lower()
+        if format not in ranking.IMPORT_FORMATS:
+            format = ranking.TEXT_FORMAT
+    elif format not in ranking.IMPORT_FORMATS:
+        typer.secho(
+            f"Unknown format '{format}', use {', '.join(ranking.IMPORT_FORMATS)}",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    ranking_controller = get_rankin_controller(
+        league=league, season=season, create=True
+    )
+    start = time.perf_counter()
+    imported, errors, error = ranking_controller.import_matches(file, format)
+    elapsed = time.perf_counter() - start
+
+    for line_number, line, line_error in errors:
+        typer.secho(
+            f"Line {line_number}: {ERROR_NAMES[line_error]} '{line}'",
+            fg=typer.colors.RED,
+            err=True,
+        )
 
     if error:
         typer.secho(
-            f"Adding match '{match_added}' failed with error: '{ERRORS[error]}'",
+            f"Importing matches failed with error: '{ERRORS[error]}'",
             fg=typer.colors.RED,
         )
         raise typer.Exit(1)
-    else:
-        typer.secho("Match was added succesfully", fg=typer.colors.GREEN)
+
+    typer.secho(
+        f"{imported} matches imported, {len(errors)} lines rejected in "
+        f"{elapsed:.3f}s ({(imported + len(errors)) / max(elapsed, 1e-9):,.0f} "
+        "lines/s)",
+        fg=typer.colors.GREEN,
+    )
 
 
 @app.command(name="all_matches")
-def show_all_matches() -> None:
+def show_all_matches(
+    limit: Optional[int] = typer.Option(
+        None, "--limit", "-l", min=0, help="Show at most this many matches."
+    ),
+    offset: int = typer.Option(
+        0, "--offset", "-o", min=0, help="Skip this many matches first."
+    ),
+    team: Optional[str] = typer.Option(
+        None, "--team", "-t", help="Only the matches played by this team."
+    ),
+    format: str = typer.Option(
+        ranking.TABLE_FORMAT,
+        "--format",
+        "-f",
+        help="table, csv or jsonl. csv and jsonl can be imported back.",
+    ),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
     """**all_matches** command -> Show all the matches registered in the Ranking database
 
+    Matches are streamed from the database, so any number of them can be
+    listed without loading them in memory.
+
+    Raises:
+        typer.Exit: 1
+    """
+    if format not in ranking.OUTPUT_FORMATS:
+        typer.secho(
+            f"Unknown format '{format}', use {', '.join(ranking.OUTPUT_FORMATS)}",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    ranking_controller = get_rankin_controller(league=league, season=season)
+    matches = ranking_controller.iter_matches(team, offset, limit)
+
+    try:
+        if format == ranking.CSV_FORMAT:
+            write_lines(_csv_lines(matches))
+        elif format == ranking.JSONL_FORMAT:
+            encode = json.JSONEncoder(separators=(",", ":")).encode
+            write_lines(encode(match.to_dict()) + "\n" for _, match in matches)
+        else:
+            _show_matches_table(matches)
+    except ValueError:
+        error = JSON_ERROR
+    except BrokenPipeError:
+        raise
+    except OSError:
+        error = DB_READ_ERROR
+    else:
+        return
+
+    typer.secho(
+        f"Getting all matches failed with error: '{ERRORS[error]}'",
+        fg=typer.colors.RED,
+    )
+    raise typer.Exit(1)
+
+
+@profiling.timed("render")
+def write_lines(lines: Iterable[str], **style: Any) -> None:
+    """Print lines in chunks of OUTPUT_CHUNK_SIZE, with a single write and
+    style per chunk instead of one per line.
+
+    Args:
+        lines (Iterable[str]): The lines, ending with a newline
+        style (Any): Arguments of ``typer.style``, e.g. fg=typer.colors.BLUE
+
+    Lines produced while streaming the database, like those of all_matches,
+    are timed as rendering together with the reads behind them.
+    """
+    lines = iter(lines)
+    while True:
+        chunk = "".join(islice(lines, OUTPUT_CHUNK_SIZE))
+        if not chunk:
+            return
+        typer.echo(typer.style(chunk, **style) if style else chunk, nl=False)
+
+
+def _csv_lines(matches: Iterable[Tuple[int, Match]]) -> Iterator[str]:
+    import csv
+    import io
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(ranking.CSV_HEADER)
+    for _, match in matches:
+        writer.writerow(match)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _show_matches_table(
+    matches: Iterable[Tuple[int, Match]],
+    title: str = "Matches list",
+    empty_message: str = "There are no matches in the Ranking database yet",
+) -> None:
+    rows = (
+        (
+            str(id),
+            match.team_1,
+            match.team_2,
+            f"{match.goals_1} - {match.goals_2}",
+        )
+        for id, match in matches
+    )
+    # Columns fit the first rows, so the table is printed while streaming.
+    # Longer names further down just stretch their own row.
+    first_rows = list(islice(rows, TABLE_WIDTH_ROWS))
+
+    if not first_rows:
+        typer.secho(empty_message, fg=typer.colors.YELLOW)
+        raise typer.Exit()
+
+    header = ("ID", "Team 1", "Team 2", "Score")
+    widths = [
+        max(len(value) for value in column) for column in zip(header, *first_rows)
+    ]
+
+    def line(row: Sequence[str]) -> str:
+        *cells, score = row
+        return (
+            " | ".join(cell.ljust(width) for cell, width in zip(cells, widths))
+            + f" | {score}\n"
+        )
+
+    style = {"fg": typer.colors.BLUE, "bold": True}
+    headers = line(header)
+    write_lines(
+        [f"\n{title}:\n\n", headers, "-" * len(headers.rstrip()) + "\n"], **style
+    )
+    write_lines(map(line, chain(first_rows, rows)), **style)
+    write_lines(["-" * len(headers.rstrip()) + "\n\n"], **style)
+
+
+@app.command(name="team")
+def show_team(
+    name: str = typer.Argument(...),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Show the matches played by a team and its record. Only the matches
+    of the team are read, through the team index.
+
     Raises:
-        typer.Exit: _description_
-        typer.Exit: _description_
+        typer.Exit: 1
     """
-    ranking_controller = get_rankin_controller()
-    matches_list, error = ranking_controller.get_all_matches()
+    matches_list, error = get_rankin_controller(
+        league=league, season=season
+    ).get_team_matches(name)
 
     if error:
         typer.secho(
-            f"Getting all matches failed with error: '{ERRORS[error]}'",
+            f"Getting the matches of '{name}' failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    name = normalize_name(name)
+    _show_matches_table(
+        ((id, Match.from_dict(match)) for id, match in matches_list),
+        f"Matches of {name}",
+        f"'{name}' has not played any match yet",
+    )
+
+    stats = calculate_standings(match for _, match in matches_list)[name]
+    typer.secho(
+        f"{stats['won'] + stats['drawn'] + stats['lost']} played, "
+        f"{stats['won']} won, {stats['drawn']} drawn, {stats['lost']} lost, "
+        f"{stats['goals_for']} goals for, {stats['goals_against']} against, "
+        f"{stats['points']} points\n",
+        fg=typer.colors.BLUE,
+        bold=True,
+    )
+
+
+@app.command(name="h2h")
+def show_head_to_head(
+    team: str = typer.Argument(...),
+    rival: str = typer.Argument(...),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Show the matches played between two teams. Only the matches of the
+    team with fewer matches are read, through the team index.
+
+    Raises:
+        typer.Exit: 1
+    """
+    matches_list, error = get_rankin_controller(
+        league=league, season=season
+    ).get_head_to_head(team, rival)
+
+    if error:
+        typer.secho(
+            f"Getting the matches between '{team}' and '{rival}' failed with "
+            f"error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    team, rival = normalize_name(team), normalize_name(rival)
+    _show_matches_table(
+        ((id, Match.from_dict(match)) for id, match in matches_list),
+        f"{team} vs {rival}",
+        f"'{team}' and '{rival}' have not played each other yet",
+    )
+
+    table = calculate_standings(match for _, match in matches_list)
+    typer.secho(
+        f"{team} {table[team]['won']} won, {rival} {table[rival]['won']} won, "
+        f"{table[team]['drawn']} drawn\n",
+        fg=typer.colors.BLUE,
+        bold=True,
+    )
+
+
+@app.command(name="table_rank")
+def show_ranking(
+    tie_breakers: List[str] = typer.Option(
+        [],
+        "--tie-breaker",
+        "-t",
+        help="Break points ties with goal_difference, goals_scored or "
+        "head_to_head. Can be repeated, teams still tied are ordered by name.",
+    ),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+    as_of: Optional[int] = typer.Option(
+        None,
+        "--as-of",
+        "-a",
+        min=0,
+        help="Only count the matches up to this id, as shown by all_matches.",
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        "-w",
+        min=1,
+        help="Processes reading the matches in parallel, when the standings "
+        "have to be calculated from many of them.",
+    ),
+) -> None:
+    """Show the table rank. With --league or --season only the matches of
+    that league and season are read.
+
+    Raises:
+        typer.Exit: 1
+    """
+    if as_of is None:
+        matches_list, error = forward_or_run(
+            "table_rank",
+            lambda: get_rankin_controller(
+                tie_breakers, league, season
+            ).show_table_ranking(workers),
+            forward=league is None and season is None,
+            tie_breakers=tie_breakers,
+        )
+    else:
+        matches_list, error = get_rankin_controller(
+            tie_breakers, league, season
+        ).show_table_ranking_as_of(as_of)
+
+    if error:
+        typer.secho(
+            f"Getting table rank failed with error: '{ERRORS[error]}'",
             fg=typer.colors.RED,
         )
         raise typer.Exit(1)
@@ -83,69 +460,598 @@ def show_all_matches() -> None:
         )
         raise typer.Exit()
 
-    typer.secho("\nMatches list:\n", fg=typer.colors.BLUE, bold=True)
-    columns = ("ID.  ", "| Team 1      ", "| Team 2      ", "| Score ")
-    headers = "".join(columns)
-    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-    typer.secho("-" * len(headers), fg=typer.colors.BLUE, bold=True)
+    _show_ranking_table(matches_list)
+
+
+def _show_ranking_table(table_rank: Dict[str, int], title: str = "Standings") -> None:
+    with profiling.phase("render"):
+        typer.secho(f"\n{title}:\n", fg=typer.colors.BLUE, bold=True)
+        columns = ("ID.  ", "| Team        ", "| Points  ")
+        headers = "".join(columns)
+        typer.secho(headers, fg=typer.colors.BLUE, bold=True)
+        typer.secho("-" * len(headers), fg=typer.colors.BLUE, bold=True)
+
+        for id, match in enumerate(table_rank.items(), 1):
+            typer.secho(
+                f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
+                f"| {match[0]}{(len(columns[1]) - len(str(match[0])) - 2 ) * ' '}"
+                f"| {match[1]}",
+                fg=typer.colors.BLUE,
+                bold=True,
+            )
+
+        typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE, bold=True)
+
+
+@app.command(name="history")
+def show_history(
+    team: str = typer.Argument(...),
+    tie_breakers: List[str] = typer.Option(
+        [],
+        "--tie-breaker",
+        "-t",
+        help="Break points ties with goal_difference or goals_scored, like "
+        "table_rank.",
+    ),
+    format: str = typer.Option(
+        ranking.TABLE_FORMAT, "--format", "-f", help="table, csv or jsonl."
+    ),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Show the rank and points of a team after every match that changed
+    them, to chart its trajectory. The matches are read once.
 
-    for id, match in enumerate(matches_list, 1):
-        team_1, team_2 = match.values()
+    Raises:
+        typer.Exit: 1
+    """
+    if format not in ranking.OUTPUT_FORMATS:
         typer.secho(
-            f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-            f"| {team_1['name']}{(len(columns[1]) - len(str(team_1['name'])) - 2 ) * ' '}"
-            f"| {team_2['name']}{(len(columns[2]) - len(str(team_2['name'])) - 2 ) * ' '}"
-            f"| {team_1['goals']} - {team_2['goals']}",
-            fg=typer.colors.BLUE,
-            bold=True,
+            f"Unknown format '{format}', use {', '.join(ranking.OUTPUT_FORMATS)}",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    history, error = get_rankin_controller(
+        tie_breakers, league, season
+    ).get_rank_history(team)
+
+    if error:
+        typer.secho(
+            f"Getting the history of '{team}' failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
         )
+        raise typer.Exit(1)
+
+    if not history:
+        typer.secho(f"'{team}' has not played any match yet", fg=typer.colors.YELLOW)
+        raise typer.Exit()
 
-    typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE, bold=True)
+    if format == ranking.CSV_FORMAT:
+        write_lines(
+            chain(
+                ["match,rank,points\n"],
+                (f"{point.match},{point.rank},{point.points}\n" for point in history),
+            )
+        )
+    elif format == ranking.JSONL_FORMAT:
+        write_lines(json.dumps(point._asdict()) + "\n" for point in history)
+    else:
+        style = {"fg": typer.colors.BLUE, "bold": True}
+        write_lines(
+            chain(
+                [f"\nHistory of {team}:\n\n", "Match    | Rank  | Points\n"],
+                (
+                    f"{point.match:<8} | {point.rank:<5} | {point.points}\n"
+                    for point in history
+                ),
+                ["\n"],
+            ),
+            **style,
+        )
 
 
-@app.command(name="table_rank")
-def show_ranking() -> None:
-    """Show the table rank
+@app.command(name="tables")
+def show_all_rankings(
+    tie_breakers: List[str] = typer.Option(
+        [],
+        "--tie-breaker",
+        "-t",
+        help="Break points ties like table_rank, in every table.",
+    ),
+    workers: Optional[int] = typer.Option(
+        None,
+        "--workers",
+        "-w",
+        min=1,
+        help="Processes ranking the leagues in parallel. Defaults to one per CPU.",
+    ),
+) -> None:
+    """Show the table rank of the main database and of every league and
+    season, calculated in parallel by a pool of processes.
 
     Raises:
         typer.Exit: 1
     """
-    ranking_controller = get_rankin_controller()
-    matches_list, error = ranking_controller.show_table_ranking()
+    db_path, backend, message = fastpath.find_database()
+    if message:
+        typer.secho(message, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    shown = 0
+    failed = False
+    for partition, (table_rank, error) in ranking.rank_partitions(
+        db_path, tie_breakers, backend, workers
+    ):
+        name = _partition_name(partition.league, partition.season)
+        if error:
+            typer.secho(
+                f"Getting the table rank of {name} failed with error: "
+                f"'{ERRORS[error]}'",
+                fg=typer.colors.RED,
+            )
+            failed = True
+        elif table_rank:
+            _show_ranking_table(table_rank, f"Standings of {name}")
+            shown += 1
+
+    if failed:
+        raise typer.Exit(1)
+
+    if not shown:
+        typer.secho(
+            "There are no matches in the Ranking database yet", fg=typer.colors.YELLOW
+        )
+
+
+@app.command(name="ratings")
+def show_ratings(
+    k_factor: Optional[float] = typer.Option(
+        None, "--k-factor", "-k", help="Rating points at stake in every match."
+    ),
+    home_advantage: Optional[float] = typer.Option(
+        None, "--home-advantage", help="Rating points added to the first team."
+    ),
+    goal_difference: Optional[bool] = typer.Option(
+        None,
+        "--goal-difference/--no-goal-difference",
+        help="Weigh every match by its goal difference.",
+    ),
+    recalibrate: bool = typer.Option(
+        False, "--recalibrate", help="Rate all the matches again."
+    ),
+    format: str = typer.Option(
+        ranking.TABLE_FORMAT, "--format", "-f", help="table, csv or jsonl."
+    ),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Show the Elo rating of every team. Settings not given are read from
+    the [Ratings] section of the config file.
+
+    The ratings are saved next to the database and updated by every add, so
+    only the matches added since the last time are rated.
+
+    Raises:
+        typer.Exit: 1
+    """
+    from ranking.ratings import get_rating_settings
+
+    if format not in ranking.OUTPUT_FORMATS:
+        typer.secho(
+            f"Unknown format '{format}', use {', '.join(ranking.OUTPUT_FORMATS)}",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    try:
+        settings = get_rating_settings(config.CONFIG_FILE_PATH)
+    except ValueError:
+        typer.secho(
+            f"Reading the [Ratings] settings failed with error: "
+            f"'{ERRORS[FILE_ERROR]}'",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    overrides = {
+        "k_factor": k_factor,
+        "home_advantage": home_advantage,
+        "goal_difference": goal_difference,
+    }
+    settings = settings._replace(
+        **{name: value for name, value in overrides.items() if value is not None}
+    )
+
+    ratings, error = get_rankin_controller(league=league, season=season).get_ratings(
+        settings, recalibrate
+    )
 
     if error:
-        typer.secho(f"Getting table rank failed", fg=typer.colors.RED)
+        typer.secho(
+            f"Calculating the ratings failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+        )
         raise typer.Exit(1)
 
-    if len(matches_list) == 0:
+    if not ratings:
         typer.secho(
             "There are no matches in the Ranking database yet", fg=typer.colors.YELLOW
         )
         raise typer.Exit()
 
-    typer.secho("\nStandings:\n", fg=typer.colors.BLUE, bold=True)
-    columns = ("ID.  ", "| Team        ", "| Points  ")
-    headers = "".join(columns)
-    typer.secho(headers, fg=typer.colors.BLUE, bold=True)
-    typer.secho("-" * len(headers), fg=typer.colors.BLUE, bold=True)
+    rows = enumerate(ratings.items(), 1)
+    if format == ranking.CSV_FORMAT:
+        write_lines(
+            chain(
+                ["rank,team,rating\n"],
+                (f"{rank},{team},{rating:.1f}\n" for rank, (team, rating) in rows),
+            )
+        )
+    elif format == ranking.JSONL_FORMAT:
+        write_lines(
+            json.dumps({"rank": rank, "team": team, "rating": rating}) + "\n"
+            for rank, (team, rating) in rows
+        )
+    else:
+        width = max(len("Team"), *map(len, ratings))
+        write_lines(
+            chain(
+                ["\nRatings:\n\n", f"Rank  | {'Team'.ljust(width)} | Rating\n"],
+                (
+                    f"{rank:<5} | {team.ljust(width)} | {rating:.1f}\n"
+                    for rank, (team, rating) in rows
+                ),
+                ["\n"],
+            ),
+            fg=typer.colors.BLUE,
+            bold=True,
+        )
+
 
-    for id, match in enumerate(matches_list.items(), 1):
+@app.command(name="simulate")
+def simulate(
+    fixtures: typer.FileText = typer.Argument(
+        ...,
+        help="File with the matches left to play, one per line as "
+        "'Lions, Snakes', '-' for stdin.",
+    ),
+    runs: Optional[int] = typer.Option(
+        None, "--runs", "-r", min=1, help="Seasons simulated, 10,000 by default."
+    ),
+    model: str = typer.Option(
+        "poisson",
+        "--model",
+        "-m",
+        help="Goals of every team: poisson (from its goals scored and "
+        "conceded) or average (the league average).",
+    ),
+    relegation: int = typer.Option(
+        3, "--relegation", min=0, help="Places relegated at the bottom."
+    ),
+    seed: Optional[int] = typer.Option(
+        None, "--seed", help="Seed of the simulation, to repeat it."
+    ),
+    workers: int = typer.Option(
+        1, "--workers", "-w", min=1, help="Processes simulating the seasons."
+    ),
+    tie_breakers: List[str] = typer.Option(
+        [],
+        "--tie-breaker",
+        "-t",
+        help="Break points ties like table_rank, in every final table.",
+    ),
+    format: str = typer.Option(
+        ranking.TABLE_FORMAT, "--format", "-f", help="table, csv or jsonl."
+    ),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Project the final table: play the matches left many times, from the
+    table now, and show the chances of every team to win the title and to be
+    relegated. csv and jsonl show the chances of every position.
+
+    Raises:
+        typer.Exit: 1
+    """
+    from ranking.simulation import parse_fixtures
+
+    if format not in ranking.OUTPUT_FORMATS:
         typer.secho(
-            f"{id}{(len(columns[0]) - len(str(id))) * ' '}"
-            f"| {match[0]}{(len(columns[1]) - len(str(match[0])) - 2 ) * ' '}"
-            f"| {match[1]}",
+            f"Unknown format '{format}', use {', '.join(ranking.OUTPUT_FORMATS)}",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    parsed, errors = parse_fixtures(fixtures)
+    for line_number, line, line_error in errors:
+        typer.secho(
+            f"Line {line_number}: {ERROR_NAMES[line_error]} '{line}'",
+            fg=typer.colors.RED,
+            err=True,
+        )
+    if errors:
+        raise typer.Exit(1)
+
+    projections, error = get_rankin_controller(tie_breakers, league, season).simulate(
+        parsed, runs, model, seed, workers
+    )
+
+    if error:
+        typer.secho(
+            f"Simulating the season failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    if not projections:
+        typer.secho(
+            "There are no teams in the Ranking database nor in the fixtures",
+            fg=typer.colors.YELLOW,
+        )
+        raise typer.Exit()
+
+    def relegated(positions: List[float]) -> float:
+        return sum(positions[len(positions) - relegation :]) if relegation else 0.0
+
+    if format == ranking.CSV_FORMAT:
+        places = ",".join(
+            f"position_{place}" for place in range(1, len(projections) + 1)
+        )
+        write_lines(
+            chain(
+                [f"team,points,title,relegation,{places}\n"],
+                (
+                    f"{team},{points:.2f},{positions[0]:.4f},"
+                    f"{relegated(positions):.4f},"
+                    + ",".join(f"{chance:.4f}" for chance in positions)
+                    + "\n"
+                    for team, points, positions in projections
+                ),
+            )
+        )
+    elif format == ranking.JSONL_FORMAT:
+        write_lines(
+            json.dumps(
+                {
+                    "team": team,
+                    "points": points,
+                    "title": positions[0],
+                    "relegation": relegated(positions),
+                    "positions": positions,
+                }
+            )
+            + "\n"
+            for team, points, positions in projections
+        )
+    else:
+        width = max(len("Team"), *(len(projection.team) for projection in projections))
+        write_lines(
+            chain(
+                [
+                    "\nProjected table:\n\n",
+                    f"{'Team'.ljust(width)} | Points | Title   | Relegation\n",
+                ],
+                (
+                    f"{team.ljust(width)} | {points:6.1f} | {positions[0]:7.1%} | "
+                    f"{relegated(positions):.1%}\n"
+                    for team, points, positions in projections
+                ),
+                ["\n"],
+            ),
             fg=typer.colors.BLUE,
             bold=True,
         )
 
-    typer.secho("-" * len(headers) + "\n", fg=typer.colors.BLUE, bold=True)
+
+@app.command(name="export")
+def export(
+    output: Optional[Path] = typer.Argument(
+        None, help="The export file, replaced. Defaults to stdout."
+    ),
+    format: Optional[str] = typer.Option(
+        None,
+        "--format",
+        "-f",
+        help="csv, jsonl, arrow or parquet, arrow and parquet need pyarrow. "
+        "Defaults to the extension of OUTPUT, csv for stdout.",
+    ),
+    since: int = typer.Option(
+        0,
+        "--since",
+        min=0,
+        help="Export only the matches after this id, the marker printed by "
+        "the previous export.",
+    ),
+    standings: bool = typer.Option(
+        False, "--standings", help="Export the standings instead of the matches."
+    ),
+    tie_breakers: List[str] = typer.Option(
+        [],
+        "--tie-breaker",
+        "-t",
+        help="Break points ties of the standings like table_rank.",
+    ),
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Export the matches, or the standings, for analytics pipelines. The
+    matches are streamed from the database in chunks, so the memory used is
+    the same whatever their number. Every match comes with its id, and
+    --since exports only the matches added after the previous export.
+
+    Raises:
+        typer.Exit: 1
+    """
+    from ranking.export import format_for_path
+
+    if standings and since:
+        typer.secho("--since only applies to the matches", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    ranking_controller = get_rankin_controller(tie_breakers, league, season)
+    format = format or format_for_path(output)
+    if standings:
+        exported, marker, error = ranking_controller.export_standings(output, format)
+    else:
+        exported, marker, error = ranking_controller.export_matches(
+            output, format, since
+        )
+
+    if error:
+        typer.secho(
+            f"Exporting failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+            err=True,
+        )
+        raise typer.Exit(1)
+
+    # Kept off stdout when the export is written there
+    if standings:
+        message = f"{exported} teams exported"
+    else:
+        message = f"{exported} matches exported, continue with --since {marker}"
+    typer.secho(message, fg=typer.colors.GREEN, err=output is None)
+
+
+@app.command(name="migrate")
+def migrate_db() -> None:
+    """Convert a Ranking database from the old JSON array format into the
+    append-only match log. Databases already migrated are left untouched."""
+    if config.CONFIG_DIR_PATH.exists():
+        db_path = database.get_database_path(config.CONFIG_FILE_PATH)
+    else:
+        typer.secho(fastpath.CONFIG_NOT_FOUND, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    error = database.migrate_database(db_path)
+
+    if error:
+        typer.secho(
+            f"Migrating the database failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+    else:
+        typer.secho(
+            "The Ranking database was migrated succesfully", fg=typer.colors.GREEN
+        )
+
+
+@app.command(name="convert")
+def convert_db(
+    source: Path = typer.Argument(..., help="The database to convert."),
+    target: Path = typer.Argument(..., help="The new database, replaced."),
+    source_backend: Optional[str] = typer.Option(
+        None, "--from", help="Backend of SOURCE. Defaults to its file extension."
+    ),
+    target_backend: Optional[str] = typer.Option(
+        None, "--to", help="Backend of TARGET. Defaults to its file extension."
+    ),
+) -> None:
+    """Copy all the matches of a database into a new one with another
+    backend, e.g. from JSON to the binary format (.rkb) or back.
+
+    Raises:
+        typer.Exit: 1
+    """
+    start = time.perf_counter()
+    converted, error = database.convert_database(
+        source, target, source_backend, target_backend
+    )
+    elapsed = time.perf_counter() - start
+
+    if error:
+        typer.secho(
+            f"Converting the database failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    typer.secho(
+        f"{converted} matches converted in {elapsed:.3f}s, {target} takes "
+        f"{target.stat().st_size:,} bytes",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command(name="bench")
+def run_bench(
+    sizes: Optional[List[int]] = typer.Option(
+        None,
+        "--size",
+        "-s",
+        help="Matches of a synthetic league, can be repeated, e.g. -s 1000 "
+        "-s 1000000 -s 10000000. Defaults to 1000 and 100000.",
+    ),
+    backend: str = typer.Option(
+        database.JSON_BACKEND, "--backend", "-b", help="json, sqlite or binary."
+    ),
+    repeat: int = typer.Option(
+        3, "--repeat", "-r", min=1, help="Runs of every timing, the best is kept."
+    ),
+    output: Optional[Path] = typer.Option(
+        None, "--output", "-o", help="Write the results to this JSON file."
+    ),
+    baseline: Optional[Path] = typer.Option(
+        None,
+        "--baseline",
+        help="Results of a previous run. The command fails when a timing is "
+        "slower than in it.",
+    ),
+    threshold: Optional[float] = typer.Option(
+        None,
+        "--threshold",
+        help="Slowdown allowed against the baseline, 0.25 is 25%. Defaults to 0.25.",
+    ),
+) -> None:
+    """Time adding, reading, writing and ranking matches on synthetic leagues,
+    and the startup of the application. Uses temporary databases, the Ranking
+    database is not touched.
+
+    Raises:
+        typer.Exit: 1
+    """
+    if backend not in database.BACKENDS:
+        typer.secho(f"Unknown backend '{backend}'", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    from ranking import bench
+
+    sizes = sizes or bench.DEFAULT_SIZES
+    if threshold is None:
+        threshold = bench.DEFAULT_THRESHOLD
+    results = bench.run(sizes, backend, repeat, echo=typer.echo)
+
+    if output:
+        bench.save(results, output)
+
+    if baseline:
+        regressions = bench.compare(results, bench.load(baseline), threshold)
+        for name, before, seconds in regressions:
+            slowdown = f" {seconds / before - 1:.0%}" if before else ""
+            typer.secho(
+                f"{name} is{slowdown} slower: "
+                f"{before * 1000:.3f} ms -> {seconds * 1000:.3f} ms",
+                fg=typer.colors.RED,
+            )
+        if regressions:
+            raise typer.Exit(1)
+        typer.secho(f"No slowdowns over {threshold:.0%}", fg=typer.colors.GREEN)
 
 
 @app.command(name="clean")
-def clean_db() -> None:
-    """Clean the ranking database. Deletes all matches."""
-    ranking_controller = get_rankin_controller()
-    _, error = ranking_controller.clean_db()
+def clean_db(
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Clean the ranking database. Deletes all matches, or only those of a
+    league and season."""
+    _, error = forward_or_run(
+        "clean",
+        lambda: get_rankin_controller(league=league, season=season).clean_db(),
+        forward=league is None and season is None,
+    )
 
     if error:
         typer.secho(
@@ -159,35 +1065,162 @@ def clean_db() -> None:
         )
 
 
-def get_rankin_controller() -> ranking.RankingController:
+@app.command(name="compact")
+def compact(
+    league: Optional[str] = LEAGUE_OPTION,
+    season: Optional[str] = SEASON_OPTION,
+) -> None:
+    """Fold the journal of the Ranking database into it. Writes to a binary
+    database are journaled and folded by the next read anyway, compact
+    does it now, e.g. before copying the database. A SQLite database folds
+    its write-ahead log.
+
+    Raises:
+        typer.Exit: 1
+    """
+    error = get_rankin_controller(league=league, season=season).compact()
+
+    if error:
+        typer.secho(
+            f"Compacting the database failed with error: '{ERRORS[error]}'",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    typer.secho("The Ranking database was compacted", fg=typer.colors.GREEN)
+
+
+@app.command(name="serve")
+def serve() -> None:
+    """Run the Ranking daemon. It keeps the standings in memory and the
+    add, table_rank and clean commands are sent to it while it runs. Stop it
+    with Ctrl+C.
+
+    Raises:
+        typer.Exit: 1
+    """
+    if not client.is_supported():
+        typer.secho("The Ranking daemon needs Unix domain sockets", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if client.request({"command": "ping"}) is not None:
+        typer.secho(
+            f"The Ranking daemon is already running on {config.SOCKET_PATH}",
+            fg=typer.colors.YELLOW,
+        )
+        raise typer.Exit(1)
+
+    db_path, backend, message = fastpath.find_database()
+    if message:
+        typer.secho(message, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    from ranking import server
+
+    # A socket file left behind by a daemon that did not exit cleanly
+    if config.SOCKET_PATH.exists():
+        config.SOCKET_PATH.unlink()
+
+    typer.secho(
+        f"The Ranking daemon is listening on {config.SOCKET_PATH}",
+        fg=typer.colors.GREEN,
+    )
+    server.run(db_path, config.SOCKET_PATH, backend)
+
+
+def forward_or_run(
+    command: str,
+    run: Callable[[], Tuple[Any, int]],
+    forward: bool = True,
+    **arguments: Any,
+) -> Tuple[Any, int]:
+    """Send the command to the Ranking daemon when it is running, otherwise
+    run it in this process.
+
+    Args:
+        command (str): The daemon command
+        run (Callable[[], Tuple[Any, int]]): Runs the command locally
+        forward (bool, optional): False to always run it locally, e.g. for
+        a league, the daemon only serves the main database. Defaults to True.
+        arguments (Any): The arguments of the daemon command
+
+    Returns:
+        Tuple[Any, int]: The result of the command and its error code
+    """
+    response = client.request({"command": command, **arguments}) if forward else None
+    if response is None:
+        return run()
+
+    return response["result"], response["error"]
+
+
+def get_rankin_controller(
+    tie_breakers: Sequence[str] = (),
+    league: Optional[str] = None,
+    season: Optional[str] = None,
+    create: bool = False,
+) -> ranking.RankingController:
     """Every time the Ranking application runs, it needs to access the
     RankinController class and connect the CLI with the database. This Method
     checks if the database exists and returns the controller.
 
+    Args:
+        tie_breakers (Sequence[str], optional): Tie-breakers used by the
+        controller to order teams with the same points. Defaults to ().
+        league (str, optional): Use the database of this league. Defaults
+        to None.
+        season (str, optional): Use the database of this season. Defaults
+        to None.
+        create (bool, optional): Create the database of the league and
+        season when it doesn't exist, to add matches. Defaults to False.
+
     Raises:
-        typer.Exit: 1
+        typer.Exit: 1, or 0 when the league and season have no matches
 
     Returns:
         ranking.RankingController: The controller to communicates the CLI app with
         the database.
     """
-    if config.CONFIG_DIR_PATH.exists():
-        db_path = database.get_database_path(config.CONFIG_FILE_PATH)
+    db_path, backend, message = fastpath.find_database()
+
+    if message:
+        typer.secho(message, fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if create:
+        db_path, error = database.create_partition(db_path, league, season, backend)
     else:
+        try:
+            db_path, error = database.partition_path(db_path, league, season), SUCCESS
+        except ValueError:
+            error = PARTITION_ERROR
+
+    if error:
         typer.secho(
-            "Config file not found. Please, run 'ranking init' command",
+            f"Opening the database of {_partition_name(league, season)} failed "
+            f"with error: '{ERRORS[error]}'",
             fg=typer.colors.RED,
         )
         raise typer.Exit(1)
 
-    if db_path.exists():
-        return ranking.RankingController(db_path)
-    else:
+    if not db_path.exists():
         typer.secho(
-            "Ranking database not found. Please, run 'ranking init' command",
-            fg=typer.colors.RED,
+            f"There are no matches of {_partition_name(league, season)} yet",
+            fg=typer.colors.YELLOW,
         )
-        raise typer.Exit(1)
+        raise typer.Exit()
+
+    return ranking.RankingController(db_path, tie_breakers, backend)
+
+
+def _partition_name(league: Optional[str], season: Optional[str]) -> str:
+    if league is None and season is None:
+        return "the main database"
+    if season is None:
+        return f"league {league}"
+    if league is None:
+        return f"season {season}"
+    return f"league {league} season {season}"
 
 
 def _version_callback(value: bool) -> None:
@@ -196,8 +1229,40 @@ def _version_callback(value: bool) -> None:
         raise typer.Exit()
 
 
+def _start_profile(ctx: typer.Context, format: str, stats_path: Optional[Path]) -> None:
+    """Collect timings until the command ends, then print them to stderr and
+    dump the cProfile stats when a path is given."""
+    profiler = None
+    if stats_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    def finish() -> None:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(stats_path))
+        profiling.disable()
+
+        profile = profiling.report()
+        if format == PROFILE_JSON_FORMAT:
+            typer.echo(json.dumps(profile), err=True)
+        else:
+            typer.secho(
+                "\n".join(profiling.format_report(profile)),
+                fg=typer.colors.MAGENTA,
+                err=True,
+            )
+
+    ctx.call_on_close(finish)
+    profiling.enable()
+    if profiler is not None:
+        profiler.enable()
+
+
 @app.callback()
 def main(
+    ctx: typer.Context,
     version: Optional[bool] = typer.Option(
         None,
         "--version",
@@ -205,6 +1270,31 @@ def main(
         help="Show the application's version and exit.",
         callback=_version_callback,
         is_eager=True,
-    )
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print how long every phase of the command took, to stderr.",
+    ),
+    profile_format: str = typer.Option(
+        PROFILE_TEXT_FORMAT,
+        "--profile-format",
+        help="text or json, one JSON object for monitoring. Implies --profile.",
+    ),
+    profile_stats: Optional[Path] = typer.Option(
+        None,
+        "--profile-stats",
+        help="Dump cProfile stats of the command to this file, to read with "
+        "pstats or snakeviz. Implies --profile.",
+    ),
 ) -> None:
-    return
+    if profile_format not in PROFILE_FORMATS:
+        typer.secho(
+            f"Unknown profile format '{profile_format}', use "
+            f"{', '.join(PROFILE_FORMATS)}",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(1)
+
+    if profile or profile_format != PROFILE_TEXT_FORMAT or profile_stats:
+        _start_profile(ctx, profile_format, profile_stats)
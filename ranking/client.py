@@ -0,0 +1,57 @@
+import json
+import socket
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ranking import DAEMON_ERROR, profiling
+
+# Seconds to wait for the daemon to answer a request
+TIMEOUT = 30.0
+
+
+def is_supported() -> bool:
+    """The daemon listens on a Unix domain socket, not available everywhere."""
+    return hasattr(socket, "AF_UNIX")
+
+
+@profiling.timed("daemon request")
+def request(
+    payload: Dict[str, Any], socket_path: Optional[Path] = None
+) -> Optional[Dict[str, Any]]:
+    """Send a request to the Ranking daemon started with ``ranking serve``.
+
+    Args:
+        payload (Dict[str, Any]): The request, e.g. {"command": "add",
+        "match": "Lions 3, Snakes 3"}
+        socket_path (Path, optional): Socket of the daemon. Defaults to
+        config.SOCKET_PATH.
+
+    Returns:
+        Optional[Dict[str, Any]]: The response with its "result" and "error",
+        or None when there is no daemon running, so the caller can do the
+        work itself.
+    """
+    if socket_path is None:
+        from ranking import config
+
+        socket_path = config.SOCKET_PATH
+
+    if not is_supported() or not socket_path.exists():
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(TIMEOUT)
+        try:
+            client.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            # A socket file left behind by a daemon that is not running
+            return None
+
+        # Once the request is sent it can't be retried locally, it could
+        # have been applied already.
+        try:
+            client.sendall(json.dumps(payload).encode() + b"\n")
+            with client.makefile("rb") as stream:
+                return json.loads(stream.readline())
+        except (OSError, ValueError):
+            return {"result": None, "error": DAEMON_ERROR}
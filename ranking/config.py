@@ -1,20 +1,39 @@
 import configparser
-import typer
+import os
+import sys
 from pathlib import Path
+from typing import Optional
 
 from ranking import DB_WRITE_ERROR, DIR_ERROR, FILE_ERROR, SUCCESS, __app_name__
 
-CONFIG_DIR_PATH = Path(typer.get_app_dir(__app_name__))
+
+def get_app_dir(app_name: str) -> Path:
+    """Return the config folder of the application, the same folder as
+    ``typer.get_app_dir``, without having to import typer and click.
+    """
+    if sys.platform.startswith("win"):
+        folder = os.environ.get("APPDATA") or os.path.expanduser("~")
+        return Path(folder) / app_name
+
+    if sys.platform == "darwin":
+        return Path("~/Library/Application Support").expanduser() / app_name
+
+    folder = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
+    return Path(folder) / "-".join(app_name.split()).lower()
+
+
+CONFIG_DIR_PATH = get_app_dir(__app_name__)
 CONFIG_FILE_PATH = CONFIG_DIR_PATH / "config.ini"
+SOCKET_PATH = CONFIG_DIR_PATH / "ranking.sock"
 
 
-def init_app(db_path: str) -> int:
+def init_app(db_path: str, backend: Optional[str] = None) -> int:
     """Initialize the Ranking application."""
     config_code = _init_config_file()
     if config_code != SUCCESS:
         return config_code
 
-    database_code = _create_database(db_path)
+    database_code = _create_database(db_path, backend)
     if database_code != SUCCESS:
         return database_code
 
@@ -35,9 +54,11 @@ def _init_config_file() -> int:
     return SUCCESS
 
 
-def _create_database(db_path: str) -> int:
+def _create_database(db_path: str, backend: Optional[str] = None) -> int:
     config_parser = configparser.ConfigParser()
     config_parser["General"] = {"database": db_path}
+    if backend:
+        config_parser["General"]["backend"] = backend
 
     try:
         with CONFIG_FILE_PATH.open("w") as file:
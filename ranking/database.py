@@ -1,12 +1,88 @@
 import configparser
 import json
-from typing import Any, Dict, List, NamedTuple
+import os
+import re
+import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
 from pathlib import Path
-from ranking import DB_READ_ERROR, DB_WRITE_ERROR, SUCCESS, JSON_ERROR
+from ranking import (
+    DB_READ_ERROR,
+    DB_WRITE_ERROR,
+    PARTITION_ERROR,
+    SUCCESS,
+    JSON_ERROR,
+    profiling,
+)
+from ranking.standings import apply_match, calculate_standings, merge_standings
+
+# engine, records, read_cache and team_index are imported by the functions
+# that use them, to keep the startup of add fast
+if TYPE_CHECKING:
+    from ranking.records import Match
+    from ranking.team_index import TeamIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows, where the database is not locked
+    fcntl = None
 
 DEFAULT_DB_FILE_PATH = Path.home().joinpath("ranking_db.json")
 
+JSON_BACKEND = "json"
+SQLITE_BACKEND = "sqlite"
+BINARY_BACKEND = "binary"
+BACKENDS = (JSON_BACKEND, SQLITE_BACKEND, BINARY_BACKEND)
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+BINARY_EXTENSIONS = (".rkb",)
+
+# Matches buffered before each write when several are appended at once.
+WRITE_CHUNK_SIZE = 1000
+# Matches added to the team index at once when it is built from the log
+INDEX_CHUNK_SIZE = 100_000
+# Fewer records after the standings snapshot are summed in pure Python, in
+# less time than NumPy takes to import (about 100 ms, 200,000 records)
+ENGINE_MIN_RECORDS = 100_000
+# A record as written by _dump_match, read without building its dicts.
+# Names with escaped characters are decoded by json.
+RECORD_LINE = re.compile(
+    r'\{"team_1":\{"name":"([^"\\]*)","goals":(\d+)\},'
+    r'"team_2":\{"name":"([^"\\]*)","goals":(\d+)\}\}\s*'
+)
+# League and season names: letters, digits, spaces, "-" and "_", not
+# starting with "_", which stands for a league or season not given
+PARTITION_NAME = re.compile(r"[^\W_][\w -]*")
+NO_PARTITION = "_"
+
+# Methods of every backend timed by ranking.profiling
+PROFILED_METHODS = (
+    "iter_matches",
+    "iter_matches_from",
+    "iter_records",
+    "read_matches",
+    "read_indexed_matches",
+    "append_match",
+    "append_matches",
+    "write_matches",
+    "read_standings",
+    "compact",
+)
+
 
+@profiling.timed()
 def get_database_path(config_file: Path) -> Path:
     """Return the current path to the Ranking database"""
     config_parser = configparser.ConfigParser()
@@ -15,15 +91,485 @@ def get_database_path(config_file: Path) -> Path:
     return Path(config_parser["General"]["database"])
 
 
-def init_database(db_path: Path) -> int:
-    """Create the Ranking database"""
+@profiling.timed()
+def get_database_backend(config_file: Path) -> Optional[str]:
+    """Return the backend set in the config file, if there is one"""
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+
+    return config_parser["General"].get("backend")
+
+
+def backend_for_path(db_path: Path, backend: Optional[str] = None) -> str:
+    """Return the backend for the Ranking database. When no backend is given
+    it is chosen by the file extension, SQLite for .db, .sqlite and .sqlite3
+    files, binary for .rkb files and JSON Lines for everything else."""
+    if backend:
+        return backend
+
+    if db_path.suffix.lower() in SQLITE_EXTENSIONS:
+        return SQLITE_BACKEND
+
+    if db_path.suffix.lower() in BINARY_EXTENSIONS:
+        return BINARY_BACKEND
+
+    return JSON_BACKEND
+
+
+def get_database_handler(
+    db_path: Path, backend: Optional[str] = None, cache_size: Optional[int] = None
+) -> "BaseDatabaseHandler":
+    """Return the handler to read and write the Ranking database.
+
+    Args:
+        db_path (Path): Path to the Ranking database
+        backend (str, optional): "json", "sqlite" or "binary". Defaults to
+        the one matching the file extension.
+        cache_size (int, optional): Bytes of decoded matches and standings
+        kept in memory by the JSON backend, 0 disables it. Defaults to
+        read_cache.READ_CACHE_SIZE.
+
+    Raises:
+        ValueError: The backend is unknown
+
+    Returns:
+        BaseDatabaseHandler: The database handler
+    """
+    backend = backend_for_path(db_path, backend)
+
+    if backend == JSON_BACKEND:
+        return DatabaseHandler(db_path, cache_size)
+
+    if backend == SQLITE_BACKEND:
+        from ranking.sqlite_database import SQLiteDatabaseHandler
+
+        return SQLiteDatabaseHandler(db_path)
+
+    if backend == BINARY_BACKEND:
+        from ranking.binary_database import BinaryDatabaseHandler
+
+        return BinaryDatabaseHandler(db_path)
+
+    raise ValueError(f"Unknown database backend '{backend}'")
+
+
+def sidecar_path(db_path: Path, name: str) -> Path:
+    """Return the path of a file kept next to the Ranking database.
+
+    Example: ``sidecar_path(Path("ranking_db.json"), "standings.json")``
+    is ``ranking_db.standings.json``.
+    """
+    return db_path.with_name(f"{db_path.stem}.{name}")
+
+
+def database_signature(db_path: Path) -> List[Optional[List[int]]]:
+    """file_signature of the database, of its SQLite write-ahead log and of
+    its journal, where the writes go before the database, as lists like
+    they are read back from JSON.
+
+    Caches of the whole database, e.g. the ratings, save it and are only
+    used while it is the same, so any change not made through them, even by
+    hand, is noticed.
+    """
+    from ranking.read_cache import file_signature
+
+    paths = (db_path, Path(f"{db_path}-wal"), sidecar_path(db_path, "journal"))
+    return [
+        None if signature is None else list(signature)
+        for signature in map(file_signature, paths)
+    ]
+
+
+class Partition(NamedTuple):
+    league: Optional[str]
+    season: Optional[str]
+    path: Path
+
+
+def is_partition_name(name: str) -> bool:
+    """Check that a league or season name can be used as a file name."""
+    return PARTITION_NAME.fullmatch(name) is not None
+
+
+def partition_path(
+    db_path: Path, league: Optional[str] = None, season: Optional[str] = None
+) -> Path:
+    """Return the database holding the matches of a league and season.
+
+    Every league and season is a Ranking database of its own, with the
+    backend of the main one, in a directory next to it, e.g.
+    ``ranking_db.leagues/premier/2026.json``, so reading a league never
+    reads the matches of the others. Matches without league nor season
+    stay in the main database.
+
+    Args:
+        db_path (Path): Path to the main Ranking database
+        league (str, optional): Name of the league. Defaults to None.
+        season (str, optional): Name of the season, e.g. "2026". Defaults
+        to None.
+
+    Raises:
+        ValueError: A name is not valid, see is_partition_name
+
+    Returns:
+        Path: Path to the database of the league and season
+    """
+    if league is None and season is None:
+        return db_path
+
+    for name in (league, season):
+        if name is not None and not is_partition_name(name):
+            raise ValueError(f"Invalid league or season name '{name}'")
+
+    return (
+        sidecar_path(db_path, "leagues")
+        / (league or NO_PARTITION)
+        / f"{season or NO_PARTITION}{db_path.suffix}"
+    )
+
+
+def create_partition(
+    db_path: Path,
+    league: Optional[str] = None,
+    season: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> Tuple[Path, int]:
+    """Return the database of a league and season, creating it the first
+    time matches are added to it.
+
+    Returns:
+        Tuple[Path, int]: Path to the database of the partition and the
+        error code
+    """
     try:
-        db_path.write_text("[]")
-        return SUCCESS
+        path = partition_path(db_path, league, season)
+    except ValueError:
+        return db_path, PARTITION_ERROR
+
+    if path.exists():
+        return path, SUCCESS
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
     except OSError:
+        return path, DB_WRITE_ERROR
+
+    return path, init_database(path, backend_for_path(db_path, backend))
+
+
+def list_partitions(db_path: Path) -> List[Partition]:
+    """Return the main database and the database of every league and
+    season next to it, in order of league and season."""
+    partitions = []
+    leagues_path = sidecar_path(db_path, "leagues")
+    league_paths = leagues_path.iterdir() if leagues_path.is_dir() else []
+
+    for league_path in league_paths:
+        if not league_path.is_dir():
+            continue
+        for path in league_path.iterdir():
+            # Skips the sidecars of every partition, e.g. 2026.standings.json
+            if path.suffix != db_path.suffix or "." in path.stem:
+                continue
+            league, season = (
+                None if name == NO_PARTITION else name
+                for name in (league_path.name, path.stem)
+            )
+            partitions.append(Partition(league, season, path))
+
+    # A league or season not given goes first
+    partitions.sort(
+        key=lambda partition: (partition.league or "", partition.season or "")
+    )
+    return [Partition(None, None, db_path), *partitions]
+
+
+@contextmanager
+def lock_database(db_path: Path, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on the Ranking database.
+
+    Writers take the lock exclusively and readers shared, so a match is
+    never lost between two processes adding matches at the same time, and
+    nobody reads a record while it is being written. The lock is taken on a
+    file next to the database, e.g. ``ranking_db.json.lock``, because the
+    database itself is replaced when it is rewritten.
+
+    Args:
+        db_path (Path): Path to the Ranking database
+        shared (bool, optional): Take a shared (read) lock. Defaults to False.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    try:
+        lock_file = db_path.with_name(f"{db_path.name}.lock").open("a")
+    except OSError:
+        # A read-only location, nobody else can write there either
+        yield
+        return
+
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+
+def replace_file(path: Path, chunks: Iterable[bytes], durable: bool = True) -> None:
+    """Write a whole file atomically: into a temporary file next to it which
+    then replaces it, so a crash leaves either the old or the new content.
+
+    Args:
+        path (Path): The file to write
+        chunks (Iterable[bytes]): The new content
+        durable (bool, optional): Flush the new content to disk before
+        replacing the file. Defaults to True.
+
+    Raises:
+        OSError: The file can't be written
+    """
+    temp_path = path.with_name(
+        f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with temp_path.open("wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+            if durable:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+
+    if durable:
+        _fsync_directory(path.parent)
+
+
+def _fsync_directory(directory: Path) -> None:
+    # Makes the rename durable on POSIX, directories can't be opened on Windows
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def init_database(db_path: Path, backend: Optional[str] = None) -> int:
+    """Create the Ranking database"""
+    try:
+        return get_database_handler(db_path, backend).init_database()
+    except ValueError:
         return DB_WRITE_ERROR
 
 
+def convert_database(
+    source: Path,
+    target: Path,
+    source_backend: Optional[str] = None,
+    target_backend: Optional[str] = None,
+) -> "WriteResponse":
+    """Copy all the matches of a Ranking database into a new one, e.g. from
+    JSON Lines to the binary format or back. The target is replaced.
+
+    Args:
+        source (Path): The database to convert
+        target (Path): The new database
+        source_backend (str, optional): Backend of the source. Defaults to
+        the one matching its file extension.
+        target_backend (str, optional): Backend of the target. Defaults to
+        the one matching its file extension.
+
+    Returns:
+        WriteResponse: How many matches were copied
+    """
+    try:
+        source_handler = get_database_handler(source, source_backend)
+        target_handler = get_database_handler(target, target_backend)
+    except ValueError:
+        return WriteResponse(0, DB_WRITE_ERROR)
+
+    if not source.exists():
+        return WriteResponse(0, DB_READ_ERROR)
+
+    if target.exists() and target.resolve() == source.resolve():
+        return WriteResponse(0, DB_WRITE_ERROR)
+
+    error = target_handler.init_database()
+    if error:
+        return WriteResponse(0, error)
+
+    try:
+        write = target_handler.append_matches(source_handler.iter_matches())
+        if write.error:
+            return write
+        # Nothing left in a journal, the target can be copied right away
+        return WriteResponse(write.count, target_handler.compact())
+    except ValueError:
+        return WriteResponse(0, JSON_ERROR)
+    except OSError:
+        return WriteResponse(0, DB_READ_ERROR)
+
+
+def is_legacy_database(db_path: Path) -> bool:
+    """Check if the database still uses the old single JSON array format.
+
+    The match log stores one JSON object per line, so a file starting
+    with ``[`` can only be a database written by a previous version.
+    """
+    with db_path.open("r") as db:
+        while True:
+            char = db.read(1)
+            if not char or not char.isspace():
+                return char == "["
+
+
+def migrate_database(db_path: Path) -> int:
+    """Convert a JSON array database into the append-only match log.
+
+    The migration is a no-op when the database is already a match log.
+
+    Args:
+        db_path (Path): Path to the Ranking database
+
+    Returns:
+        int: The error code, SUCCESS when the migration went well
+    """
+    with lock_database(db_path):
+        try:
+            if not is_legacy_database(db_path):
+                return SUCCESS
+
+            with db_path.open("r") as db:
+                try:
+                    matches_list = json.load(db)
+                except json.JSONDecodeError:
+                    return JSON_ERROR
+        except OSError:
+            return DB_READ_ERROR
+
+        return DatabaseHandler(db_path)._replace_matches(matches_list).error
+
+
+def _dump_match(match: Dict[str, Any]) -> bytes:
+    return (json.dumps(match, separators=(",", ":")) + "\n").encode()
+
+
+def _load_records(lines: Iterable[str]) -> Iterator["Match"]:
+    """Decode the records of the log into match records, skipping blank
+    lines.
+
+    Raises:
+        ValueError: A record is not a match in JSON
+    """
+    from ranking.records import Match
+
+    for line in lines:
+        if not line.strip():
+            continue
+        parsed = RECORD_LINE.fullmatch(line)
+        if parsed is None:
+            yield Match.from_dict(json.loads(line))
+            continue
+
+        team_1, goals_1, team_2, goals_2 = parsed.groups()
+        yield Match(sys.intern(team_1), int(goals_1), sys.intern(team_2), int(goals_2))
+
+
+def repair_torn_record(db) -> None:
+    """Finish or drop a record left half written by an interrupted append,
+    in the match log or in a journal (see ranking.journal), opened in
+    ``r+b`` mode.
+
+    Every record ends with a newline. A last line without it is kept when it
+    is complete JSON, e.g. a match from a database edited by hand, and
+    truncated otherwise.
+    """
+    size = db.seek(0, os.SEEK_END)
+    if size == 0:
+        return
+
+    db.seek(size - 1)
+    if db.read(1) == b"\n":
+        return
+
+    start = size
+    while start > 0:
+        step = min(start, 4096)
+        db.seek(start - step)
+        newline = db.read(step).rfind(b"\n")
+        if newline >= 0:
+            start = start - step + newline + 1
+            break
+        start -= step
+
+    db.seek(start)
+    try:
+        json.loads(db.read())
+    except ValueError:
+        db.truncate(start)
+    else:
+        db.write(b"\n")
+
+
+def _empty_snapshot() -> Dict[str, Any]:
+    return {"offset": 0, "signature": None, "teams": {}}
+
+
+def _copy_standings(table: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    return {team: dict(stats) for team, stats in table.items()}
+
+
+def _empty_watermark() -> Dict[str, Any]:
+    return {"offset": 0, "signature": None, "count": 0}
+
+
+def _log_shard_standings(task: Tuple[str, int, int]) -> Dict[str, Dict[str, int]]:
+    """Calculate the standings of the records of the log starting between
+    two offsets. Runs in the workers of parallel.sharded_standings."""
+    import mmap
+
+    from ranking.engine import ColumnarMatches, compute_standings
+
+    path, start, end = task
+    columns = ColumnarMatches()
+    with open(path, "rb") as db, mmap.mmap(
+        db.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        data.seek(start)
+        # A record cut by the start of the shard belongs to the previous one
+        if start > 0 and data[start - 1] != ord("\n"):
+            data.readline()
+        position = data.tell()
+        while position < end:
+            record = data.readline()
+            if not record:
+                break
+            if record.strip():
+                columns.append(json.loads(record))
+            position += len(record)
+
+    return compute_standings(columns)
+
+
+def _plays(match: Dict[str, Any], team: str) -> bool:
+    return team in (match["team_1"]["name"], match["team_2"]["name"])
+
+
+def _fold_record(
+    snapshot: Dict[str, Any], record: bytes, match: Optional[Dict[str, Any]]
+) -> None:
+    if match is not None:
+        apply_match(snapshot["teams"], match)
+    snapshot["offset"] += len(record)
+
+
 class DBResponse(NamedTuple):
     """The response comming from the Ranking database.
 
@@ -35,29 +581,465 @@ class DBResponse(NamedTuple):
     error: int
 
 
-class DatabaseHandler:
-    """To read and write in the database"""
+class IndexedResponse(NamedTuple):
+    """Matches with their ids, their position in the database starting at 1
+    like in all_matches."""
+
+    matches_list: List[Tuple[int, Dict[str, Any]]]
+    error: int
+
+
+class StandingsResponse(NamedTuple):
+    """The standings comming from the Ranking database, team -> aggregates."""
+
+    table: Dict[str, Dict[str, int]]
+    error: int
+
+
+class WriteResponse(NamedTuple):
+    """How many matches were written in the Ranking database."""
+
+    count: int
+    error: int
+
+
+class BaseDatabaseHandler(ABC):
+    """Interface of the Ranking database backends.
+
+    The PROFILED_METHODS of every backend are timed by ranking.profiling.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        for name in PROFILED_METHODS:
+            if name in vars(cls):
+                method = profiling.timed(f"{cls.__name__}.{name}")(vars(cls)[name])
+                setattr(cls, name, method)
 
     def __init__(self, db_path: Path) -> None:
         self._db_path = db_path
 
+    @abstractmethod
+    def init_database(self) -> int:
+        """Create an empty database"""
+
+    @abstractmethod
+    def iter_matches(self) -> Iterator[Dict[str, Any]]:
+        """Stream the matches in the order they were added.
+
+        Raises:
+            OSError: The database can't be read
+            ValueError: The database is not in the format of the backend,
+            e.g. json.JSONDecodeError for a record that is not valid JSON
+        """
+
+    def iter_matches_from(self, start: int) -> Iterator[Dict[str, Any]]:
+        """Stream the matches after the first ``start`` ones, e.g. from
+        match 1001 with ``start=1000``. Backends skip the first matches
+        without decoding them when they can.
+
+        Raises:
+            OSError: The database can't be read
+            ValueError: The database is not in the format of the backend
+        """
+        yield from islice(self.iter_matches(), start, None)
+
+    def iter_records(self) -> Iterator["Match"]:
+        """Stream the matches as compact records, see ranking.records.
+        Backends build them without the dicts of iter_matches when they can.
+
+        Raises:
+            OSError: The database can't be read
+            ValueError: The database is not in the format of the backend
+        """
+        from ranking.records import Match
+
+        for match in self.iter_matches():
+            yield Match.from_dict(match)
+
+    @abstractmethod
+    def read_matches(self) -> DBResponse:
+        """Read all the matches"""
+
+    @abstractmethod
+    def read_indexed_matches(
+        self, team: str, rival: Optional[str] = None
+    ) -> IndexedResponse:
+        """Read the matches played by ``team``, or between ``team`` and
+        ``rival``, with their ids"""
+
+    def read_team_matches(self, team: str) -> DBResponse:
+        """Read the matches played by ``team``"""
+        read = self.read_indexed_matches(team)
+        return DBResponse([match for _, match in read.matches_list], read.error)
+
+    def read_head_to_head(self, team: str, rival: str) -> DBResponse:
+        """Read the matches played between ``team`` and ``rival``"""
+        read = self.read_indexed_matches(team, rival)
+        return DBResponse([match for _, match in read.matches_list], read.error)
+
+    @abstractmethod
+    def append_match(self, match: Dict[str, Any]) -> DBResponse:
+        """Add a single match"""
+
+    @abstractmethod
+    def append_matches(self, matches: Iterable[Dict[str, Any]]) -> WriteResponse:
+        """Add several matches with a single write"""
+
+    @abstractmethod
+    def write_matches(self, matches_list: List[Dict[str, Any]]) -> DBResponse:
+        """Replace all the matches"""
+
+    @abstractmethod
+    def read_standings(self, workers: int = 1) -> StandingsResponse:
+        """Read the aggregates of every team, with up to ``workers``
+        processes when there are enough matches to read"""
+
+    def compact(self) -> int:
+        """Fold the writes kept apart from the database, e.g. in a journal,
+        into the database itself. Backends writing straight into the
+        database have nothing to fold.
+
+        Returns:
+            int: The error code
+        """
+        return SUCCESS
+
+
+class DatabaseHandler(BaseDatabaseHandler):
+    """To read and write in the database.
+
+    Matches are stored as an append-only log with one JSON object per line,
+    so adding a match only writes that match instead of the whole database.
+
+    The standings are persisted in a snapshot next to the database. The
+    snapshot remembers how many bytes of the log it folded and the
+    file_signature of the log then, so it is updated by every add and
+    rebuilt when the log was changed some other way, e.g. edited by hand.
+    The team index (see ranking.team_index) is kept the same way.
+
+    The matches and the standings read are also kept in memory, see
+    ranking.read_cache, and returned again while the log is not changed, so
+    a long-lived handler doesn't decode the same log on every read.
+    """
+
+    def __init__(self, db_path: Path, cache_size: Optional[int] = None) -> None:
+        """
+        Args:
+            db_path (Path): Path to the Ranking database
+            cache_size (int, optional): Bytes of decoded matches and
+            standings kept in memory, 0 disables it. Defaults to
+            read_cache.READ_CACHE_SIZE.
+        """
+        from ranking.read_cache import ReadCache
+
+        super().__init__(db_path)
+        self._snapshot_path = sidecar_path(db_path, "standings.json")
+        self._index: Optional["TeamIndex"] = None
+        self._cache = ReadCache(cache_size)
+
+    @property
+    def _team_index(self) -> "TeamIndex":
+        if self._index is None:
+            from ranking.team_index import TeamIndex
+
+            self._index = TeamIndex(self._db_path)
+        return self._index
+
+    def init_database(self) -> int:
+        """Create the Ranking database"""
+        try:
+            self._db_path.write_text("")
+            return SUCCESS
+        except OSError:
+            return DB_WRITE_ERROR
+
+    def iter_matches(self) -> Iterator[Dict[str, Any]]:
+        """Stream the matches in the Ranking database one by one.
+
+        Raises:
+            OSError: The database can't be read
+            json.JSONDecodeError: A record in the database is not valid JSON
+
+        Yields:
+            Dict[str, Any]: A match
+        """
+        with lock_database(self._db_path, shared=True):
+            if is_legacy_database(self._db_path):
+                with self._db_path.open("r") as db:
+                    yield from json.load(db)
+                return
+
+            with self._db_path.open("r") as db:
+                for line in db:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def iter_matches_from(self, start: int) -> Iterator[Dict[str, Any]]:
+        """Stream the matches after the first ``start`` ones. The lines of
+        the skipped matches are not decoded.
+
+        Raises:
+            OSError: The database can't be read
+            json.JSONDecodeError: A record in the database is not valid JSON
+
+        Yields:
+            Dict[str, Any]: A match
+        """
+        with lock_database(self._db_path, shared=True):
+            if is_legacy_database(self._db_path):
+                with self._db_path.open("r") as db:
+                    yield from islice(json.load(db), start, None)
+                return
+
+            with self._db_path.open("r") as db:
+                records = (line for line in db if line.strip())
+                for line in islice(records, start, None):
+                    yield json.loads(line)
+
+    def iter_records(self) -> Iterator["Match"]:
+        """Stream the matches as compact records, decoding the lines written
+        by this handler without building dicts.
+
+        Raises:
+            OSError: The database can't be read
+            ValueError: A record in the database is not a match in JSON
+
+        Yields:
+            Match: A match
+        """
+        from ranking.records import Match
+
+        with lock_database(self._db_path, shared=True):
+            if is_legacy_database(self._db_path):
+                with self._db_path.open("r") as db:
+                    yield from map(Match.from_dict, json.load(db))
+                return
+
+            with self._db_path.open("r") as db:
+                yield from _load_records(db)
+
     def read_matches(self) -> DBResponse:
         """Read all the matches in the Ranking database.
 
+        The matches are decoded again only when the log changed since the
+        last read. The list is new on every call, but the matches in it are
+        shared between calls and must not be modified.
+
         Returns:
             DBResponse: List of matches
         """
+        from ranking.read_cache import CACHED_MATCH_BYTES, file_signature
+
+        # Taken before reading, a change during the read only misses the cache
+        signature = file_signature(self._db_path)
+        matches = self._cache.get("matches", signature)
+        if matches is not None:
+            profiling.count("read cache hits")
+            return DBResponse(list(matches), SUCCESS)
+
         try:
-            with self._db_path.open("r") as db:
-                try:
-                    return DBResponse(json.load(db), SUCCESS)
-                except json.JSONDecodeError:
-                    return DBResponse([], JSON_ERROR)
+            matches = list(self.iter_matches())
+        except json.JSONDecodeError:
+            return DBResponse([], JSON_ERROR)
         except OSError:
             return DBResponse([], DB_READ_ERROR)
 
+        self._cache.put(
+            "matches", signature, matches, len(matches) * CACHED_MATCH_BYTES
+        )
+        return DBResponse(list(matches), SUCCESS)
+
+    def read_indexed_matches(
+        self, team: str, rival: Optional[str] = None
+    ) -> IndexedResponse:
+        """Read the matches played by a team, or between two teams, through
+        the team index of the one with fewer matches. Only the records of
+        its matches are read.
+
+        Args:
+            team (str): Name of the team
+            rival (str, optional): Name of the other team. Defaults to None,
+            every match of ``team``.
+
+        Returns:
+            IndexedResponse: The matches with their ids
+        """
+        teams = (team,) if rival is None else (team, rival)
+
+        def is_wanted(match: Dict[str, Any]) -> bool:
+            return all(_plays(match, name) for name in teams)
+
+        try:
+            if is_legacy_database(self._db_path):
+                return IndexedResponse(
+                    [
+                        (id, match)
+                        for id, match in enumerate(self.iter_matches(), 1)
+                        if is_wanted(match)
+                    ],
+                    SUCCESS,
+                )
+
+            self._update_team_index()
+            with lock_database(self._db_path, shared=True), self._db_path.open(
+                "rb"
+            ) as db:
+                size = db.seek(0, os.SEEK_END)
+                entries = min(map(self._team_index.entries, teams), key=len)
+                matches_list = []
+                for offset, id in entries:
+                    if offset >= size:
+                        break
+                    db.seek(offset)
+                    match = json.loads(db.readline())
+                    if is_wanted(match):
+                        matches_list.append((id, match))
+        except json.JSONDecodeError:
+            return IndexedResponse([], JSON_ERROR)
+        except OSError:
+            return IndexedResponse([], DB_READ_ERROR)
+
+        return IndexedResponse(matches_list, SUCCESS)
+
+    @profiling.timed()
+    def _update_team_index(self) -> None:
+        """Index the matches appended since the team index was last updated,
+        or build it again when it is missing or the log was rewritten."""
+        with lock_database(self._db_path), self._db_path.open("rb") as db:
+            watermark = self._team_index.watermark()
+            if watermark is None or not self._is_snapshot_of(watermark):
+                self._team_index.clear()
+                watermark = _empty_watermark()
+                # The log doesn't change while it is locked
+                watermark["signature"] = self._log_signature()
+            elif watermark["offset"] == db.seek(0, os.SEEK_END):
+                return
+
+            db.seek(watermark["offset"])
+            entries = []
+            for record in db:
+                if record.strip():
+                    watermark["count"] += 1
+                    entries.append(
+                        (watermark["offset"], watermark["count"], json.loads(record))
+                    )
+                _fold_record(watermark, record, None)
+                if len(entries) == INDEX_CHUNK_SIZE:
+                    self._team_index.add(entries, watermark)
+                    entries.clear()
+            self._team_index.add(entries, watermark)
+
+    def append_match(self, match: Dict[str, Any]) -> DBResponse:
+        """Append a single match at the end of the database.
+
+        A database in the old JSON array format is migrated first.
+
+        Args:
+            match (Dict[str, Any]): The new match
+
+        Returns:
+            DBResponse: List with the appended match
+        """
+        return DBResponse([match], self.append_matches([match]).error)
+
+    def append_matches(self, matches: Iterable[Dict[str, Any]]) -> WriteResponse:
+        """Append several matches at the end of the database, opening it
+        only once. The matches are consumed lazily and written in chunks,
+        holding the database lock, and flushed to disk before returning.
+        When a write, or the matches, fail the database is cut back to its
+        size before the append.
+
+        A database in the old JSON array format is migrated first.
+
+        Args:
+            matches (Iterable[Dict[str, Any]]): The new matches
+
+        Returns:
+            WriteResponse: How many matches were appended
+        """
+        try:
+            return self._append_matches(matches)
+        finally:
+            self._cache.clear()
+
+    def _append_matches(self, matches: Iterable[Dict[str, Any]]) -> WriteResponse:
+        migrated = migrate_database(self._db_path)
+        if migrated != SUCCESS:
+            return WriteResponse(0, migrated)
+
+        count = 0
+
+        try:
+            with lock_database(self._db_path), self._db_path.open("r+b") as db:
+                repair_torn_record(db)
+                snapshot = self._load_snapshot()
+
+                # A snapshot not of the whole log is left as it is, the next
+                # read_standings rebuilds it.
+                if snapshot is not None and (
+                    snapshot["offset"] != db.seek(0, os.SEEK_END)
+                    or not self._is_snapshot_of(snapshot)
+                ):
+                    snapshot = None
+
+                # The team index is updated too when it is up to date. Without
+                # one, team_index is not even imported.
+                watermark = None
+                if sidecar_path(self._db_path, "teams").is_dir():
+                    watermark = self._team_index.watermark()
+                if watermark is not None and (
+                    watermark["offset"] != db.seek(0, os.SEEK_END)
+                    or not self._is_snapshot_of(watermark)
+                ):
+                    watermark = None
+                entries = []
+
+                end = db.seek(0, os.SEEK_END)
+                chunk = []
+                try:
+                    for match in matches:
+                        record = _dump_match(match)
+                        chunk.append(record)
+                        count += 1
+                        if snapshot is not None:
+                            _fold_record(snapshot, record, match)
+                        if watermark is not None:
+                            watermark["count"] += 1
+                            entries.append(
+                                (watermark["offset"], watermark["count"], match)
+                            )
+                            _fold_record(watermark, record, None)
+                        if len(chunk) == WRITE_CHUNK_SIZE:
+                            db.write(b"".join(chunk))
+                            chunk.clear()
+                    db.write(b"".join(chunk))
+                    db.flush()
+                    os.fsync(db.fileno())
+                    # Of the log with the matches, which are folded in both
+                    signature = self._log_signature()
+                except BaseException:
+                    # All the matches or none: the chunks written are dropped
+                    count = 0
+                    db.truncate(end)
+                    raise
+
+                if snapshot is not None:
+                    snapshot["signature"] = signature
+                    self._save_snapshot(snapshot)
+                if watermark is not None:
+                    watermark["signature"] = signature
+                    self._add_to_team_index(entries, watermark)
+        except OSError:
+            return WriteResponse(count, DB_WRITE_ERROR)
+
+        return WriteResponse(count, SUCCESS)
+
     def write_matches(self, matches_list: List[Dict[str, Any]]) -> DBResponse:
-        """Write macthes in the database.
+        """Write macthes in the database, replacing its content.
+
+        The database is replaced atomically while holding its lock, a crash
+        leaves either the old or the new matches.
 
         Args:
             matches_list (List[Dict[str, Any]]): List of matches including the new match
@@ -65,9 +1047,185 @@ class DatabaseHandler:
         Returns:
             DBResponse: List of matches
         """
+        with lock_database(self._db_path):
+            return self._replace_matches(matches_list)
+
+    def _replace_matches(self, matches_list: List[Dict[str, Any]]) -> DBResponse:
+        """write_matches for a caller already holding the database lock."""
+        self._cache.clear()
+        snapshot = _empty_snapshot()
+
+        def records() -> Iterator[bytes]:
+            for match in matches_list:
+                record = _dump_match(match)
+                _fold_record(snapshot, record, match)
+                yield record
+
         try:
-            with self._db_path.open("w") as db:
-                json.dump(matches_list, db, indent=4)
-            return DBResponse(matches_list, SUCCESS)
+            replace_file(self._db_path, records())
         except OSError:
             return DBResponse(matches_list, DB_WRITE_ERROR)
+
+        snapshot["signature"] = self._log_signature()
+        self._save_snapshot(snapshot)
+        self._team_index.clear()
+
+        return DBResponse(matches_list, SUCCESS)
+
+    def read_standings(self, workers: int = 1) -> StandingsResponse:
+        """Read the standings of every team.
+
+        Only the matches appended after the snapshot was last saved are
+        read. The whole log is read again only when the snapshot is missing
+        or does not match the database anymore. Matches read from the log
+        are aggregated by the columnar engine.
+
+        With several workers, the part of the log to read is split into
+        shards of at least parallel.MIN_SHARD_BYTES, each one read from the
+        mapped file and aggregated by a process of a pool.
+
+        Args:
+            workers (int, optional): Processes reading the log. Defaults to 1.
+
+        Returns:
+            StandingsResponse: Teams with their aggregates, a copy the
+            caller can modify
+        """
+        from ranking.read_cache import CACHED_TEAM_BYTES, file_signature
+
+        signature = file_signature(self._db_path)
+        table = self._cache.get("standings", signature)
+        if table is not None:
+            profiling.count("read cache hits")
+            return StandingsResponse(_copy_standings(table), SUCCESS)
+
+        table, error = self._read_standings(workers)
+        if not error:
+            self._cache.put(
+                "standings",
+                signature,
+                _copy_standings(table),
+                len(table) * CACHED_TEAM_BYTES,
+            )
+        return StandingsResponse(table, error)
+
+    def _read_standings(self, workers: int) -> StandingsResponse:
+        from ranking.engine import (
+            ColumnarMatches,
+            compute_standings,
+            standings_from_rows,
+        )
+
+        try:
+            if is_legacy_database(self._db_path):
+                return StandingsResponse(
+                    calculate_standings(self.iter_matches()), SUCCESS
+                )
+
+            with lock_database(self._db_path, shared=True), self._db_path.open(
+                "rb"
+            ) as db:
+                snapshot = self._load_snapshot()
+                stale = snapshot is None or not self._is_snapshot_of(snapshot)
+                if stale:
+                    snapshot = _empty_snapshot()
+                    # The log doesn't change while it is locked
+                    snapshot["signature"] = self._log_signature()
+
+                offset = snapshot["offset"]
+                end = db.seek(0, os.SEEK_END)
+                shards = [(offset, end)]
+                if workers > 1:
+                    from ranking import parallel
+
+                    shards = parallel.split(
+                        offset, end, workers, parallel.MIN_SHARD_BYTES
+                    )
+                if len(shards) > 1:
+                    tasks = [
+                        (str(self._db_path), start, stop) for start, stop in shards
+                    ]
+                    merge_standings(
+                        snapshot["teams"],
+                        parallel.sharded_standings(
+                            _log_shard_standings, tasks, workers
+                        ),
+                    )
+                    snapshot["offset"] = end
+                else:
+                    db.seek(offset)
+                    columns = ColumnarMatches()
+                    for record in db:
+                        if record.strip():
+                            columns.append(json.loads(record))
+                        _fold_record(snapshot, record, None)
+
+                    profiling.count("log records read", len(columns))
+                    if len(columns) >= ENGINE_MIN_RECORDS:
+                        merge_standings(snapshot["teams"], compute_standings(columns))
+                    elif columns:
+                        merge_standings(
+                            snapshot["teams"],
+                            standings_from_rows(columns.teams, columns.rows()),
+                        )
+        except json.JSONDecodeError:
+            return StandingsResponse({}, JSON_ERROR)
+        except (OSError, OverflowError):
+            # OverflowError: goals that don't fit in 64 bits, see ColumnarMatches
+            return StandingsResponse({}, DB_READ_ERROR)
+
+        if stale or snapshot["offset"] != offset:
+            self._save_snapshot(snapshot)
+
+        return StandingsResponse(snapshot["teams"], SUCCESS)
+
+    def _is_snapshot_of(self, snapshot: Dict[str, Any]) -> bool:
+        """Check that the snapshot, or the watermark of the team index, was
+        taken of the log as it is: any change made without updating them,
+        e.g. by hand, changes the file_signature of the log."""
+        signature = snapshot["signature"]
+        return signature is not None and signature == self._log_signature()
+
+    def _log_signature(self) -> Optional[List[int]]:
+        """file_signature of the log as a list, like it is read from JSON."""
+        from ranking.read_cache import file_signature
+
+        signature = file_signature(self._db_path)
+        return None if signature is None else list(signature)
+
+    def _add_to_team_index(self, entries, watermark: Dict[str, int]) -> None:
+        # Like the snapshot the index is a cache, if it can't be updated
+        # the next team query catches it up.
+        try:
+            self._team_index.add(entries, watermark)
+        except OSError:
+            pass
+
+    @profiling.timed()
+    def _load_snapshot(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self._snapshot_path.open("r") as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.keys() != _empty_snapshot().keys()
+        ):
+            return None
+
+        return snapshot
+
+    @profiling.timed()
+    def _save_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        # The snapshot is only a cache of the log, if it can't be saved
+        # it will be rebuilt by the next read, so it is not flushed to disk.
+        try:
+            replace_file(
+                self._snapshot_path,
+                [json.dumps(snapshot, separators=(",", ":")).encode()],
+                durable=False,
+            )
+        except OSError:
+            pass
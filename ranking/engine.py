@@ -0,0 +1,251 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from ranking import profiling
+from ranking.standings import DRAW_POINTS, STATS, WIN_POINTS
+
+_NOT_IMPORTED = object()
+
+# NumPy is optional and slow to import, it is imported on first use.
+np = _NOT_IMPORTED
+
+
+# Largest (team, goals for, goals against) histogram used by NumPy
+SCORE_HISTOGRAM_BINS = 1 << 22
+
+
+class ColumnarMatches:
+    """Matches stored as four compact columns of integers.
+
+    Team names are interned to integer ids, in order of first appearance,
+    so a match takes 16 bytes instead of two nested dicts.
+    """
+
+    def __init__(self) -> None:
+        self.teams: List[str] = []
+        self.team_ids: Dict[str, int] = {}
+        self.home_ids = array("I")
+        self.away_ids = array("I")
+        self.home_goals = array("I")
+        self.away_goals = array("I")
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Dict[str, Any]]) -> "ColumnarMatches":
+        """Build the columns from matches as stored in the Ranking database."""
+        columns = cls()
+        for match in matches:
+            columns.append(match)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.home_ids)
+
+    def team_id(self, name: str) -> int:
+        """Return the id of a team, interning its name the first time."""
+        team_id = self.team_ids.get(name)
+        if team_id is None:
+            team_id = self.team_ids[name] = len(self.teams)
+            self.teams.append(name)
+        return team_id
+
+    def append(self, match: Dict[str, Any]) -> None:
+        """Add a match as stored in the Ranking database."""
+        team_1 = match["team_1"]
+        team_2 = match["team_2"]
+        goals_1 = team_1["goals"]
+        goals_2 = team_2["goals"]
+        try:
+            self.home_goals.append(goals_1)
+            self.away_goals.append(goals_2)
+        except OverflowError:
+            # Goals that don't fit in uint32, written before the parser
+            # limited them, widen both columns to int64. Raises OverflowError
+            # again when they don't fit either.
+            del self.home_goals[len(self.away_goals) :]
+            self.home_goals = array("q", self.home_goals)
+            self.away_goals = array("q", self.away_goals)
+            self.home_goals.append(goals_1)
+            self.away_goals.append(goals_2)
+        self.home_ids.append(self.team_id(team_1["name"]))
+        self.away_ids.append(self.team_id(team_2["name"]))
+
+    def rows(self) -> Iterator[Tuple[int, int, int, int]]:
+        """Every match as the ids of both teams and their goals."""
+        return zip(self.home_ids, self.away_ids, self.home_goals, self.away_goals)
+
+
+@profiling.timed()
+def compute_standings(columns: ColumnarMatches) -> Dict[str, Dict[str, int]]:
+    """Calculate the aggregates of every team from the match columns.
+
+    Uses NumPy when it is installed and falls back to pure Python otherwise.
+    Both return exactly what ranking.standings.calculate_standings returns
+    for the same matches.
+
+    Args:
+        columns (ColumnarMatches): The matches
+
+    Returns:
+        Dict[str, Dict[str, int]]: Teams with their aggregates
+    """
+    return standings_from_columns(
+        columns.teams,
+        columns.home_ids,
+        columns.away_ids,
+        columns.home_goals,
+        columns.away_goals,
+    )
+
+
+@profiling.timed()
+def standings_from_columns(
+    teams: Sequence[str], home_ids, away_ids, home_goals, away_goals
+) -> Dict[str, Dict[str, int]]:
+    """Calculate the aggregates of every team from four columns of integers,
+    e.g. arrays, memoryviews or NumPy arrays, which are not copied when NumPy
+    can use them as they are.
+
+    Args:
+        teams (Sequence[str]): Name of every team id
+        home_ids: Id of the first team of every match
+        away_ids: Id of the second team of every match
+        home_goals: Goals of the first team of every match
+        away_goals: Goals of the second team of every match
+
+    Returns:
+        Dict[str, Dict[str, int]]: Teams with their aggregates
+    """
+    if _numpy() is not None:
+        return _numpy_standings(teams, home_ids, away_ids, home_goals, away_goals)
+
+    return standings_from_rows(teams, zip(home_ids, away_ids, home_goals, away_goals))
+
+
+@profiling.timed()
+def standings_from_rows(
+    teams: Sequence[str], rows: Iterable[Tuple[int, int, int, int]]
+) -> Dict[str, Dict[str, int]]:
+    """Calculate the aggregates of every team in pure Python.
+
+    Args:
+        teams (Sequence[str]): Name of every team id
+        rows (Iterable[Tuple[int, int, int, int]]): Every match as the ids of
+        both teams and their goals
+
+    Returns:
+        Dict[str, Dict[str, int]]: Teams with their aggregates
+    """
+    size = len(teams)
+    points, won, drawn, lost = [0] * size, [0] * size, [0] * size, [0] * size
+    goals_for, goals_against = [0] * size, [0] * size
+
+    for home, away, home_goals, away_goals in rows:
+        goals_for[home] += home_goals
+        goals_against[home] += away_goals
+        goals_for[away] += away_goals
+        goals_against[away] += home_goals
+
+        if home_goals > away_goals:
+            points[home] += WIN_POINTS
+            won[home] += 1
+            lost[away] += 1
+        elif home_goals < away_goals:
+            points[away] += WIN_POINTS
+            won[away] += 1
+            lost[home] += 1
+        else:
+            points[home] += DRAW_POINTS
+            points[away] += DRAW_POINTS
+            drawn[home] += 1
+            drawn[away] += 1
+
+    return _to_table(teams, points, won, drawn, lost, goals_for, goals_against)
+
+
+def _numpy():
+    """Return the numpy module, or None when it is not installed."""
+    global np
+    if np is _NOT_IMPORTED:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+
+def _to_table(teams: List[str], *stats: List[int]) -> Dict[str, Dict[str, int]]:
+    return {
+        team: dict(zip(STATS, team_stats)) for team, *team_stats in zip(teams, *stats)
+    }
+
+
+def _numpy_standings(
+    teams: Sequence[str], home_ids, away_ids, home_goals, away_goals
+) -> Dict[str, Dict[str, int]]:
+    size = len(teams)
+    home = np.asarray(home_ids).astype(np.intp)
+    away = np.asarray(away_ids).astype(np.intp)
+    home_goals = np.asarray(home_goals).astype(np.intp)
+    away_goals = np.asarray(away_goals).astype(np.intp)
+
+    if len(home):
+        scores = int(max(home_goals.max(), away_goals.max())) + 1
+    else:
+        scores = 1
+
+    if size * scores * scores <= max(SCORE_HISTOGRAM_BINS, len(home)):
+        stats = _score_histogram_stats(size, scores, home, away, home_goals, away_goals)
+    else:
+        stats = _bincount_stats(size, home, away, home_goals, away_goals)
+
+    won, drawn, lost, goals_for, goals_against = stats
+    points = WIN_POINTS * won + DRAW_POINTS * drawn
+
+    return _to_table(
+        teams,
+        *(
+            stats.tolist()
+            for stats in (points, won, drawn, lost, goals_for, goals_against)
+        ),
+    )
+
+
+def _score_histogram_stats(size, scores, home, away, home_goals, away_goals):
+    """Count every (team, goals for, goals against) combination with one
+    integer bincount per side, then get all the aggregates of each team with
+    a single matrix product over the possible scores."""
+    score = home_goals * scores + away_goals
+    # Scores seen by the away team are the transposed ones.
+    away_score = away_goals * scores + home_goals
+    histogram = np.bincount(
+        home * scores * scores + score, minlength=size * scores * scores
+    ) + np.bincount(
+        away * scores * scores + away_score, minlength=size * scores * scores
+    )
+
+    own, rival = np.divmod(np.arange(scores * scores), scores)
+    weights = np.stack([own > rival, own == rival, own < rival, own, rival], axis=1)
+
+    stats = histogram.reshape(size, scores * scores) @ weights.astype(np.int64)
+    return stats.T
+
+
+def _bincount_stats(size, home, away, home_goals, away_goals):
+    """Aggregates for leagues with too many teams or goals for the score
+    histogram, with one bincount over both sides of every match per stat."""
+    teams = np.concatenate([home, away])
+    # 0 for a win, 1 for a draw and 2 for a loss, from each side.
+    result = (home_goals < away_goals) * 2 + (home_goals == away_goals)
+    results = np.bincount(
+        teams * 3 + np.concatenate([result, 2 - result]), minlength=size * 3
+    ).reshape(size, 3)
+
+    # Float sums are exact far beyond any real number of goals.
+    goals_for = np.bincount(
+        teams, weights=np.concatenate([home_goals, away_goals]), minlength=size
+    ).astype(np.int64)
+    goals_against = np.bincount(
+        teams, weights=np.concatenate([away_goals, home_goals]), minlength=size
+    ).astype(np.int64)
+
+    return results[:, 0], results[:, 1], results[:, 2], goals_for, goals_against
@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ranking.database import replace_file
+from ranking.ranking import CSV_FORMAT, JSONL_FORMAT
+from ranking.standings import STATS
+
+ARROW_FORMAT = "arrow"
+PARQUET_FORMAT = "parquet"
+EXPORT_FORMATS = (CSV_FORMAT, JSONL_FORMAT, ARROW_FORMAT, PARQUET_FORMAT)
+# Written with pyarrow, when it is installed
+COLUMNAR_FORMATS = (ARROW_FORMAT, PARQUET_FORMAT)
+
+# Format of an export file by its suffix
+SUFFIX_FORMATS = {
+    ".csv": CSV_FORMAT,
+    ".jsonl": JSONL_FORMAT,
+    ".arrow": ARROW_FORMAT,
+    ".feather": ARROW_FORMAT,
+    ".parquet": PARQUET_FORMAT,
+}
+
+# The id of a match is its position in the database starting at 1, like in
+# all_matches
+MATCH_COLUMNS = ("id", "team_1", "goals_1", "team_2", "goals_2")
+STANDINGS_COLUMNS = ("rank", "team") + STATS
+
+# Rows read, encoded and written at once: a CSV chunk of about 2 MB, and a
+# record batch, or a Parquet row group, of each columnar file
+EXPORT_CHUNK_ROWS = 65_536
+
+_NOT_IMPORTED = object()
+pa = _NOT_IMPORTED
+
+
+class DatabaseReadError(OSError):
+    """The database failed while it was exported, unlike the export file."""
+
+
+def _pyarrow():
+    """Return the pyarrow module, or None when it is not installed."""
+    global pa
+    if pa is _NOT_IMPORTED:
+        try:
+            import pyarrow as pa
+        except ImportError:
+            pa = None
+    return pa
+
+
+def has_pyarrow() -> bool:
+    return _pyarrow() is not None
+
+
+def format_for_path(path: Optional[Path]) -> str:
+    """Return the export format of a file by its suffix, CSV for stdout and
+    unknown suffixes."""
+    if path is None:
+        return CSV_FORMAT
+    return SUFFIX_FORMATS.get(path.suffix.lower(), CSV_FORMAT)
+
+
+def reading(rows: Iterable[Tuple[Any, ...]]) -> Iterator[Tuple[Any, ...]]:
+    """Stream the rows read from the database, raising its errors as
+    DatabaseReadError so they are told apart from those of the export file.
+    """
+    try:
+        yield from rows
+    except OSError as error:
+        raise DatabaseReadError(*error.args) from error
+
+
+def export_rows(
+    rows: Iterable[Tuple[Any, ...]],
+    columns: Sequence[str],
+    format: str,
+    output: Optional[Path] = None,
+) -> None:
+    """Write rows in an export file, or in stdout, in chunks of
+    EXPORT_CHUNK_ROWS: the memory used is the same whatever the number of
+    rows.
+
+    The file is replaced atomically once complete, so a job reading it never
+    sees half an export.
+
+    Args:
+        rows (Iterable[Tuple[Any, ...]]): The values of every row, in the
+        order of ``columns``
+        columns (Sequence[str]): MATCH_COLUMNS or STANDINGS_COLUMNS
+        format (str): One of EXPORT_FORMATS. arrow and parquet need pyarrow.
+        output (Path, optional): The export file. Defaults to None, stdout.
+
+    Raises:
+        DatabaseReadError: The database can't be read
+        ValueError: A match in the database is not valid
+        OSError: The export file can't be written
+    """
+    chunks = _encode_chunks(rows, columns, format)
+    if output is not None:
+        replace_file(output, chunks)
+        return
+
+    stdout = sys.stdout.buffer
+    for chunk in chunks:
+        stdout.write(chunk)
+    stdout.flush()
+
+
+def _encode_chunks(
+    rows: Iterable[Tuple[Any, ...]], columns: Sequence[str], format: str
+) -> Iterator[bytes]:
+    rows = iter(rows)
+    batches = iter(lambda: list(islice(rows, EXPORT_CHUNK_ROWS)), [])
+
+    if format == CSV_FORMAT:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+    elif format == JSONL_FORMAT:
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        for batch in batches:
+            yield "".join(
+                encode(dict(zip(columns, row))) + "\n" for row in batch
+            ).encode()
+    else:
+        yield from _columnar_chunks(batches, columns, format)
+
+
+class _ChunkSink(io.RawIOBase):
+    """File for pyarrow writers that keeps what they write until it is
+    taken, counting the bytes written for their offsets."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks = []
+        return chunk
+
+
+def _columnar_chunks(
+    batches: Iterable[List[Tuple[Any, ...]]], columns: Sequence[str], format: str
+) -> Iterator[bytes]:
+    pa = _pyarrow()
+    schema = pa.schema(
+        [
+            (column, pa.string() if column.startswith("team") else pa.int64())
+            for column in columns
+        ]
+    )
+
+    sink = _ChunkSink()
+    if format == PARQUET_FORMAT:
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema)
+
+    for batch in batches:
+        record_batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(values, field.type)
+                for values, field in zip(zip(*batch), schema)
+            ],
+            schema=schema,
+        )
+        if format == PARQUET_FORMAT:
+            # A row group per batch
+            writer.write_table(pa.Table.from_batches([record_batch]))
+        else:
+            writer.write_batch(record_batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
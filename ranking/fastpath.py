@@ -0,0 +1,114 @@
+import sys
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from ranking import ERRORS, __app_name__, __version__
+
+CONFIG_NOT_FOUND = "Config file not found. Please, run 'ranking init' command"
+DATABASE_NOT_FOUND = "Ranking database not found. Please, run 'ranking init' command"
+
+ANSI_COLORS = {"red": 31, "green": 32, "yellow": 33, "blue": 34}
+
+
+def secho(message: str, fg: Optional[str] = None, err: bool = False) -> None:
+    """Print a message like ``typer.secho``, colored only on a terminal."""
+    stream = sys.stderr if err else sys.stdout
+    if fg and stream.isatty():
+        message = f"\033[{ANSI_COLORS[fg]}m{message}\033[0m"
+    stream.write(f"{message}\n")
+
+
+def find_database() -> Tuple[Optional[Path], Optional[str], Optional[str]]:
+    """Read the config file to find the Ranking database.
+
+    Returns:
+        Tuple[Optional[Path], Optional[str], Optional[str]]: The database path
+        and backend, or the error message when it can't be found.
+    """
+    from ranking import config, database
+
+    if not config.CONFIG_DIR_PATH.exists():
+        return None, None, CONFIG_NOT_FOUND
+
+    db_path = database.get_database_path(config.CONFIG_FILE_PATH)
+    if not db_path.exists():
+        return None, None, DATABASE_NOT_FOUND
+
+    return db_path, database.get_database_backend(config.CONFIG_FILE_PATH), None
+
+
+def add(
+    match: str,
+    echo: Callable[..., None] = secho,
+    league: Optional[str] = None,
+    season: Optional[str] = None,
+) -> int:
+    """Add a new match into Ranking database, through the Ranking daemon
+    when it is running.
+
+    Args:
+        match (str): The two teams with their goals. Example: Lions 3, Snakes 3
+        echo (Callable[..., None], optional): Prints the messages. Defaults
+        to secho, the CLI passes typer.secho.
+        league (str, optional): League of the match. Defaults to None.
+        season (str, optional): Season of the match. Defaults to None.
+
+    Returns:
+        int: The exit code
+    """
+    from ranking import client
+
+    # The daemon only serves the main database
+    partitioned = league is not None or season is not None
+    response = (
+        None if partitioned else client.request({"command": "add", "match": match})
+    )
+
+    if response is not None:
+        match_added, error = response["result"], response["error"]
+    else:
+        db_path, backend, message = find_database()
+        if message:
+            echo(message, fg="red")
+            return 1
+
+        from ranking import database
+        from ranking.ranking import RankingController
+
+        db_path, error = database.create_partition(db_path, league, season, backend)
+        if error:
+            echo(f"Adding match failed with error: '{ERRORS[error]}'", fg="red")
+            return 1
+
+        match_added, error = RankingController(db_path, backend=backend).add(match)
+
+    if error:
+        echo(
+            f"Adding match '{match_added}' failed with error: '{ERRORS[error]}'",
+            fg="red",
+        )
+        return 1
+
+    echo("Match was added succesfully", fg="green")
+    return 0
+
+
+def main(args: List[str]) -> Optional[int]:
+    """Run ``--version`` and ``add`` without importing typer, click and the
+    rest of the CLI, which is most of the startup time of the application.
+
+    Args:
+        args (List[str]): The command line arguments
+
+    Returns:
+        Optional[int]: The exit code, or None when the arguments need the
+        full CLI.
+    """
+    if args in (["--version"], ["-v"]):
+        secho(f"{__app_name__} v{__version__}")
+        return 0
+
+    if len(args) == 2 and args[0] == "add" and not args[1].startswith("-"):
+        return add(args[1])
+
+    return None
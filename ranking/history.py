@@ -0,0 +1,254 @@
+import json
+from contextlib import closing
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from ranking.database import (
+    BaseDatabaseHandler,
+    database_signature,
+    lock_database,
+    replace_file,
+    sidecar_path,
+)
+from ranking.standings import apply_match
+from ranking.tiebreakers import TIE_BREAKERS
+
+# Matches between two checkpoints of the standings
+CHECKPOINT_INTERVAL = 10_000
+
+Result = TypeVar("Result")
+
+
+class RankPoint(NamedTuple):
+    match: int
+    rank: int
+    points: int
+
+
+class Checkpoints:
+    """Standings of the league after every CHECKPOINT_INTERVAL matches.
+
+    Checkpoints are kept next to the Ranking database, e.g.
+    ``ranking_db.checkpoints.json``, so the standings as of any match are
+    calculated replaying only the matches after the nearest checkpoint.
+    The checkpoints remember the database_signature of the database, they
+    are kept by the adds and imports made through ``add``, which only append
+    matches after them, and dropped when the database was changed some other
+    way, e.g. cleaned, rewritten or edited by hand.
+
+    Like the standings snapshot, checkpoints are a cache: they are added
+    while the matches are replayed and rebuilt when they are missing.
+    """
+
+    def __init__(self, db_path: Path, interval: Optional[int] = None) -> None:
+        self._db_path = db_path
+        self._path = sidecar_path(db_path, "checkpoints.json")
+        self._interval = interval or CHECKPOINT_INTERVAL
+
+    def load(self, signature: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """Return the checkpoints in order, each one with the number of
+        matches it folded as "count" and the standings as "teams".
+
+        Args:
+            signature (List[Any], optional): database_signature of the
+            database, taken before reading it. Defaults to the current one.
+        """
+        try:
+            with self._path.open("r") as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return []
+
+        if signature is None:
+            signature = database_signature(self._db_path)
+        if (
+            not isinstance(saved, dict)
+            or saved.get("interval") != self._interval
+            or saved.get("signature") != signature
+        ):
+            return []
+
+        return saved["checkpoints"]
+
+    def save(self, checkpoints: List[Dict[str, Any]], signature: List[Any]) -> None:
+        # Only a cache, it is rebuilt by the next query if it can't be saved
+        try:
+            replace_file(
+                self._path,
+                [
+                    json.dumps(
+                        {
+                            "interval": self._interval,
+                            "signature": signature,
+                            "checkpoints": checkpoints,
+                        },
+                        separators=(",", ":"),
+                    ).encode()
+                ],
+                durable=False,
+            )
+        except OSError:
+            pass
+
+    def add(self, append: Callable[[], Result]) -> Result:
+        """Run ``append``, which adds matches at the end of the database,
+        keeping the checkpoints when they were up to date: the matches they
+        folded are still the same.
+
+        Args:
+            append (Callable[[], Result]): Adds the matches, returns a
+            response with an ``error``
+
+        Returns:
+            Result: What ``append`` returned
+        """
+        with lock_database(self._path):
+            signature = database_signature(self._db_path)
+            checkpoints = self.load(signature)
+            result = append()
+
+            if checkpoints and not result.error:
+                self.save(checkpoints, database_signature(self._db_path))
+
+        return result
+
+    def clear(self) -> None:
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def standings_as_of(
+        self, handler: BaseDatabaseHandler, count: int
+    ) -> Dict[str, Dict[str, int]]:
+        """Return the standings after the first ``count`` matches.
+
+        Starts from the nearest checkpoint before them, and adds the
+        checkpoints found on the way. The checkpoints are locked meanwhile,
+        like by ``add``.
+
+        Args:
+            handler (BaseDatabaseHandler): The Ranking database
+            count (int): Matches folded, the id of the last one
+
+        Raises:
+            OSError: The database can't be read
+            ValueError: The database is not in the format of its backend
+
+        Returns:
+            Dict[str, Dict[str, int]]: Teams with their aggregates
+        """
+        with lock_database(self._path):
+            # Taken before reading, matches added meanwhile, not through add,
+            # drop the checkpoints
+            signature = database_signature(self._db_path)
+            checkpoints = self.load(signature)
+            changed = False
+
+            usable = [
+                checkpoint for checkpoint in checkpoints if checkpoint["count"] <= count
+            ]
+
+            if usable:
+                start = usable[-1]["count"]
+                table = {
+                    team: dict(stats) for team, stats in usable[-1]["teams"].items()
+                }
+            else:
+                start, table = 0, {}
+
+            last_checkpoint = checkpoints[-1]["count"] if checkpoints else 0
+            with closing(handler.iter_matches_from(start)) as matches:
+                for position, match in enumerate(
+                    islice(matches, count - start), start + 1
+                ):
+                    apply_match(table, match)
+                    if position % self._interval == 0 and position > last_checkpoint:
+                        checkpoints.append(
+                            {
+                                "count": position,
+                                "teams": {
+                                    team: dict(stats) for team, stats in table.items()
+                                },
+                            }
+                        )
+                        last_checkpoint = position
+                        changed = True
+
+            if changed:
+                self.save(checkpoints, signature)
+
+            return table
+
+
+def rank_history(
+    matches: Iterable[Dict[str, Any]],
+    team: str,
+    tie_breakers: Sequence[str] = (),
+) -> List[RankPoint]:
+    """Return the rank of a team after every match that changed its rank or
+    its points, in a single pass over the matches.
+
+    Only the teams of each match change their points, so the number of
+    teams ranked above ``team`` is updated comparing just those two. It is
+    counted again from the whole table only after the matches of ``team``.
+
+    Args:
+        matches (Iterable[Dict[str, Any]]): All the matches, in order
+        team (str): Name of the team
+        tie_breakers (Sequence[str], optional): Tie-breakers computed from
+        the aggregates of each team, see tiebreakers.TIE_BREAKERS.
+        Head-to-head is not supported. Defaults to ().
+
+    Raises:
+        KeyError: A tie-breaker is not supported
+
+    Returns:
+        List[RankPoint]: The id of the match, the rank and the points of
+        the team after it.
+    """
+    keys = [TIE_BREAKERS[name] for name in tie_breakers]
+
+    def rank_key(name: str, stats: Dict[str, int]):
+        return (-stats["points"], *(-key(stats) for key in keys), name)
+
+    table: Dict[str, Dict[str, int]] = {}
+    # Current sort key of every team, only those of the match change
+    rank_keys: Dict[str, tuple] = {}
+    history: List[RankPoint] = []
+    team_key: Optional[tuple] = None
+    ahead = 0
+
+    for id, match in enumerate(matches, 1):
+        names = (match["team_1"]["name"], match["team_2"]["name"])
+        apply_match(table, match)
+        if team_key is not None and team not in names:
+            for name in names:
+                before = rank_keys.get(name)
+                rank_keys[name] = rank_key(name, table[name])
+                ahead += (rank_keys[name] < team_key) - (
+                    before is not None and before < team_key
+                )
+        else:
+            for name in names:
+                rank_keys[name] = rank_key(name, table[name])
+            if team not in names:
+                continue
+            team_key = rank_keys[team]
+            ahead = sum(key < team_key for key in rank_keys.values())
+
+        if team in names or history[-1].rank != ahead + 1:
+            history.append(RankPoint(id, ahead + 1, table[team]["points"]))
+
+    return history
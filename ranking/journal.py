@@ -0,0 +1,167 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from ranking.database import replace_file, repair_torn_record, sidecar_path
+
+# Journal bytes that trigger a compaction, about 15,000 matches
+JOURNAL_COMPACT_BYTES = 1 << 20
+# More matches than this in a single write, e.g. an import, go straight to
+# the database
+JOURNAL_MAX_BATCH = 100
+
+ADD_OPERATION = "add"
+REPLACE_OPERATION = "replace"
+
+
+class JournalState(NamedTuple):
+    """What a journal holds on top of the database.
+
+    Args:
+        base (Dict[str, Any]): The state of the database when the journal
+        was started, as given to Journal.start
+        replaced (bool): A replace (e.g. a clean) is journaled, the matches
+        of the database are dropped
+        matches (List[Dict[str, Any]]): The matches to append, after the
+        last replace
+    """
+
+    base: Dict[str, Any]
+    replaced: bool
+    matches: List[Dict[str, Any]]
+
+
+class Journal:
+    """Write-ahead journal kept next to a Ranking database, e.g.
+    ``ranking_db.journal``, with the writes not folded into it yet.
+
+    The first line describes the database the journal applies to, every
+    other line is an operation: ``{"add": [...]}`` or ``{"replace": [...]}``.
+    Operations are appended and flushed to disk before the write returns, so
+    a write costs one small append whatever the size of the database. A
+    compaction folds them into the database, flushes it, and removes the
+    journal. A crash in between leaves the journal, which is folded again on
+    top of the database as described by its first line.
+
+    The journal is used with the database lock held.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._path = sidecar_path(db_path, "journal")
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def size(self) -> int:
+        try:
+            return self._path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def read(self) -> Optional[JournalState]:
+        """Read the operations journaled, None when there is no journal.
+
+        A last operation cut by a crash was never acknowledged and is
+        ignored.
+
+        Returns:
+            Optional[JournalState]: The journaled operations
+
+        Raises:
+            OSError: The journal can't be read
+            ValueError: The journal is corrupted
+        """
+        try:
+            with self._path.open("rb") as file:
+                lines = file.read().split(b"\n")
+        except FileNotFoundError:
+            return None
+
+        # Like repair_torn_record, a last line cut by a crash is dropped
+        # unless it is complete
+        tail = lines.pop()
+        if tail:
+            try:
+                json.loads(tail)
+            except ValueError:
+                pass
+            else:
+                lines.append(tail)
+        if not lines:
+            return None
+
+        try:
+            base = json.loads(lines[0])["base"]
+            replaced = False
+            matches: List[Dict[str, Any]] = []
+            for line in lines[1:]:
+                operation = json.loads(line)
+                if REPLACE_OPERATION in operation:
+                    replaced = True
+                    matches = list(operation[REPLACE_OPERATION])
+                else:
+                    matches.extend(operation[ADD_OPERATION])
+        except (KeyError, TypeError) as error:
+            raise ValueError("Not a Ranking journal") from error
+
+        return JournalState(base, replaced, matches)
+
+    def base(self) -> Optional[Dict[str, Any]]:
+        """Read only the first line of the journal, the state of the
+        database it applies to. None when there is no journal.
+
+        Raises:
+            OSError: The journal can't be read
+            ValueError: The journal is corrupted
+        """
+        try:
+            with self._path.open("rb") as file:
+                line = file.readline()
+        except FileNotFoundError:
+            return None
+
+        try:
+            return json.loads(line)["base"]
+        except (KeyError, TypeError) as error:
+            raise ValueError("Not a Ranking journal") from error
+
+    def start(self, base: Dict[str, Any]) -> None:
+        """Create the journal for the database in the state ``base``.
+
+        Raises:
+            OSError: The journal can't be written
+        """
+        replace_file(self._path, [_dump({"base": base})])
+
+    def append(self, operation: str, matches: Iterable[Dict[str, Any]]) -> None:
+        """Journal an operation and flush it to disk.
+
+        Args:
+            operation (str): ADD_OPERATION or REPLACE_OPERATION
+            matches (Iterable[Dict[str, Any]]): The matches of the operation
+
+        Raises:
+            OSError: The journal can't be written
+        """
+        with self._path.open("r+b") as file:
+            repair_torn_record(file)
+            file.seek(0, os.SEEK_END)
+            file.write(_dump({operation: list(matches)}))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def clear(self) -> None:
+        """Remove the journal, once its operations are in the database.
+
+        Raises:
+            OSError: The journal can't be removed
+        """
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _dump(line: Dict[str, Any]) -> bytes:
+    return (json.dumps(line, separators=(",", ":")) + "\n").encode()
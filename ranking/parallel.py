@@ -0,0 +1,57 @@
+from functools import reduce
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from ranking.standings import merge_standings
+
+# Smallest shard worth sending to another process, in matches
+MIN_SHARD_MATCHES = 50_000
+# Bytes of a JSON Lines shard, about MIN_SHARD_MATCHES matches
+MIN_SHARD_BYTES = 4 << 20
+
+
+def split(
+    start: int, stop: int, shards: int, min_size: int = 1
+) -> List[Tuple[int, int]]:
+    """Split the range [start, stop) into at most ``shards`` contiguous
+    ranges of about the same size, none smaller than ``min_size`` unless
+    there is only one.
+
+    Example: ``split(0, 10, 3)`` is ``[(0, 3), (3, 6), (6, 10)]``.
+    """
+    size = stop - start
+    shards = max(1, min(shards, size // max(min_size, 1)))
+    bounds = [start + size * shard // shards for shard in range(shards + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def sharded_standings(
+    worker: Callable[[Any], Dict[str, Dict[str, int]]],
+    tasks: Sequence[Any],
+    workers: int,
+) -> Dict[str, Dict[str, int]]:
+    """Calculate the standings of every shard in a pool of processes and
+    merge them.
+
+    The tasks only say where the matches of a shard are, e.g. the path of
+    the database and a range of bytes, and every worker reads them from the
+    file itself, so no match is pickled. Merging standings is associative,
+    so the result is the same as calculating them in a single pass.
+
+    Args:
+        worker (Callable[[Any], Dict[str, Dict[str, int]]]): Calculates the
+        standings of a shard, a module level function so it can be pickled
+        tasks (Sequence[Any]): The shards
+        workers (int): Processes of the pool
+
+    Returns:
+        Dict[str, Dict[str, int]]: Teams with their aggregates
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        tables = map(worker, tasks)
+        return reduce(merge_standings, tables, {})
+
+    # Slow to import, only needed with several workers
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(min(workers, len(tasks))) as executor:
+        return reduce(merge_standings, executor.map(worker, tasks), {})
@@ -0,0 +1,156 @@
+import re
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+from ranking import (
+    GOALS_ERROR,
+    MISSING_TEAM_ERROR,
+    NO_SCORE_ERROR,
+    SAME_TEAM_ERROR,
+    SUCCESS,
+)
+
+# "Lions 2, Snakes 3": a name, its goals, a comma, the other name and goals.
+# Names can't have commas, so a line with three teams doesn't match. Names
+# start and end with a character that is neither a space nor a comma.
+MATCH_LINE = re.compile(
+    r"\s*([^,\s](?:[^,]*[^,\s])?)\s+(\d+)\s*,\s*([^,\s](?:[^,]*[^,\s])?)\s+(\d+)\s*"
+)
+# Most goals of a team in a match, what every backend stores: the binary one
+# keeps them as uint16
+MAX_GOALS = 65_535
+# Names kept by normalize_name, forgotten all at once when it is full
+MAX_CACHED_NAMES = 100_000
+
+# Raw name as written in a line -> normalized and interned name
+_names: Dict[str, str] = {}
+
+
+class CurrentMatch(NamedTuple):
+    match: Dict[str, Any]
+    error: int
+
+
+class LineError(NamedTuple):
+    line_number: int
+    line: str
+    error: int
+
+
+class ParsedLines(NamedTuple):
+    matches: List[Dict[str, Any]]
+    errors: List[LineError]
+
+
+def normalize_name(name: str) -> str:
+    """Return the name of a team with every run of whitespace as a single
+    space, interned so all the matches of a team share one string.
+
+    Example: ``normalize_name(" FC  Lions ")`` is ``"FC Lions"``.
+    """
+    normalized = _names.get(name)
+    if normalized is None:
+        if len(_names) >= MAX_CACHED_NAMES:
+            _names.clear()
+        normalized = _names[name] = sys.intern(" ".join(name.split()))
+    return normalized
+
+
+def parse_match(match: str) -> CurrentMatch:
+    """Parse a match written as the name of both teams alongside their
+    score, separated by a comma. Example: Lions 2, Snakes 3
+
+    Args:
+        match (str): The match
+
+    Returns:
+        CurrentMatch: The match as stored in the Ranking database, or the
+        original string when it is not valid.
+    """
+    parsed = MATCH_LINE.fullmatch(match)
+    if parsed is None:
+        return CurrentMatch(match, _match_error(match))
+
+    name_1, goals_1, name_2, goals_2 = parsed.groups()
+    team_1_name = normalize_name(name_1)
+    team_2_name = normalize_name(name_2)
+
+    if team_1_name == team_2_name:
+        return CurrentMatch(match, SAME_TEAM_ERROR)
+
+    goals_1, goals_2 = int(goals_1), int(goals_2)
+    if goals_1 > MAX_GOALS or goals_2 > MAX_GOALS:
+        return CurrentMatch(match, GOALS_ERROR)
+
+    return CurrentMatch(
+        {
+            "team_1": {"name": team_1_name, "goals": goals_1},
+            "team_2": {"name": team_2_name, "goals": goals_2},
+        },
+        SUCCESS,
+    )
+
+
+def parse_many(lines: Iterable[str], start: int = 1) -> ParsedLines:
+    """Parse a batch of matches, one per line, with the same rules as
+    ``parse_match``.
+
+    Blank lines are skipped, invalid lines are reported and don't stop the
+    batch.
+
+    Args:
+        lines (Iterable[str]): The matches, with or without their line break
+        start (int, optional): Number of the first line. Defaults to 1.
+
+    Returns:
+        ParsedLines: The valid matches, in order, and the number, the text
+        and the error of every invalid line.
+    """
+    matches = []
+    errors = []
+    fullmatch = MATCH_LINE.fullmatch
+    names = _names
+
+    for line_number, line in enumerate(lines, start):
+        parsed = fullmatch(line)
+        if parsed is None:
+            if line and not line.isspace():
+                line = line.rstrip("\r\n")
+                errors.append(LineError(line_number, line, _match_error(line)))
+            continue
+
+        name_1, goals_1, name_2, goals_2 = parsed.groups()
+        team_1_name = names.get(name_1) or normalize_name(name_1)
+        team_2_name = names.get(name_2) or normalize_name(name_2)
+
+        if team_1_name == team_2_name:
+            errors.append(LineError(line_number, line.rstrip("\r\n"), SAME_TEAM_ERROR))
+            continue
+
+        goals_1, goals_2 = int(goals_1), int(goals_2)
+        if goals_1 > MAX_GOALS or goals_2 > MAX_GOALS:
+            errors.append(LineError(line_number, line.rstrip("\r\n"), GOALS_ERROR))
+            continue
+
+        matches.append(
+            {
+                "team_1": {"name": team_1_name, "goals": goals_1},
+                "team_2": {"name": team_2_name, "goals": goals_2},
+            }
+        )
+
+    return ParsedLines(matches, errors)
+
+
+def _match_error(match: str) -> int:
+    """Tell why a line is not a match, it only runs for invalid lines."""
+    teams = match.split(",")
+    if len(teams) != 2:
+        return MISSING_TEAM_ERROR
+
+    for team in teams:
+        # A blank team, or a score without the name of its team
+        if not team.strip() or team.strip().isdecimal():
+            return MISSING_TEAM_ERROR
+
+    return NO_SCORE_ERROR
@@ -0,0 +1,162 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# inspect.CO_GENERATOR, inspect itself is slow to import
+CO_GENERATOR = 0x20
+
+# Off by default, so the instrumented functions only pay for one check
+_enabled = False
+_started = 0.0
+# Calls and seconds of every phase
+_phases: Dict[str, List[float]] = {}
+_counters: Dict[str, int] = {}
+
+
+def enable() -> None:
+    """Start collecting timings and counters, forgetting the previous ones."""
+    global _enabled, _started
+    _phases.clear()
+    _counters.clear()
+    _started = time.perf_counter()
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop collecting, what was collected is kept for ``report``."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _record(name: str, seconds: float) -> None:
+    phase = _phases.get(name)
+    if phase is None:
+        phase = _phases[name] = [0, 0.0]
+    phase[0] += 1
+    phase[1] += seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block of code as the phase ``name``.
+
+    Example: ``with profiling.phase("render"): ...``
+    """
+    if not _enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add ``value`` to the counter ``name``."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorate a function to time its calls as a phase, named after the
+    function unless ``name`` is given.
+
+    For generator functions the phase is the time spent producing the
+    items, not the time the caller spends using them, and the items are
+    counted in the "<name> items" counter.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        phase_name = name or function.__qualname__
+
+        if function.__code__.co_flags & CO_GENERATOR:
+
+            @wraps(function)
+            def generator_wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+                if not _enabled:
+                    return function(*args, **kwargs)
+                return _timed_items(phase_name, function(*args, **kwargs))
+
+            return generator_wrapper
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _record(phase_name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def _timed_items(name: str, items: Iterator[Any]) -> Iterator[Any]:
+    seconds = 0.0
+    produced = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            produced += 1
+            yield item
+    finally:
+        items.close()
+        _record(name, seconds)
+        count(f"{name} items", produced)
+
+
+def report() -> Dict[str, Any]:
+    """Return what was collected since ``enable``.
+
+    Phases can be nested, e.g. RankingController.show_table_ranking
+    includes DatabaseHandler.read_standings, so their seconds don't add up
+    to the total.
+
+    Returns:
+        Dict[str, Any]: The seconds since ``enable`` as "total", the calls
+        and seconds of every phase, slowest first, and the counters.
+    """
+    return {
+        "total": time.perf_counter() - _started,
+        "phases": {
+            name: {"calls": calls, "seconds": seconds}
+            for name, (calls, seconds) in sorted(
+                _phases.items(), key=lambda phase: -phase[1][1]
+            )
+        },
+        "counters": dict(_counters),
+    }
+
+
+def format_report(profile: Dict[str, Any]) -> List[str]:
+    """Lay out a report as a table, one line per phase and counter."""
+    width = max(
+        [len("total"), *map(len, profile["phases"]), *map(len, profile["counters"])]
+    )
+    lines = [f"{'Phase'.ljust(width)}  {'Calls':>7}  {'ms':>10}"]
+    for name, phase in profile["phases"].items():
+        lines.append(
+            f"{name.ljust(width)}  {phase['calls']:>7}  "
+            f"{phase['seconds'] * 1000:>10.3f}"
+        )
+    lines.append(f"{'total'.ljust(width)}  {'':>7}  {profile['total'] * 1000:>10.3f}")
+    for name, value in profile["counters"].items():
+        lines.append(f"{name.ljust(width)}  {value:>7}")
+    return lines
@@ -1,19 +1,52 @@
-from operator import itemgetter
-from typing import Any, Dict, List, NamedTuple, Tuple
+import json
+from contextlib import closing
+from itertools import count, islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from pathlib import Path
 from ranking import (
     DB_READ_ERROR,
-    MISSING_TEAM_ERROR,
-    NO_SCORE_ERROR,
+    ENCODING_ERROR,
+    EXPORT_DEPENDENCY_ERROR,
+    EXPORT_ERROR,
+    EXPORT_FORMAT_ERROR,
+    GOAL_MODEL_ERROR,
+    JSON_ERROR,
     SAME_TEAM_ERROR,
     SUCCESS,
+    TIE_BREAKER_ERROR,
+    profiling,
 )
-from ranking.database import DatabaseHandler
-
+from ranking.database import (
+    Partition,
+    get_database_handler,
+    list_partitions,
+    sidecar_path,
+)
+from ranking.parser import (
+    CurrentMatch,
+    LineError,
+    normalize_name,
+    parse_many,
+    parse_match,
+)
+from ranking.records import Match
+from ranking.standings import calculate_standings
+from ranking.tiebreakers import HEAD_TO_HEAD, is_tie_breaker, sort_standings
 
-class CurrentMatch(NamedTuple):
-    match: Dict[str, Any]
-    error: int
+# history, ratings, simulation and export are imported by the methods that
+# use them, to keep the startup of add fast
 
 
 class CurrentMatches(NamedTuple):
@@ -21,15 +54,127 @@ class CurrentMatches(NamedTuple):
     error: int
 
 
+class CurrentIndexedMatches(NamedTuple):
+    # (id, match) of every match, the id is its position in the database
+    # starting at 1, like in all_matches
+    match: List[Tuple[int, Dict[str, Any]]]
+    error: int
+
+
 class CurrentRank(NamedTuple):
     table: Dict[str, int]
     error: int
 
 
+class CurrentStandings(NamedTuple):
+    table: Dict[str, Dict[str, int]]
+    error: int
+
+
+class CurrentHistory(NamedTuple):
+    # history.RankPoint of every match: its id, the rank and the points
+    history: List[Tuple[int, int, int]]
+    error: int
+
+
+class CurrentRatings(NamedTuple):
+    # Team -> rating, the highest rated first
+    table: Dict[str, float]
+    error: int
+
+
+class CurrentSimulation(NamedTuple):
+    # simulation.Projection of every team, by expected final position
+    projections: List[Any]
+    error: int
+
+
+class CurrentExport(NamedTuple):
+    exported: int
+    # Id of the last match exported, the ``since`` of the next incremental
+    # export
+    marker: int
+    error: int
+
+
+class CurrentImport(NamedTuple):
+    imported: int
+    errors: List[LineError]
+    error: int
+
+
+TEXT_FORMAT = "text"
+CSV_FORMAT = "csv"
+JSONL_FORMAT = "jsonl"
+TABLE_FORMAT = "table"
+IMPORT_FORMATS = (TEXT_FORMAT, CSV_FORMAT, JSONL_FORMAT)
+OUTPUT_FORMATS = (TABLE_FORMAT, CSV_FORMAT, JSONL_FORMAT)
+CSV_HEADER = ("team_1", "goals_1", "team_2", "goals_2")
+
+# Lines parsed at once by RankingController.import_matches
+IMPORT_BATCH_SIZE = 10000
+
+
+def _to_match_line(line: str, format: str) -> str:
+    """Convert a CSV or JSON Lines record into the "Lions 3, Snakes 3" format,
+    so every import format is validated by parser.parse_many.
+
+    CSV rows have the columns of CSV_HEADER, or a single "Lions 3, Snakes 3"
+    match. JSON Lines records are stored matches or match strings.
+
+    Raises:
+        ValueError: The JSON record is not valid
+    """
+    if format == CSV_FORMAT:
+        import csv
+
+        fields = [field.strip() for field in next(csv.reader([line]), [])]
+        if len(fields) == len(CSV_HEADER):
+            return f"{fields[0]} {fields[1]}, {fields[2]} {fields[3]}"
+        return ", ".join(fields)
+
+    if format == JSONL_FORMAT:
+        record = json.loads(line)
+        if isinstance(record, str):
+            return record
+        try:
+            team_1 = record["team_1"]
+            team_2 = record["team_2"]
+            return (
+                f"{team_1['name']} {team_1['goals']}, "
+                f"{team_2['name']} {team_2['goals']}"
+            )
+        except (KeyError, TypeError) as error:
+            raise ValueError("Not a match record") from error
+
+    return line
+
+
 class RankingController:
-    def __init__(self, db_path: Path) -> None:
-        self._db_handler = DatabaseHandler(db_path)
+    def __init__(
+        self,
+        db_path: Path,
+        tie_breakers: Sequence[str] = (),
+        backend: Optional[str] = None,
+        cache_size: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            db_path (Path): Path to the Ranking database
+            tie_breakers (Sequence[str], optional): Tie-breakers applied, in
+            order, to teams with the same points before ordering them by
+            name. See ranking.tiebreakers. Defaults to ().
+            backend (str, optional): Database backend, "json" or "sqlite".
+            Defaults to the one matching the database file extension.
+            cache_size (int, optional): Bytes of matches and standings the
+            JSON backend keeps in memory between reads, 0 disables it.
+            Defaults to read_cache.READ_CACHE_SIZE.
+        """
+        self._db_handler = get_database_handler(db_path, backend, cache_size)
+        self._tie_breakers = tuple(tie_breakers)
+        self._db_path = db_path
 
+    @profiling.timed()
     def add(self, match: str) -> CurrentMatch:
         """Adds a new match to the Ranking database.
 
@@ -41,44 +186,104 @@ class RankingController:
         Returns:
             CurrentMatch: A match object
         """
-        teams = match.split(",")
-        team_1 = teams[0].strip()
-        team_2 = teams[1].strip()
+        match, error = parse_match(match)
 
-        if not team_1 or not team_2:
-            return CurrentMatch(match, MISSING_TEAM_ERROR)
+        if error:
+            return CurrentMatch(match, error)
 
-        team_1_values = team_1.split(" ")
-        team_2_values = team_2.split(" ")
+        write = self._append(
+            lambda: self._db_handler.append_match(match), Match.from_dict(match)
+        )
 
-        team_1_score = team_1_values.pop()
-        team_2_score = team_2_values.pop()
-
-        if not team_1_score.isnumeric() or not team_2_score.isnumeric():
-            return CurrentMatch(match, NO_SCORE_ERROR)
-
-        team_1_name = " ".join(team_1_values)
-        team_2_name = " ".join(team_2_values)
-
-        if team_1_name == team_2_name:
-            return CurrentMatch(match, SAME_TEAM_ERROR)
-
-        match = {
-            "team_1": {"name": team_1_name, "goals": int(team_1_score)},
-            "team_2": {"name": team_2_name, "goals": int(team_2_score)},
-        }
-
-        read = self._db_handler.read_matches()
+        return CurrentMatch(match, write.error)
 
-        if read.error == DB_READ_ERROR:
-            return CurrentMatch(match, read.error)
+    @profiling.timed()
+    def import_matches(
+        self, lines: Iterable[Union[str, bytes]], format: str = TEXT_FORMAT
+    ) -> CurrentImport:
+        """Adds many matches to the Ranking database with a single write.
 
-        read.matches_list.append(match)
+        Lines are validated in batches with the same rules as ``add``. Blank
+        lines are skipped and invalid lines, also those that are not UTF-8,
+        are reported without stopping the import.
 
-        write = self._db_handler.write_matches(read.matches_list)
+        All the lines are read and validated before the matches are written,
+        so the database is not locked while the input is read, and an input
+        that fails half way adds no match.
 
-        return CurrentMatch(match, write.error)
+        Args:
+            lines (Iterable[Union[str, bytes]]): The matches, one per line,
+            as text or as UTF-8
+            format (str, optional): "text" for lines like "Lions 3, Snakes 3",
+            "csv" or "jsonl". Defaults to "text".
 
+        Returns:
+            CurrentImport: How many matches were imported and the invalid lines
+        """
+        errors = []
+
+        def valid_matches():
+            numbered_lines = iter(lines)
+            for first in count(1, IMPORT_BATCH_SIZE):
+                batch = []
+                batch_errors = []
+                for line_number, line in enumerate(
+                    islice(numbered_lines, IMPORT_BATCH_SIZE), first
+                ):
+                    if isinstance(line, bytes):
+                        try:
+                            line = line.decode()
+                        except UnicodeDecodeError:
+                            batch_errors.append(
+                                LineError(
+                                    line_number,
+                                    line.decode(errors="replace").rstrip("\r\n"),
+                                    ENCODING_ERROR,
+                                )
+                            )
+                            # Skipped like a blank line
+                            line = ""
+                    batch.append(line.rstrip("\r\n"))
+                if not batch:
+                    return
+
+                texts = batch
+                if format != TEXT_FORMAT:
+                    # Blank text is skipped by parse_many, keeping the numbers
+                    texts = []
+                    for line_number, line in enumerate(batch, first):
+                        if not line.strip() or (
+                            format == CSV_FORMAT
+                            and line_number == 1
+                            and line.replace(" ", "") == ",".join(CSV_HEADER)
+                        ):
+                            texts.append("")
+                            continue
+
+                        try:
+                            texts.append(_to_match_line(line, format))
+                        except ValueError:
+                            batch_errors.append(
+                                LineError(line_number, line, JSON_ERROR)
+                            )
+                            texts.append("")
+
+                parsed = parse_many(texts, first)
+                # Invalid lines are reported as written, not as converted
+                batch_errors.extend(
+                    LineError(number, batch[number - first], error)
+                    for number, _, error in parsed.errors
+                )
+                errors.extend(sorted(batch_errors))
+                yield from parsed.matches
+
+        matches = list(valid_matches())
+        # Rated by the next get_ratings
+        write = self._append(lambda: self._db_handler.append_matches(matches), None)
+
+        return CurrentImport(write.count, errors, write.error)
+
+    @profiling.timed()
     def clean_db(self) -> None:
         """Removes all matches from the Ranking database
 
@@ -86,9 +291,25 @@ class RankingController:
             None
         """
         write = self._db_handler.write_matches([])
+        from ranking.history import Checkpoints
+        from ranking.ratings import Ratings
+
+        Checkpoints(self._db_path).clear()
+        Ratings(self._db_path).clear()
 
         return CurrentMatches([], write.error)
 
+    @profiling.timed()
+    def compact(self) -> int:
+        """Fold the writes journaled by the database backend into the
+        database, see BaseDatabaseHandler.compact.
+
+        Returns:
+            int: The error code
+        """
+        return self._db_handler.compact()
+
+    @profiling.timed()
     def get_all_matches(self) -> List[Dict[str, Any]]:
         """Return all the matches in the Ranking database
 
@@ -103,68 +324,508 @@ class RankingController:
 
         return CurrentMatches(read.matches_list, SUCCESS)
 
-    def show_table_ranking(self) -> List[Tuple[str, int]]:
+    def iter_matches(
+        self, team: Optional[str] = None, offset: int = 0, limit: Optional[int] = None
+    ) -> Iterator[Tuple[int, Match]]:
+        """Stream the matches in the Ranking database without loading them
+        all in memory, as compact records.
+
+        Args:
+            team (str, optional): Only the matches played by this team.
+            Defaults to None.
+            offset (int, optional): Matches skipped, after filtering by team.
+            Defaults to 0.
+            limit (int, optional): Most matches returned. Defaults to None,
+            all of them.
+
+        Raises:
+            OSError: The database can't be read
+            ValueError: The database is not in the format of its backend
+
+        Returns:
+            Iterator[Tuple[int, Match]]: The id of every match, its position
+            in the database starting at 1, and the match.
+        """
+        matches = enumerate(self._db_handler.iter_records(), 1)
+
+        if team is not None:
+            matches = ((id, match) for id, match in matches if match.plays(team))
+
+        return islice(matches, offset, None if limit is None else offset + limit)
+
+    @profiling.timed()
+    def get_team_matches(self, team: str) -> CurrentIndexedMatches:
+        """Return the matches played by a team, reading only its matches.
+
+        Args:
+            team (str): Name of the team, its spaces normalized like in add
+
+        Returns:
+            CurrentIndexedMatches: The matches of the team with their ids, in
+            the order they were added
+        """
+        read = self._db_handler.read_indexed_matches(normalize_name(team))
+
+        return CurrentIndexedMatches(read.matches_list, read.error)
+
+    @profiling.timed()
+    def get_head_to_head(self, team: str, rival: str) -> CurrentIndexedMatches:
+        """Return the matches played between two teams.
+
+        Args:
+            team (str): Name of a team, its spaces normalized like in add
+            rival (str): Name of the other team
+
+        Returns:
+            CurrentIndexedMatches: The matches between both teams with their
+            ids, in the order they were added
+        """
+        team, rival = normalize_name(team), normalize_name(rival)
+        if team == rival:
+            return CurrentIndexedMatches([], SAME_TEAM_ERROR)
+
+        read = self._db_handler.read_indexed_matches(team, rival)
+
+        return CurrentIndexedMatches(read.matches_list, read.error)
+
+    @profiling.timed()
+    def show_table_ranking(self, workers: int = 1) -> List[Tuple[str, int]]:
         """Return the table rank for the league.
 
+        Args:
+            workers (int, optional): Processes reading the matches when the
+            standings have to be calculated from many of them. Defaults to 1.
+
         Returns:
             List[Tuple[str, int]]: The Ranking table. A list with
             all the teams ordered by points in descending order.
         """
-        read = self._db_handler.read_matches()
+        read = self._db_handler.read_standings(workers)
 
         if read.error:
             return CurrentRank({}, read.error)
 
-        ranking_points = self._calculate_points(read.matches_list)
-        ranking_teams = sorted(ranking_points.items(), key=itemgetter(1), reverse=True)
-        ranking = self._sort_ranking(ranking_teams)
+        return self.rank_standings(read.table)
 
-        return CurrentRank(dict(ranking), SUCCESS)
+    @profiling.timed()
+    def show_table_ranking_as_of(self, count: int) -> CurrentRank:
+        """Return the table rank after the first ``count`` matches, e.g. as
+        of match 380 of the season. Only the matches after the nearest
+        checkpoint of the standings are read, see history.Checkpoints.
 
-    def _calculate_points(self, matches) -> Dict:
-        """This method is a helper in order to calculate the points
-        by each team
+        Args:
+            count (int): Id of the last match counted
+
+        Returns:
+            CurrentRank: The teams with their points, in ranking order.
+        """
+        from ranking.history import Checkpoints
+
+        try:
+            table = Checkpoints(self._db_path).standings_as_of(self._db_handler, count)
+        except ValueError:
+            return CurrentRank({}, JSON_ERROR)
+        except OSError:
+            return CurrentRank({}, DB_READ_ERROR)
+
+        ranking, error = self._rank_teams(
+            table, lambda: islice(self._db_handler.iter_records(), count)
+        )
+
+        if error:
+            return CurrentRank({}, error)
+
+        return CurrentRank({team: table[team]["points"] for team in ranking}, SUCCESS)
+
+    @profiling.timed()
+    def get_rank_history(self, team: str) -> CurrentHistory:
+        """Return the rank of a team along the league, in a single pass
+        over the matches. Head-to-head can't be used as tie-breaker.
 
         Args:
-            matches (List): All the matches in the Ranking database
+            team (str): Name of the team
 
         Returns:
-            Dict: Teams with their points
+            CurrentHistory: The id of every match that changed the rank or
+            the points of the team, with its rank and points after it.
+        """
+        from ranking.history import rank_history
+
+        if HEAD_TO_HEAD in self._tie_breakers or not all(
+            is_tie_breaker(name) for name in self._tie_breakers
+        ):
+            return CurrentHistory([], TIE_BREAKER_ERROR)
+
+        try:
+            with closing(self._db_handler.iter_matches()) as matches:
+                history = rank_history(matches, team, self._tie_breakers)
+        except ValueError:
+            return CurrentHistory([], JSON_ERROR)
+        except OSError:
+            return CurrentHistory([], DB_READ_ERROR)
+
+        return CurrentHistory(history, SUCCESS)
+
+    @profiling.timed()
+    def get_ratings(
+        self, settings: Optional[Any] = None, recalibrate: bool = False
+    ) -> CurrentRatings:
+        """Return the Elo rating of every team, see ranking.ratings.
+
+        The ratings are saved next to the database and updated by every add
+        from then on, so only the matches not rated yet are read.
+
+        Args:
+            settings (ratings.RatingSettings, optional): K-factor, home
+            advantage and goal difference weights. Defaults to
+            RatingSettings(). Other settings than the saved ones rate all
+            the matches again.
+            recalibrate (bool, optional): Rate all the matches again.
+            Defaults to False.
+
+        Returns:
+            CurrentRatings: Team -> rating, the highest rated first
+        """
+        from ranking.ratings import Ratings, RatingSettings
+
+        try:
+            ratings = Ratings(self._db_path).current(
+                self._db_handler, settings or RatingSettings(), recalibrate
+            )
+        except ValueError:
+            return CurrentRatings({}, JSON_ERROR)
+        except OSError:
+            return CurrentRatings({}, DB_READ_ERROR)
+
+        return CurrentRatings(
+            dict(sorted(ratings.items(), key=lambda team: (-team[1], team[0]))),
+            SUCCESS,
+        )
+
+    @profiling.timed()
+    def simulate(
+        self,
+        fixtures: Sequence[Tuple[str, str]],
+        runs: Optional[int] = None,
+        model: Optional[str] = None,
+        seed: Optional[int] = None,
+        workers: int = 1,
+    ) -> CurrentSimulation:
+        """Project the final table: play the fixtures left many times, from
+        the standings now, and count where every team finishes. Final tables
+        are ordered by points and the controller tie-breakers, like the
+        table rank. See ranking.simulation.
+
+        Args:
+            fixtures (Sequence[Tuple[str, str]]): Both teams of every match
+            left to play
+            runs (int, optional): Seasons simulated. Defaults to
+            simulation.SIMULATION_RUNS.
+            model (str, optional): Goal model, "poisson" (strengths of the
+            teams from their goals) or "average". Defaults to "poisson".
+            seed (int, optional): Seed of the random generators, the same
+            seed gives the same projections. Defaults to a random one.
+            workers (int, optional): Processes simulating the seasons.
+            Defaults to 1.
+
+        Returns:
+            CurrentSimulation: The projection of every team
+        """
+        from ranking import simulation
+
+        if not all(is_tie_breaker(name) for name in self._tie_breakers):
+            return CurrentSimulation([], TIE_BREAKER_ERROR)
+
+        model = model or simulation.POISSON_MODEL
+        if model not in simulation.GOAL_MODELS:
+            return CurrentSimulation([], GOAL_MODEL_ERROR)
+
+        read = self._db_handler.read_standings()
+        if read.error:
+            return CurrentSimulation([], read.error)
+
+        fixtures = [simulation.Fixture(*fixture) for fixture in fixtures]
+        try:
+            projections = simulation.simulate(
+                read.table,
+                fixtures,
+                simulation.goal_rates(read.table, fixtures, model),
+                simulation.SIMULATION_RUNS if runs is None else runs,
+                self._tie_breakers,
+                self._db_handler.iter_records,
+                seed,
+                workers,
+            )
+        except ValueError:
+            return CurrentSimulation([], JSON_ERROR)
+        except OSError:
+            return CurrentSimulation([], DB_READ_ERROR)
+
+        return CurrentSimulation(projections, SUCCESS)
+
+    @profiling.timed()
+    def export_matches(
+        self, output: Optional[Path], format: str, since: int = 0
+    ) -> CurrentExport:
+        """Export the matches for analytics, streamed from the database in
+        chunks, see ranking.export. Every match comes with its id, its
+        position in the database starting at 1.
+
+        Args:
+            output (Path, optional): The export file, None for stdout
+            format (str): csv, jsonl, arrow or parquet
+            since (int, optional): Export only the matches after this id,
+            the marker of the previous export. Defaults to 0, all of them.
+
+        Returns:
+            CurrentExport: How many matches were exported and the marker of
+            the next export. A clean restarts the ids, the next export must
+            start from 0 again.
+        """
+        from ranking import export
+
+        exported = 0
+
+        def rows() -> Iterator[Tuple[Any, ...]]:
+            nonlocal exported
+            if since:
+                reader = self._db_handler.iter_matches_from(since)
+                matches = map(Match.from_dict, reader)
+            else:
+                # Records are built without dicts by most backends
+                reader = matches = self._db_handler.iter_records()
+            with closing(reader):
+                for exported, match in enumerate(matches, 1):
+                    yield (since + exported, *match)
+
+        error = self._export(rows(), export.MATCH_COLUMNS, format, output)
+        if error:
+            return CurrentExport(0, since, error)
+
+        return CurrentExport(exported, since + exported, SUCCESS)
+
+    @profiling.timed()
+    def export_standings(self, output: Optional[Path], format: str) -> CurrentExport:
+        """Export the standings for analytics, the same as show_standings
+        with the rank of every team, see ranking.export.
+
+        Args:
+            output (Path, optional): The export file, None for stdout
+            format (str): csv, jsonl, arrow or parquet
+
+        Returns:
+            CurrentExport: How many teams were exported, no marker
+        """
+        from ranking import export
+
+        table, error = self.show_standings()
+        if error:
+            return CurrentExport(0, 0, error)
+
+        rows = (
+            (rank, team, *(stats[key] for key in export.STATS))
+            for rank, (team, stats) in enumerate(table.items(), 1)
+        )
+        error = self._export(rows, export.STANDINGS_COLUMNS, format, output)
+        if error:
+            return CurrentExport(0, 0, error)
+
+        return CurrentExport(len(table), 0, SUCCESS)
+
+    def _export(
+        self,
+        rows: Iterable[Tuple[Any, ...]],
+        columns: Sequence[str],
+        format: str,
+        output: Optional[Path],
+    ) -> int:
+        """Write the rows with export.export_rows and return the error code."""
+        from ranking import export
+
+        if format not in export.EXPORT_FORMATS:
+            return EXPORT_FORMAT_ERROR
+        if format in export.COLUMNAR_FORMATS and not export.has_pyarrow():
+            return EXPORT_DEPENDENCY_ERROR
+
+        try:
+            export.export_rows(export.reading(rows), columns, format, output)
+        except ValueError:
+            return JSON_ERROR
+        except export.DatabaseReadError:
+            return DB_READ_ERROR
+        except OSError:
+            return EXPORT_ERROR
+
+        return SUCCESS
+
+    @profiling.timed()
+    def rank_standings(self, table: Dict[str, Dict[str, int]]) -> CurrentRank:
+        """Return the table rank for standings already in memory.
+
+        Args:
+            table (Dict[str, Dict[str, int]]): Teams with their aggregates
+
+        Returns:
+            CurrentRank: The teams with their points, in ranking order.
+        """
+        ranking, error = self._rank_teams(table)
+
+        if error:
+            return CurrentRank({}, error)
+
+        return CurrentRank({team: table[team]["points"] for team in ranking}, SUCCESS)
+
+    @profiling.timed()
+    def show_standings(self) -> CurrentStandings:
+        """Return the standings of the league with every team aggregates:
+        points, won, drawn and lost matches, goals for and goals against.
+
+        Returns:
+            CurrentStandings: The teams in the same order as the table rank.
         """
-        result = {}
+        read = self._db_handler.read_standings()
+
+        if read.error:
+            return CurrentStandings({}, read.error)
 
-        for match in matches:
-            team_1 = match["team_1"]
-            team_2 = match["team_2"]
+        ranking, error = self._rank_teams(read.table)
 
-            if not team_1["name"] in result:
-                result[team_1["name"]] = 0
+        if error:
+            return CurrentStandings({}, error)
 
-            if not team_2["name"] in result:
-                result[team_2["name"]] = 0
+        return CurrentStandings({team: read.table[team] for team in ranking}, SUCCESS)
 
-            if team_1["goals"] > team_2["goals"]:
-                result[team_1["name"]] += 3
+    @profiling.timed()
+    def _rank_teams(
+        self,
+        table: Dict[str, Dict[str, int]],
+        matches: Optional[Callable[[], Iterable[Match]]] = None,
+    ) -> Tuple[List[str], int]:
+        """Order the teams of the standings table by points in descending
+        order, breaking ties with the controller tie-breakers and then by name.
 
-            if team_1["goals"] < team_2["goals"]:
-                result[team_2["name"]] += 3
+        Args:
+            table (Dict[str, Dict[str, int]]): Teams with their aggregates
+            matches (Callable[[], Iterable[Match]], optional): Returns the
+            match records of the table, for head-to-head. Defaults to all the
+            matches in the database.
 
-            if team_1["goals"] == team_2["goals"]:
-                result[team_1["name"]] += 1
-                result[team_2["name"]] += 1
+        Returns:
+            Tuple[List[str], int]: The teams in ranking order and the error code
+        """
+        if not all(is_tie_breaker(name) for name in self._tie_breakers):
+            return [], TIE_BREAKER_ERROR
 
-        return result
+        try:
+            ranking = sort_standings(
+                table, self._tie_breakers, matches or self._db_handler.iter_records
+            )
+        except ValueError:
+            return [], JSON_ERROR
+        except OSError:
+            return [], DB_READ_ERROR
+
+        return ranking, SUCCESS
+
+    def _append(self, append: Callable[[], Any], match: Optional[Match]) -> Any:
+        """Run ``append``, which adds ``match``, or several matches when it
+        is None, at the end of the database, keeping the saved ratings and
+        standings checkpoints up to date.
+
+        Returns:
+            Any: What ``append`` returned
+        """
+        if sidecar_path(self._db_path, "checkpoints.json").exists():
+            from ranking.history import Checkpoints
 
-    def _sort_ranking(self, result_sort):
-        for key, team in enumerate(result_sort):
-            if key == len(result_sort) - 1:
-                break
+            append_matches = append
 
-            if team[1] == result_sort[key + 1][1]:
-                temp = team
-                if team[0] > result_sort[key + 1][0]:
-                    result_sort[key] = result_sort[key + 1]
-                    result_sort[key + 1] = temp
-                    self._sort_ranking(result_sort)
+            def append() -> Any:
+                return Checkpoints(self._db_path).add(append_matches)
 
-        return result_sort
+        ratings = self._saved_ratings()
+        if ratings is None:
+            return append()
+        return ratings.add(append, match)
+
+    def _saved_ratings(self) -> Optional[Any]:
+        """Return the ratings.Ratings to update, once they were calculated."""
+        if not sidecar_path(self._db_path, "ratings.json").exists():
+            return None
+
+        from ranking.ratings import Ratings
+
+        return Ratings(self._db_path)
+
+    @profiling.timed()
+    def _calculate_points(self, matches) -> Dict:
+        """This method is a helper in order to calculate the points
+        by each team
+
+        Args:
+            matches (List): All the matches in the Ranking database
+
+        Returns:
+            Dict: Teams with their points
+        """
+        return {
+            team: stats["points"]
+            for team, stats in calculate_standings(matches).items()
+        }
+
+    @profiling.timed()
+    def _sort_ranking(
+        self, result_sort: List[Tuple[str, int]]
+    ) -> List[Tuple[str, int]]:
+        """Order the (team, points) pairs by points in descending order and
+        then by name, with a single sort on a composite key.
+
+        Args:
+            result_sort (List[Tuple[str, int]]): Teams with their points
+
+        Returns:
+            List[Tuple[str, int]]: The sorted teams
+        """
+        return sorted(result_sort, key=lambda team: (-team[1], team[0]))
+
+
+def _rank_partition(task: Tuple[Path, Tuple[str, ...], Optional[str]]) -> CurrentRank:
+    db_path, tie_breakers, backend = task
+    return RankingController(db_path, tie_breakers, backend).show_table_ranking()
+
+
+def rank_partitions(
+    db_path: Path,
+    tie_breakers: Sequence[str] = (),
+    backend: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> List[Tuple[Partition, CurrentRank]]:
+    """Return the table rank of the main database and of every league and
+    season, each one calculated by a process of a pool.
+
+    Args:
+        db_path (Path): Path to the main Ranking database
+        tie_breakers (Sequence[str], optional): Tie-breakers of every table.
+        Defaults to ().
+        backend (str, optional): Database backend. Defaults to the one
+        matching the database file extension.
+        workers (int, optional): Processes of the pool. Defaults to one per
+        CPU, 1 ranks all the partitions in this process.
+
+    Returns:
+        List[Tuple[Partition, CurrentRank]]: Every partition with its table
+        rank, in order of league and season.
+    """
+    partitions = list_partitions(db_path)
+    tasks = [(partition.path, tuple(tie_breakers), backend) for partition in partitions]
+
+    if workers == 1 or len(tasks) == 1:
+        ranks = list(map(_rank_partition, tasks))
+    else:
+        # Slow to import, only needed by this command
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(workers) as executor:
+            ranks = list(executor.map(_rank_partition, tasks))
+
+    return list(zip(partitions, ranks))
@@ -0,0 +1,288 @@
+import configparser
+import json
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, TypeVar
+
+from ranking import profiling
+from ranking.database import (
+    BaseDatabaseHandler,
+    database_signature,
+    lock_database,
+    replace_file,
+    sidecar_path,
+)
+from ranking.records import Match
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+# Rating points added to the first team of every match, the home team
+HOME_ADVANTAGE = 100.0
+
+# What the saved ratings remember, see Ratings
+STATE_KEYS = {"settings", "count", "signature", "unrated", "ratings"}
+
+Result = TypeVar("Result")
+
+
+class RatingSettings(NamedTuple):
+    k_factor: float = K_FACTOR
+    home_advantage: float = HOME_ADVANTAGE
+    # Weigh every match by its goal difference, as the World Football Elo
+    goal_difference: bool = False
+    initial: float = INITIAL_RATING
+
+
+def get_rating_settings(config_file: Path) -> RatingSettings:
+    """Return the settings of the [Ratings] section of the config file, the
+    defaults for the options not in it.
+
+    Raises:
+        ValueError: An option is not a number, or a boolean for
+        goal_difference
+    """
+    config_parser = configparser.ConfigParser()
+    config_parser.read(config_file)
+    if not config_parser.has_section("Ratings"):
+        return RatingSettings()
+
+    section = config_parser["Ratings"]
+    defaults = RatingSettings()
+    return RatingSettings(
+        section.getfloat("k_factor", defaults.k_factor),
+        section.getfloat("home_advantage", defaults.home_advantage),
+        section.getboolean("goal_difference", defaults.goal_difference),
+        section.getfloat("initial", defaults.initial),
+    )
+
+
+def goal_difference_multiplier(goals_1: int, goals_2: int) -> float:
+    """Weight of a match by its goal difference: 1 up to one goal, 1.5 for
+    two goals and (11 + difference) / 8 for more."""
+    difference = abs(goals_1 - goals_2)
+    if difference <= 1:
+        return 1.0
+    if difference == 2:
+        return 1.5
+    return (11 + difference) / 8
+
+
+def rate_match(
+    ratings: Dict[str, float], match: Match, settings: RatingSettings
+) -> None:
+    """Update the ratings of both teams of a match, in place.
+
+    The first team plays at home. Teams not rated yet start with
+    ``settings.initial``.
+
+    Args:
+        ratings (Dict[str, float]): Team -> rating
+        match (Match): The match
+        settings (RatingSettings): K-factor, home advantage and weights
+    """
+    team_1, goals_1, team_2, goals_2 = match
+    rating_1 = ratings.get(team_1, settings.initial)
+    rating_2 = ratings.get(team_2, settings.initial)
+
+    expected = 1 / (1 + 10 ** ((rating_2 - rating_1 - settings.home_advantage) / 400))
+    actual = 1.0 if goals_1 > goals_2 else 0.5 if goals_1 == goals_2 else 0.0
+    change = settings.k_factor * (actual - expected)
+    if settings.goal_difference:
+        change *= goal_difference_multiplier(goals_1, goals_2)
+
+    ratings[team_1] = rating_1 + change
+    ratings[team_2] = rating_2 - change
+
+
+@profiling.timed()
+def replay(matches: Iterable[Match], settings: RatingSettings) -> Dict[str, float]:
+    """Calculate the ratings of every team from scratch, the same as
+    rate_match on every match in order.
+
+    Every rating depends on the ratings left by the previous matches of both
+    teams, so the matches are rated in a single tight loop rather than with
+    array operations: grouping them in rounds of independent matches costs
+    as much as rating them.
+
+    Args:
+        matches (Iterable[Match]): All the matches, in order
+        settings (RatingSettings): K-factor, home advantage and weights
+
+    Returns:
+        Dict[str, float]: Team -> rating
+    """
+    ratings: Dict[str, float] = {}
+    get = ratings.get
+    initial, k_factor, home_advantage = (
+        settings.initial,
+        settings.k_factor,
+        settings.home_advantage,
+    )
+    multiplier = goal_difference_multiplier if settings.goal_difference else None
+
+    # rate_match, inlined
+    for team_1, goals_1, team_2, goals_2 in matches:
+        rating_1 = get(team_1, initial)
+        rating_2 = get(team_2, initial)
+        expected = 1 / (1 + 10 ** ((rating_2 - rating_1 - home_advantage) / 400))
+        actual = 1.0 if goals_1 > goals_2 else 0.5 if goals_1 == goals_2 else 0.0
+        change = k_factor * (actual - expected)
+        if multiplier is not None:
+            change *= multiplier(goals_1, goals_2)
+        ratings[team_1] = rating_1 + change
+        ratings[team_2] = rating_2 - change
+
+    return ratings
+
+
+class Ratings:
+    """Elo ratings of the teams, kept next to the Ranking database, e.g.
+    ``ranking_db.ratings.json``, and updated by every add.
+
+    The saved ratings remember the settings they were calculated with, how
+    many matches they rated and the database_signature of the database. An
+    add rates its match alone when the database was not changed since the
+    ratings were saved, and an import leaves its matches "unrated" for the
+    next read, which rates only them. The ratings of a database changed some
+    other way, e.g. by hand, or with other settings are calculated again
+    from all the matches.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._db_path = db_path
+        self._path = sidecar_path(db_path, "ratings.json")
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with self._path.open("r") as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(saved, dict) or not STATE_KEYS <= saved.keys():
+            return None
+        return saved
+
+    def save(self, state: Dict[str, Any]) -> None:
+        # Only a cache, it is rebuilt by the next read if it can't be saved
+        try:
+            replace_file(
+                self._path,
+                [json.dumps(state, separators=(",", ":")).encode()],
+                durable=False,
+            )
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def add(self, append: Callable[[], Result], match: Optional[Match]) -> Result:
+        """Run ``append``, which adds matches at the end of the database,
+        and rate ``match`` when it is the only one and the saved ratings were
+        up to date. Otherwise the matches appended are rated by the next
+        read.
+
+        The ratings are locked meanwhile, so two adds never rate their
+        matches in a different order than they were appended.
+
+        Args:
+            append (Callable[[], Result]): Adds the matches, returns a
+            response with an ``error``
+            match (Optional[Match]): The match added, None when several are
+
+        Returns:
+            Result: What ``append`` returned
+        """
+        with lock_database(self._path):
+            state = self.load()
+            up_to_date = state is not None and state["signature"] == (
+                database_signature(self._db_path)
+            )
+            result = append()
+
+            if up_to_date and not result.error:
+                if match is not None and not state["unrated"]:
+                    rate_match(
+                        state["ratings"], match, RatingSettings(*state["settings"])
+                    )
+                    state["count"] += 1
+                else:
+                    # After the matches rated, the next read rates them
+                    state["unrated"] = True
+                state["signature"] = database_signature(self._db_path)
+                self.save(state)
+
+        return result
+
+    def current(
+        self,
+        handler: BaseDatabaseHandler,
+        settings: RatingSettings,
+        recalibrate: bool = False,
+    ) -> Dict[str, float]:
+        """Return the ratings after every match in the database, rating only
+        the matches not rated yet.
+
+        Args:
+            handler (BaseDatabaseHandler): The Ranking database
+            settings (RatingSettings): K-factor, home advantage and weights
+            recalibrate (bool, optional): Rate all the matches again, e.g.
+            to compare settings. Defaults to False.
+
+        Raises:
+            OSError: The database can't be read
+            ValueError: The database is not in the format of its backend
+
+        Returns:
+            Dict[str, float]: Team -> rating
+        """
+        with lock_database(self._path):
+            # Taken before reading, matches added meanwhile are rated later
+            signature = database_signature(self._db_path)
+            state = self.load()
+            if state is not None and (
+                recalibrate
+                or RatingSettings(*state["settings"]) != settings
+                or state["signature"] != signature
+            ):
+                state = None
+
+            if state is not None and not state["unrated"]:
+                return state["ratings"]
+
+            if state is not None:
+                profiling.count("ratings caught up")
+                ratings = state["ratings"]
+                count = state["count"]
+                with closing(handler.iter_matches_from(count)) as matches:
+                    for match in map(Match.from_dict, matches):
+                        rate_match(ratings, match, settings)
+                        count += 1
+            else:
+                count = 0
+                with closing(handler.iter_records()) as records:
+
+                    def counted() -> Iterable[Match]:
+                        nonlocal count
+                        for match in records:
+                            count += 1
+                            yield match
+
+                    ratings = replay(counted(), settings)
+
+            self.save(
+                {
+                    "settings": list(settings),
+                    "count": count,
+                    "signature": signature,
+                    "unrated": False,
+                    "ratings": ratings,
+                }
+            )
+            return ratings
@@ -0,0 +1,82 @@
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Memory of the decoded reads kept by a database handler, in bytes
+READ_CACHE_SIZE = 256 << 20
+# Estimated memory of a decoded match and of the aggregates of a team
+CACHED_MATCH_BYTES = 900
+CACHED_TEAM_BYTES = 700
+
+Signature = Tuple[int, int, int]
+
+
+def file_signature(path: Path) -> Optional[Signature]:
+    """Return what tells whether a file changed: its modification time, its
+    size and its inode, which changes when the file is replaced. None when
+    the file can't be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+class ReadCache:
+    """Values decoded from a file, e.g. its matches, kept while the file is
+    not changed.
+
+    Every value is stored with the signature of the file when it was read,
+    and is only returned for the same signature. Values are dropped, the
+    oldest first, to keep their estimated size under ``max_size`` bytes, and
+    a value bigger than that is not kept at all.
+    """
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        """
+        Args:
+            max_size (int, optional): Bytes of the values kept, 0 disables
+            the cache. Defaults to READ_CACHE_SIZE.
+        """
+        self._max_size = READ_CACHE_SIZE if max_size is None else max_size
+        # Name -> signature of the file, value and its estimated size
+        self._entries: Dict[str, Tuple[Signature, Any, int]] = {}
+        self._size = 0
+
+    def get(self, name: str, signature: Optional[Signature]) -> Any:
+        """Return the value read from the file with this signature, or None."""
+        entry = self._entries.get(name)
+        if entry is None or signature is None or entry[0] != signature:
+            return None
+        return entry[1]
+
+    def put(
+        self, name: str, signature: Optional[Signature], value: Any, size: int
+    ) -> None:
+        """Keep a value read from the file with this signature.
+
+        Args:
+            name (str): What the value is, e.g. "matches"
+            signature (Optional[Signature]): The file_signature taken before
+            reading the value
+            value (Any): The value, not modified anymore by the caller
+            size (int): Estimated bytes of the value
+        """
+        self.discard(name)
+        if signature is None or size > self._max_size:
+            return
+
+        while self._entries and self._size + size > self._max_size:
+            self.discard(next(iter(self._entries)))
+
+        self._entries[name] = (signature, value, size)
+        self._size += size
+
+    def discard(self, name: str) -> None:
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
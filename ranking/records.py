@@ -0,0 +1,47 @@
+import sys
+from typing import Any, Dict, NamedTuple
+
+
+class Match(NamedTuple):
+    """A match as kept in memory, a flat tuple instead of the nested dicts
+    of the JSON format. Team names are interned, so all the matches of a
+    team share one string.
+
+    About 90 bytes per match against about 900 for the dicts, see
+    benchmarks/bench_records.py.
+    """
+
+    team_1: str
+    goals_1: int
+    team_2: str
+    goals_2: int
+
+    @classmethod
+    def from_dict(cls, match: Dict[str, Any]) -> "Match":
+        """Convert a match in the JSON format,
+        ``{"team_1": {"name": "Lions", "goals": 3}, "team_2": {...}}``.
+
+        Raises:
+            ValueError: It is not a match
+        """
+        try:
+            team_1 = match["team_1"]
+            team_2 = match["team_2"]
+            return cls(
+                sys.intern(team_1["name"]),
+                team_1["goals"],
+                sys.intern(team_2["name"]),
+                team_2["goals"],
+            )
+        except (KeyError, TypeError) as error:
+            raise ValueError("Not a match record") from error
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the match to the JSON format."""
+        return {
+            "team_1": {"name": self.team_1, "goals": self.goals_1},
+            "team_2": {"name": self.team_2, "goals": self.goals_2},
+        }
+
+    def plays(self, team: str) -> bool:
+        return team == self.team_1 or team == self.team_2
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ranking import DAEMON_ERROR, SUCCESS
+from ranking.database import sidecar_path
+from ranking.parser import parse_match
+from ranking.ranking import RankingController
+from ranking.standings import apply_match
+
+# Seconds an added match waits for others to be written in the same batch
+GROUP_COMMIT_DELAY = 0.005
+
+
+class RankingServer:
+    """Keeps a RankingController and its standings in memory and serves the
+    add, table_rank and clean commands over a Unix socket.
+
+    Requests are newline delimited JSON objects with a "command" and its
+    arguments, every response is a JSON object with a "result" and an "error".
+
+    All the disk work runs in a single worker thread, so requests from
+    concurrent clients are serialized. Matches added while a write is waiting
+    or running are grouped and written together with a single append.
+    """
+
+    def __init__(self, db_path: Path, backend: Optional[str] = None) -> None:
+        self._db_path = db_path
+        self._backend = backend
+        self._controller = RankingController(db_path, backend=backend)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+        self._commit_task = None
+        self._standings = None
+        self._signature = None
+        self._lock = None
+        self._loop = None
+        self._server = None
+        self.commits = 0
+
+    async def serve(
+        self, socket_path: Path, ready: Optional[Callable[[], None]] = None
+    ) -> None:
+        """Serve requests until the server is stopped.
+
+        Args:
+            socket_path (Path): Path of the Unix socket
+            ready (Callable[[], None], optional): Called once the socket accepts
+            connections.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._lock = asyncio.Lock()
+        self._server = await asyncio.start_unix_server(
+            self._handle_client, path=str(socket_path)
+        )
+
+        try:
+            if ready is not None:
+                ready()
+            await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._server.close()
+            async with self._lock:
+                await self._commit()
+            self._executor.shutdown()
+            if socket_path.exists():
+                socket_path.unlink()
+
+    def stop(self) -> None:
+        """Stop serving. Can be called from any thread."""
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+    async def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single request.
+
+        Args:
+            request (Dict[str, Any]): The command and its arguments
+
+        Returns:
+            Dict[str, Any]: The result of the command and its error code
+        """
+        command = request.get("command")
+
+        if command == "ping":
+            return {"result": os.getpid(), "error": SUCCESS}
+
+        if command == "add":
+            return await self._add(str(request.get("match", "")))
+
+        if command not in ("table_rank", "clean"):
+            return {"result": None, "error": DAEMON_ERROR}
+
+        async with self._lock:
+            # Reads see every match added before them
+            await self._commit()
+
+            if command == "table_rank":
+                error = await self._load_standings()
+                result = {}
+                if not error:
+                    controller = RankingController(
+                        self._db_path, request.get("tie_breakers", ()), self._backend
+                    )
+                    result, error = await self._run(
+                        controller.rank_standings, self._standings
+                    )
+
+            else:
+                result, error = await self._run(self._controller.clean_db)
+                self._standings = None if error else {}
+                self._signature = await self._run(self._database_signature)
+
+        return {"result": result, "error": error}
+
+    async def _handle_client(self, reader, writer) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"result": None, "error": DAEMON_ERROR}
+                else:
+                    response = await self.handle(request)
+
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _run(self, function: Callable, *args) -> Any:
+        return await self._loop.run_in_executor(self._executor, function, *args)
+
+    async def _add(self, line: str) -> Dict[str, Any]:
+        match, error = parse_match(line)
+        if error:
+            return {"result": match, "error": error}
+
+        future = self._loop.create_future()
+        self._pending.append((line, match, future))
+        if self._commit_task is None:
+            self._commit_task = asyncio.ensure_future(self._commit_later())
+
+        return {"result": match, "error": await future}
+
+    async def _commit_later(self) -> None:
+        await asyncio.sleep(GROUP_COMMIT_DELAY)
+        self._commit_task = None
+        async with self._lock:
+            await self._commit()
+
+    async def _commit(self) -> None:
+        """Write all the pending matches at once. The lock must be held."""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Writes from outside the daemon, e.g. an import, aren't in the
+        # standings in memory: they are read again instead of updated
+        signature = await self._run(self._database_signature)
+        if signature != self._signature:
+            self._standings = None
+
+        imported = await self._run(
+            self._controller.import_matches, [line for line, _, _ in batch]
+        )
+        self.commits += 1
+
+        if not imported.error and self._standings is not None:
+            for _, match, _ in batch:
+                apply_match(self._standings, match)
+            self._signature = await self._run(self._database_signature)
+
+        for _, _, future in batch:
+            future.set_result(imported.error)
+
+    async def _load_standings(self) -> int:
+        """Load the standings in memory, again only if the database was
+        changed by someone else since the server last read or wrote it."""
+        signature = await self._run(self._database_signature)
+        if self._standings is not None and signature == self._signature:
+            return SUCCESS
+
+        standings, error = await self._run(self._controller.show_standings)
+        if error:
+            return error
+
+        self._standings = dict(standings)
+        self._signature = signature
+        return SUCCESS
+
+    def _database_signature(self) -> Tuple:
+        signature = []
+        # The WAL of SQLite and the journal of the binary backend take the
+        # writes before the database itself
+        for path in (
+            self._db_path,
+            Path(f"{self._db_path}-wal"),
+            sidecar_path(self._db_path, "journal"),
+        ):
+            try:
+                stat = path.stat()
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+
+def run(db_path: Path, socket_path: Path, backend: Optional[str] = None) -> None:
+    """Run the Ranking daemon until it is interrupted or terminated."""
+    server = RankingServer(db_path, backend)
+
+    async def serve() -> None:
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.stop)
+        except NotImplementedError:
+            pass
+        await server.serve(socket_path)
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
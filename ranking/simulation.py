@@ -0,0 +1,498 @@
+import math
+import random
+from itertools import chain, groupby
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from ranking import MISSING_TEAM_ERROR, SAME_TEAM_ERROR, engine, profiling
+from ranking.parser import LineError, normalize_name
+from ranking.records import Match
+from ranking.standings import DRAW_POINTS, WIN_POINTS
+from ranking.tiebreakers import HEAD_TO_HEAD
+
+POISSON_MODEL = "poisson"
+AVERAGE_MODEL = "average"
+GOAL_MODELS = (POISSON_MODEL, AVERAGE_MODEL)
+
+SIMULATION_RUNS = 10_000
+# Seasons simulated together by the array operations of a batch
+BATCH_RUNS = 5_000
+# Matches of league average goals added to the record of every team, so a
+# team with a few matches is not rated by them alone
+PRIOR_MATCHES = 5
+# Goals per team and match when there are no matches yet
+DEFAULT_GOALS = 1.35
+
+# Tie-breakers computed from the final goals of a team, the higher first
+_TIE_BREAKER_KEYS = {
+    "goal_difference": lambda goals_for, goals_against: goals_for - goals_against,
+    "goals_scored": lambda goals_for, goals_against: goals_for,
+}
+
+
+class Fixture(NamedTuple):
+    team_1: str
+    team_2: str
+
+
+class ParsedFixtures(NamedTuple):
+    fixtures: List[Fixture]
+    errors: List[LineError]
+
+
+class Projection(NamedTuple):
+    """The final-table projection of a team.
+
+    Args:
+        team (str): Name of the team
+        points (float): Expected points at the end of the season
+        positions (List[float]): Probability of finishing at every position
+        of the table, the first one first
+    """
+
+    team: str
+    points: float
+    positions: List[float]
+
+
+class _Season(NamedTuple):
+    """What a batch of simulated seasons starts from, teams as indexes of
+    ``teams``, which is sorted by name."""
+
+    teams: List[str]
+    points: List[int]
+    goals_for: List[int]
+    goals_against: List[int]
+    # Team indexes and expected goals of both teams of every fixture
+    fixtures: List[Tuple[int, int, float, float]]
+    # Head-to-head points of every pair of teams that played: team, rival,
+    # points of the team, points of the rival
+    head_to_head: List[Tuple[int, int, int, int]]
+    tie_breakers: Tuple[str, ...]
+
+
+def parse_fixtures(lines: Iterable[str], start: int = 1) -> ParsedFixtures:
+    """Parse the fixtures left to play, one per line as the names of both
+    teams separated by a comma, e.g. ``Lions, Snakes``. Blank lines are
+    skipped.
+
+    Args:
+        lines (Iterable[str]): The fixtures
+        start (int, optional): Number of the first line. Defaults to 1.
+
+    Returns:
+        ParsedFixtures: The fixtures and the lines rejected
+    """
+    fixtures = []
+    errors = []
+    for line_number, line in enumerate(lines, start):
+        line = line.strip()
+        if not line:
+            continue
+
+        names = [normalize_name(name) for name in line.split(",")]
+        if len(names) != 2 or not all(names):
+            errors.append(LineError(line_number, line, MISSING_TEAM_ERROR))
+        elif names[0] == names[1]:
+            errors.append(LineError(line_number, line, SAME_TEAM_ERROR))
+        else:
+            fixtures.append(Fixture(*names))
+
+    return ParsedFixtures(fixtures, errors)
+
+
+def goal_rates(
+    table: Dict[str, Dict[str, int]],
+    fixtures: Sequence[Fixture],
+    model: str = POISSON_MODEL,
+    prior_matches: int = PRIOR_MATCHES,
+) -> List[Tuple[float, float]]:
+    """Return the expected goals of both teams of every fixture.
+
+    With the poisson model every team has an attack and a defence strength,
+    its goals scored and conceded per match relative to the league average,
+    and the expected goals of a team are the league average times its attack
+    times the defence of its rival. With the average model every team scores
+    the league average.
+
+    Args:
+        table (Dict[str, Dict[str, int]]): Teams with their aggregates
+        fixtures (Sequence[Fixture]): The fixtures left to play
+        model (str, optional): POISSON_MODEL or AVERAGE_MODEL. Defaults to
+        POISSON_MODEL.
+        prior_matches (int, optional): Matches of league average goals added
+        to the record of every team. Defaults to PRIOR_MATCHES.
+
+    Raises:
+        ValueError: The model is unknown
+
+    Returns:
+        List[Tuple[float, float]]: Expected goals of both teams, in the
+        order of the fixtures
+    """
+    if model not in GOAL_MODELS:
+        raise ValueError(f"Unknown goal model '{model}'")
+
+    played = sum(
+        stats["won"] + stats["drawn"] + stats["lost"] for stats in table.values()
+    )
+    goals = sum(stats["goals_for"] for stats in table.values())
+    average = goals / played if played else DEFAULT_GOALS
+
+    if model == AVERAGE_MODEL or average == 0:
+        return [(average, average) for _ in fixtures]
+
+    def strengths(team: str) -> Tuple[float, float]:
+        stats = table.get(team)
+        if stats is None:
+            return 1.0, 1.0
+        matches = stats["won"] + stats["drawn"] + stats["lost"] + prior_matches
+        prior_goals = prior_matches * average
+        return (
+            (stats["goals_for"] + prior_goals) / matches / average,
+            (stats["goals_against"] + prior_goals) / matches / average,
+        )
+
+    rates = []
+    for team_1, team_2 in fixtures:
+        attack_1, defence_1 = strengths(team_1)
+        attack_2, defence_2 = strengths(team_2)
+        rates.append((average * attack_1 * defence_2, average * attack_2 * defence_1))
+    return rates
+
+
+@profiling.timed()
+def simulate(
+    table: Dict[str, Dict[str, int]],
+    fixtures: Sequence[Fixture],
+    rates: Sequence[Tuple[float, float]],
+    runs: int = SIMULATION_RUNS,
+    tie_breakers: Sequence[str] = (),
+    matches: Optional[Callable[[], Iterable[Match]]] = None,
+    seed: Optional[int] = None,
+    workers: int = 1,
+) -> List[Projection]:
+    """Play the fixtures left ``runs`` times, with goals drawn from Poisson
+    distributions, and count where every team finishes.
+
+    The final tables are ranked like the table rank: 3 points for a win and
+    1 for a draw, then the tie-breakers and the name. Seasons are simulated
+    in batches of BATCH_RUNS, with NumPy arrays when it is installed, and
+    the batches are spread over a pool of ``workers`` processes. Every batch
+    has its own random generator derived from ``seed``, so a seed gives the
+    same projections with any number of workers.
+
+    Args:
+        table (Dict[str, Dict[str, int]]): Teams with their aggregates now
+        fixtures (Sequence[Fixture]): The fixtures left to play
+        rates (Sequence[Tuple[float, float]]): Expected goals of both teams
+        of every fixture, see goal_rates
+        runs (int, optional): Seasons simulated. Defaults to SIMULATION_RUNS.
+        tie_breakers (Sequence[str], optional): Names of the tie-breakers,
+        in order. Defaults to ().
+        matches (Callable[[], Iterable[Match]], optional): Returns all the
+        match records, only needed for head-to-head.
+        seed (int, optional): Seed of the random generators. Defaults to a
+        random one.
+        workers (int, optional): Processes of the pool. Defaults to 1.
+
+    Returns:
+        List[Projection]: Every team, by expected final position
+    """
+    teams = sorted(set(table).union(*fixtures))
+    team_ids = {team: id for id, team in enumerate(teams)}
+    stats = [table.get(team, {}) for team in teams]
+
+    head_to_head: Dict[Tuple[int, int], List[int]] = {}
+    if HEAD_TO_HEAD in tie_breakers and matches is not None:
+        for team_1, goals_1, team_2, goals_2 in matches():
+            pair = (team_ids[team_1], team_ids[team_2])
+            points = _points(goals_1, goals_2)
+            if pair[0] > pair[1]:
+                pair, points = pair[::-1], points[::-1]
+            total = head_to_head.setdefault(pair, [0, 0])
+            total[0] += points[0]
+            total[1] += points[1]
+
+    season = _Season(
+        teams,
+        [team_stats.get("points", 0) for team_stats in stats],
+        [team_stats.get("goals_for", 0) for team_stats in stats],
+        [team_stats.get("goals_against", 0) for team_stats in stats],
+        [
+            (team_ids[team_1], team_ids[team_2], rate_1, rate_2)
+            for (team_1, team_2), (rate_1, rate_2) in zip(fixtures, rates)
+        ],
+        [(*pair, *points) for pair, points in head_to_head.items()],
+        tuple(tie_breakers),
+    )
+
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(63)
+    tasks = [
+        (season, seed, batch, min(BATCH_RUNS, runs - start))
+        for batch, start in enumerate(range(0, runs, BATCH_RUNS))
+    ]
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = list(map(_simulate_batch, tasks))
+    else:
+        # Slow to import, only needed with several workers
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(min(workers, len(tasks))) as executor:
+            results = list(executor.map(_simulate_batch, tasks))
+
+    size = len(teams)
+    positions = [[0] * size for _ in teams]
+    points = [0] * size
+    for batch_positions, batch_points in results:
+        for team in range(size):
+            points[team] += batch_points[team]
+            for position, count in enumerate(batch_positions[team]):
+                positions[team][position] += count
+
+    projections = [
+        Projection(
+            team,
+            points[id] / max(runs, 1),
+            [count / max(runs, 1) for count in positions[id]],
+        )
+        for id, team in enumerate(teams)
+    ]
+    return sorted(
+        projections,
+        key=lambda projection: (
+            sum(
+                position * chance
+                for position, chance in enumerate(projection.positions)
+            ),
+            projection.team,
+        ),
+    )
+
+
+def _points(goals_1: int, goals_2: int) -> Tuple[int, int]:
+    if goals_1 > goals_2:
+        return WIN_POINTS, 0
+    if goals_1 < goals_2:
+        return 0, WIN_POINTS
+    return DRAW_POINTS, DRAW_POINTS
+
+
+def _split_tie_breakers(
+    tie_breakers: Sequence[str],
+) -> Tuple[List[str], bool, List[str]]:
+    """Return the tie-breakers before head-to-head, whether it is used, and
+    those after it, like tiebreakers.sort_standings."""
+    if HEAD_TO_HEAD not in tie_breakers:
+        return list(tie_breakers), False, []
+
+    split = tie_breakers.index(HEAD_TO_HEAD)
+    return (
+        list(tie_breakers[:split]),
+        True,
+        [name for name in tie_breakers[split + 1 :] if name != HEAD_TO_HEAD],
+    )
+
+
+def _simulate_batch(
+    task: Tuple[_Season, int, int, int]
+) -> Tuple[List[List[int]], List[int]]:
+    """Simulate a batch of seasons. Runs in the workers of simulate.
+
+    Returns:
+        Tuple[List[List[int]], List[int]]: How many times every team
+        finished at every position, and its points summed over the seasons
+    """
+    np = engine._numpy()
+    if np is None:
+        return _simulate_batch_python(task)
+
+    season, seed, batch, runs = task
+    size = len(season.teams)
+    rng = np.random.default_rng([seed, batch])
+
+    fixtures = np.array(season.fixtures, dtype=float).reshape(-1, 4)
+    home_ids = fixtures[:, 0].astype(np.intp)
+    away_ids = fixtures[:, 1].astype(np.intp)
+    before, uses_head_to_head, after = _split_tie_breakers(season.tie_breakers)
+    if any(name in _TIE_BREAKER_KEYS for name in season.tie_breakers):
+        home_goals = rng.poisson(fixtures[:, 2], size=(runs, len(fixtures)))
+        away_goals = rng.poisson(fixtures[:, 3], size=(runs, len(fixtures)))
+        home_wins = home_goals > away_goals
+        draws = home_goals == away_goals
+    else:
+        # Only the results count, a single uniform per match is drawn
+        # against the chances of a win and a draw of the Poisson scores
+        home_goals = away_goals = None
+        win, draw = _result_chances(np, fixtures[:, 2], fixtures[:, 3])
+        chances = rng.random((runs, len(fixtures)))
+        home_wins = chances < win
+        draws = ~home_wins & (chances < win + draw)
+    home_points = np.where(home_wins, WIN_POINTS, np.where(draws, DRAW_POINTS, 0))
+    away_points = np.where(home_wins, 0, np.where(draws, DRAW_POINTS, WIN_POINTS))
+
+    # Fixture -> team matrices of the first and of the second teams, stacked,
+    # to add the results of every season with a single float product, which
+    # unlike an integer one runs in BLAS. The sums are exact.
+    teams_1 = np.zeros((2 * len(fixtures), size))
+    teams_1[np.arange(len(fixtures)), home_ids] = 1
+    teams_1[np.arange(len(fixtures), 2 * len(fixtures)), away_ids] = 1
+    teams_2 = np.vstack([teams_1[len(fixtures) :], teams_1[: len(fixtures)]])
+
+    def add(base: List[int], per_fixture, teams) -> Any:
+        return np.array(base) + np.rint(per_fixture @ teams).astype(np.int64)
+
+    points = add(season.points, np.hstack([home_points, away_points]), teams_1)
+    goals_for = goals_against = None
+    if home_goals is not None:
+        goals = np.hstack([home_goals, away_goals]).astype(float)
+        goals_for = add(season.goals_for, goals, teams_1)
+        goals_against = add(season.goals_against, goals, teams_2)
+
+    # Lower first, the first key decides
+    group_keys = [-points] + [
+        -_TIE_BREAKER_KEYS[name](goals_for, goals_against) for name in before
+    ]
+    name_key = np.broadcast_to(np.arange(size), (runs, size))
+    keys = list(group_keys)
+
+    if uses_head_to_head:
+        # The teams tied on the keys before head-to-head, in every season
+        order = np.lexsort(group_keys[::-1])
+        changes = np.zeros((runs, size), dtype=bool)
+        changes[:, 0] = True
+        for key in group_keys:
+            ordered = np.take_along_axis(key, order, axis=1)
+            changes[:, 1:] |= ordered[:, 1:] != ordered[:, :-1]
+        groups = np.empty((runs, size), dtype=np.int64)
+        np.put_along_axis(groups, order, np.cumsum(changes, axis=1), axis=1)
+
+        head_to_head = np.zeros((runs, size), dtype=np.int64)
+        for fixture, (team_1, team_2, _, _) in enumerate(season.fixtures):
+            tied = groups[:, team_1] == groups[:, team_2]
+            head_to_head[:, team_1] += tied * home_points[:, fixture]
+            head_to_head[:, team_2] += tied * away_points[:, fixture]
+        for team_1, team_2, points_1, points_2 in season.head_to_head:
+            tied = groups[:, team_1] == groups[:, team_2]
+            head_to_head[:, team_1] += tied * points_1
+            head_to_head[:, team_2] += tied * points_2
+
+        keys.append(-head_to_head)
+        keys.extend(
+            -_TIE_BREAKER_KEYS[name](goals_for, goals_against) for name in after
+        )
+
+    order = np.lexsort([name_key, *keys[::-1]])
+    positions = np.bincount(
+        (order * size + np.arange(size)).ravel(), minlength=size * size
+    ).reshape(size, size)
+    return positions.tolist(), points.sum(axis=0).tolist()
+
+
+def _result_chances(np, rates_1, rates_2) -> Tuple[Any, Any]:
+    """Return the chances of a win of the first team and of a draw, for
+    goals drawn from Poisson distributions of these rates."""
+    highest = float(max(rates_1.max(initial=0), rates_2.max(initial=0)))
+    most_goals = int(highest + 12 * math.sqrt(highest)) + 20
+
+    def probabilities(rates):
+        chances = np.empty((len(rates), most_goals))
+        chances[:, 0] = np.exp(-rates)
+        for goals in range(1, most_goals):
+            chances[:, goals] = chances[:, goals - 1] * rates / goals
+        return chances
+
+    chances_1 = probabilities(rates_1)
+    chances_2 = probabilities(rates_2)
+    fewer_goals_2 = np.cumsum(chances_2, axis=1) - chances_2
+    return (
+        (chances_1 * fewer_goals_2).sum(axis=1),
+        (chances_1 * chances_2).sum(axis=1),
+    )
+
+
+def _simulate_batch_python(
+    task: Tuple[_Season, int, int, int]
+) -> Tuple[List[List[int]], List[int]]:
+    """_simulate_batch without NumPy, a season at a time."""
+    season, seed, batch, runs = task
+    size = len(season.teams)
+    rng = random.Random(f"{seed}:{batch}")
+    limits = [
+        (math.exp(-rate_1), math.exp(-rate_2))
+        for _, _, rate_1, rate_2 in season.fixtures
+    ]
+    before, uses_head_to_head, after = _split_tie_breakers(season.tie_breakers)
+
+    def poisson(limit: float) -> int:
+        goals, product = 0, rng.random()
+        while product > limit:
+            goals += 1
+            product *= rng.random()
+        return goals
+
+    positions = [[0] * size for _ in range(size)]
+    points_sum = [0] * size
+    for _ in range(runs):
+        points = list(season.points)
+        goals_for = list(season.goals_for)
+        goals_against = list(season.goals_against)
+        results = []
+        for (team_1, team_2, _, _), (limit_1, limit_2) in zip(season.fixtures, limits):
+            goals_1, goals_2 = poisson(limit_1), poisson(limit_2)
+            points_1, points_2 = _points(goals_1, goals_2)
+            points[team_1] += points_1
+            points[team_2] += points_2
+            goals_for[team_1] += goals_1
+            goals_for[team_2] += goals_2
+            goals_against[team_1] += goals_2
+            goals_against[team_2] += goals_1
+            results.append((team_1, team_2, points_1, points_2))
+
+        def key(team: int, names: List[str]) -> Tuple[int, ...]:
+            return tuple(
+                -_TIE_BREAKER_KEYS[name](goals_for[team], goals_against[team])
+                for name in names
+            )
+
+        def group_key(team: int) -> Tuple[int, ...]:
+            return (-points[team], *key(team, before))
+
+        ranking = sorted(range(size), key=lambda team: (*group_key(team), team))
+        if uses_head_to_head:
+            group_of = {}
+            for id, (_, group) in enumerate(groupby(ranking, group_key)):
+                for team in group:
+                    group_of[team] = id
+            head_to_head = [0] * size
+            for team_1, team_2, points_1, points_2 in chain(
+                results, season.head_to_head
+            ):
+                if group_of[team_1] == group_of[team_2]:
+                    head_to_head[team_1] += points_1
+                    head_to_head[team_2] += points_2
+            ranking.sort(
+                key=lambda team: (
+                    *group_key(team),
+                    -head_to_head[team],
+                    *key(team, after),
+                    team,
+                )
+            )
+
+        for position, team in enumerate(ranking):
+            positions[team][position] += 1
+            points_sum[team] += points[team]
+
+    return positions, points_sum
@@ -0,0 +1,330 @@
+import sqlite3
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from ranking import DB_READ_ERROR, DB_WRITE_ERROR, SUCCESS, parallel
+from ranking.database import (
+    BaseDatabaseHandler,
+    DBResponse,
+    IndexedResponse,
+    StandingsResponse,
+    WriteResponse,
+)
+from ranking.records import Match
+from ranking.standings import DRAW_POINTS, STATS, WIN_POINTS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    team_1 TEXT NOT NULL,
+    goals_1 INTEGER NOT NULL,
+    team_2 TEXT NOT NULL,
+    goals_2 INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_team_1 ON matches (team_1);
+CREATE INDEX IF NOT EXISTS matches_team_2 ON matches (team_2);
+"""
+
+INSERT_MATCH = (
+    "INSERT INTO matches (team_1, goals_1, team_2, goals_2) VALUES (?, ?, ?, ?)"
+)
+
+SELECT_MATCHES = "SELECT team_1, goals_1, team_2, goals_2 FROM matches"
+
+# Every match is counted once from the point of view of each team, then
+# the aggregates are summed by team.
+SELECT_STANDINGS = """
+SELECT team,
+    SUM(CASE WHEN goals > rival_goals THEN :win
+             WHEN goals = rival_goals THEN :draw ELSE 0 END),
+    SUM(goals > rival_goals),
+    SUM(goals = rival_goals),
+    SUM(goals < rival_goals),
+    SUM(goals),
+    SUM(rival_goals)
+FROM (
+    SELECT team_1 AS team, goals_1 AS goals, goals_2 AS rival_goals FROM matches
+    UNION ALL
+    SELECT team_2, goals_2, goals_1 FROM matches
+)
+GROUP BY team
+"""
+
+# The standings of the matches with ids in (:after, :last]
+SELECT_SHARD_STANDINGS = SELECT_STANDINGS.replace(
+    "FROM matches", "FROM matches WHERE id > :after AND id <= :last"
+)
+
+SELECT_ID_RANGE = "SELECT COALESCE(MIN(id) - 1, 0), COALESCE(MAX(id), 0) FROM matches"
+
+# Two selects instead of an OR, so each one can use its team index.
+SELECT_TEAM_MATCHES = """
+SELECT * FROM (
+    SELECT id, team_1, goals_1, team_2, goals_2 FROM matches WHERE team_1 = :team
+    UNION ALL
+    SELECT id, team_1, goals_1, team_2, goals_2 FROM matches WHERE team_2 = :team
+)
+ORDER BY id
+"""
+
+SELECT_HEAD_TO_HEAD = """
+SELECT * FROM (
+    SELECT id, team_1, goals_1, team_2, goals_2 FROM matches
+    WHERE team_1 = :team AND team_2 = :rival
+    UNION ALL
+    SELECT id, team_1, goals_1, team_2, goals_2 FROM matches
+    WHERE team_1 = :rival AND team_2 = :team
+)
+ORDER BY id
+"""
+
+
+def _to_match(row) -> Dict[str, Any]:
+    team_1, goals_1, team_2, goals_2 = row[-4:]
+    return {
+        "team_1": {"name": team_1, "goals": goals_1},
+        "team_2": {"name": team_2, "goals": goals_2},
+    }
+
+
+def _to_row(match: Dict[str, Any]):
+    team_1 = match["team_1"]
+    team_2 = match["team_2"]
+    return (team_1["name"], team_1["goals"], team_2["name"], team_2["goals"])
+
+
+def _standings(rows) -> Dict[str, Dict[str, int]]:
+    return {row[0]: dict(zip(STATS, row[1:])) for row in rows}
+
+
+def _shard_standings(task: Tuple[str, int, int]) -> Dict[str, Dict[str, int]]:
+    """Calculate the standings of a range of match ids with a connection of
+    its own. Runs in the workers of parallel.sharded_standings."""
+    path, after, last = task
+    connection = sqlite3.connect(path)
+    try:
+        return _standings(
+            connection.execute(
+                SELECT_SHARD_STANDINGS,
+                {"win": WIN_POINTS, "draw": DRAW_POINTS, "after": after, "last": last},
+            )
+        )
+    finally:
+        connection.close()
+
+
+class SQLiteDatabaseHandler(BaseDatabaseHandler):
+    """To read and write in a SQLite Ranking database.
+
+    Matches live in the ``matches`` table, indexed by both team names. The
+    database runs in WAL mode, every write is a single transaction, and the
+    standings and team queries are SQL aggregates.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(db_path)
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._db_path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+
+        return self._connection
+
+    def init_database(self) -> int:
+        """Create the Ranking database"""
+        try:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM matches")
+            return SUCCESS
+        except sqlite3.Error:
+            return DB_WRITE_ERROR
+
+    def iter_matches(self) -> Iterator[Dict[str, Any]]:
+        """Stream the matches in the Ranking database one by one.
+
+        Raises:
+            OSError: The database can't be read
+
+        Yields:
+            Dict[str, Any]: A match
+        """
+        try:
+            for row in self._connect().execute(SELECT_MATCHES + " ORDER BY id"):
+                yield _to_match(row)
+        except sqlite3.Error as error:
+            raise OSError(str(error)) from error
+
+    def iter_records(self) -> Iterator[Match]:
+        """Stream the matches as compact records, one per row.
+
+        Raises:
+            OSError: The database can't be read
+
+        Yields:
+            Match: A match
+        """
+        intern = sys.intern
+        try:
+            rows = self._connect().execute(SELECT_MATCHES + " ORDER BY id")
+            for team_1, goals_1, team_2, goals_2 in rows:
+                yield Match(intern(team_1), goals_1, intern(team_2), goals_2)
+        except sqlite3.Error as error:
+            raise OSError(str(error)) from error
+
+    def iter_matches_from(self, start: int) -> Iterator[Dict[str, Any]]:
+        """Stream the matches after the first ``start`` ones.
+
+        Raises:
+            OSError: The database can't be read
+
+        Yields:
+            Dict[str, Any]: A match
+        """
+        try:
+            rows = self._connect().execute(
+                SELECT_MATCHES + " ORDER BY id LIMIT -1 OFFSET ?", (start,)
+            )
+            for row in rows:
+                yield _to_match(row)
+        except sqlite3.Error as error:
+            raise OSError(str(error)) from error
+
+    def read_matches(self) -> DBResponse:
+        """Read all the matches in the Ranking database.
+
+        Returns:
+            DBResponse: List of matches
+        """
+        try:
+            return DBResponse(list(self.iter_matches()), SUCCESS)
+        except OSError:
+            return DBResponse([], DB_READ_ERROR)
+
+    def read_indexed_matches(
+        self, team: str, rival: Optional[str] = None
+    ) -> IndexedResponse:
+        """Read the matches played by a team, or between two teams, using
+        the team indexes.
+
+        The id of a match is its rowid: matches are only deleted all at
+        once, so rowids are their positions starting at 1.
+
+        Args:
+            team (str): Name of the team
+            rival (str, optional): Name of the other team. Defaults to None,
+            every match of ``team``.
+
+        Returns:
+            IndexedResponse: The matches with their ids
+        """
+        try:
+            if rival is None:
+                rows = self._connect().execute(SELECT_TEAM_MATCHES, {"team": team})
+            else:
+                rows = self._connect().execute(
+                    SELECT_HEAD_TO_HEAD, {"team": team, "rival": rival}
+                )
+            return IndexedResponse([(row[0], _to_match(row)) for row in rows], SUCCESS)
+        except sqlite3.Error:
+            return IndexedResponse([], DB_READ_ERROR)
+
+    def append_match(self, match: Dict[str, Any]) -> DBResponse:
+        """Insert a single match.
+
+        Args:
+            match (Dict[str, Any]): The new match
+
+        Returns:
+            DBResponse: List with the inserted match
+        """
+        try:
+            with self._connect() as connection:
+                connection.execute(INSERT_MATCH, _to_row(match))
+            return DBResponse([match], SUCCESS)
+        except sqlite3.Error:
+            return DBResponse([match], DB_WRITE_ERROR)
+
+    def append_matches(self, matches: Iterable[Dict[str, Any]]) -> WriteResponse:
+        """Insert several matches in one transaction.
+
+        Args:
+            matches (Iterable[Dict[str, Any]]): The new matches
+
+        Returns:
+            WriteResponse: How many matches were inserted
+        """
+        try:
+            with self._connect() as connection:
+                cursor = connection.executemany(INSERT_MATCH, map(_to_row, matches))
+            return WriteResponse(max(cursor.rowcount, 0), SUCCESS)
+        except sqlite3.Error:
+            return WriteResponse(0, DB_WRITE_ERROR)
+
+    def write_matches(self, matches_list: List[Dict[str, Any]]) -> DBResponse:
+        """Replace all the matches in one transaction.
+
+        Args:
+            matches_list (List[Dict[str, Any]]): List of matches
+
+        Returns:
+            DBResponse: List of matches
+        """
+        try:
+            with self._connect() as connection:
+                connection.execute("DELETE FROM matches")
+                connection.executemany(INSERT_MATCH, map(_to_row, matches_list))
+            return DBResponse(matches_list, SUCCESS)
+        except sqlite3.Error:
+            return DBResponse(matches_list, DB_WRITE_ERROR)
+
+    def compact(self) -> int:
+        """Fold the write-ahead log into the database file and truncate it.
+
+        Returns:
+            int: The error code
+        """
+        try:
+            self._connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return SUCCESS
+        except sqlite3.Error:
+            return DB_WRITE_ERROR
+
+    def read_standings(self, workers: int = 1) -> StandingsResponse:
+        """Read the standings of every team with a single aggregate query.
+
+        With several workers the ids are split into ranges of at least
+        parallel.MIN_SHARD_MATCHES, every worker runs the query on its range.
+
+        Args:
+            workers (int, optional): Processes running the query. Defaults
+            to 1.
+
+        Returns:
+            StandingsResponse: Teams with their aggregates
+        """
+        try:
+            connection = self._connect()
+            if workers > 1:
+                after, last = connection.execute(SELECT_ID_RANGE).fetchone()
+                shards = parallel.split(
+                    after, last, workers, parallel.MIN_SHARD_MATCHES
+                )
+                if len(shards) > 1:
+                    tasks = [
+                        (str(self._db_path), start, stop) for start, stop in shards
+                    ]
+                    return StandingsResponse(
+                        parallel.sharded_standings(_shard_standings, tasks, workers),
+                        SUCCESS,
+                    )
+
+            rows = connection.execute(
+                SELECT_STANDINGS, {"win": WIN_POINTS, "draw": DRAW_POINTS}
+            )
+            return StandingsResponse(_standings(rows), SUCCESS)
+        except sqlite3.Error:
+            return StandingsResponse({}, DB_READ_ERROR)
@@ -0,0 +1,111 @@
+from typing import Any, Dict, Iterable
+
+from ranking.records import Match
+
+WIN_POINTS = 3
+DRAW_POINTS = 1
+
+STATS = ("points", "won", "drawn", "lost", "goals_for", "goals_against")
+
+
+def new_team_stats() -> Dict[str, int]:
+    """Return the aggregates of a team that has not played yet."""
+    return dict.fromkeys(STATS, 0)
+
+
+def apply_match(table: Dict[str, Dict[str, int]], match: Dict[str, Any]) -> None:
+    """Add the result of one match to the standings table, in place.
+
+    A win is worth 3 points, a draw 1 point and a loss 0 points.
+
+    Args:
+        table (Dict[str, Dict[str, int]]): Teams with their aggregates
+        match (Dict[str, Any]): The match to add
+    """
+    team_1 = match["team_1"]
+    team_2 = match["team_2"]
+    apply_score(table, team_1["name"], team_1["goals"], team_2["name"], team_2["goals"])
+
+
+def apply_record(table: Dict[str, Dict[str, int]], match: Match) -> None:
+    """apply_match for a match record."""
+    apply_score(table, *match)
+
+
+def apply_score(
+    table: Dict[str, Dict[str, int]],
+    team_1: str,
+    goals_1: int,
+    team_2: str,
+    goals_2: int,
+) -> None:
+    """Add the result of one match, given by its teams and goals, to the
+    standings table, in place."""
+    if team_1 not in table:
+        table[team_1] = new_team_stats()
+
+    if team_2 not in table:
+        table[team_2] = new_team_stats()
+
+    stats_1 = table[team_1]
+    stats_2 = table[team_2]
+
+    stats_1["goals_for"] += goals_1
+    stats_1["goals_against"] += goals_2
+    stats_2["goals_for"] += goals_2
+    stats_2["goals_against"] += goals_1
+
+    if goals_1 > goals_2:
+        stats_1["points"] += WIN_POINTS
+        stats_1["won"] += 1
+        stats_2["lost"] += 1
+
+    if goals_1 < goals_2:
+        stats_2["points"] += WIN_POINTS
+        stats_2["won"] += 1
+        stats_1["lost"] += 1
+
+    if goals_1 == goals_2:
+        stats_1["points"] += DRAW_POINTS
+        stats_2["points"] += DRAW_POINTS
+        stats_1["drawn"] += 1
+        stats_2["drawn"] += 1
+
+
+def calculate_standings(matches: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Calculate the aggregates of every team from scratch.
+
+    Args:
+        matches (Iterable[Dict[str, Any]]): All the matches in the Ranking database
+
+    Returns:
+        Dict[str, Dict[str, int]]: Teams with their aggregates
+    """
+    table = {}
+
+    for match in matches:
+        apply_match(table, match)
+
+    return table
+
+
+def merge_standings(
+    table: Dict[str, Dict[str, int]], other: Dict[str, Dict[str, int]]
+) -> Dict[str, Dict[str, int]]:
+    """Add the aggregates of ``other`` to ``table``, in place.
+
+    Merging is associative, so standings of separate groups of matches can be
+    calculated independently and merged in any grouping.
+
+    Returns:
+        Dict[str, Dict[str, int]]: ``table``
+    """
+    for team, stats in other.items():
+        if team in table:
+            team_stats = table[team]
+            for key in STATS:
+                team_stats[key] += stats[key]
+        else:
+            table[team] = dict(stats)
+
+    return table
@@ -0,0 +1,135 @@
+import json
+import zlib
+from array import array
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class TeamIndex:
+    """Byte offsets and ids of the matches of every team in a match log.
+
+    The index is a directory next to the Ranking database, e.g.
+    ``ranking_db.teams/``, with one file per team holding the offset and the
+    id (the position in the log starting at 1) of each of its matches as
+    packed unsigned 64-bit integers. Adding a match appends 16 bytes to the
+    file of each of its teams, and the matches of a team are found by
+    reading its file, whatever the size of the log.
+
+    Files are named by the CRC32 of the team name, so two teams can share a
+    file: the records read through the index must be checked by the caller.
+
+    The watermark, like the standings snapshot, remembers how many bytes of
+    the log are indexed and the file_signature of the log, to notice when it
+    was changed by someone else than the adds updating the index, and how
+    many matches they hold, for the ids of the next ones.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.directory = db_path.with_name(f"{db_path.stem}.teams")
+        self._watermark_path = self.directory / "watermark.json"
+
+    def team_path(self, team: str) -> Path:
+        return self.directory / f"{zlib.crc32(team.encode()):08x}.idx"
+
+    def watermark(self) -> Optional[Dict[str, Any]]:
+        """Return the part of the log already indexed, if there is an index."""
+        try:
+            with self._watermark_path.open("r") as file:
+                watermark = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        # Indexes of a previous version are built again
+        if not isinstance(watermark, dict) or watermark.keys() != {
+            "offset",
+            "signature",
+            "count",
+        }:
+            return None
+
+        return watermark
+
+    def entries(self, team: str) -> List[Tuple[int, int]]:
+        """Return the offset and the id of the matches of a team, in log
+        order.
+
+        Args:
+            team (str): Name of the team
+
+        Raises:
+            OSError: The index can't be read
+        """
+        offsets = array("Q")
+        try:
+            data = self.team_path(team).read_bytes()
+        except FileNotFoundError:
+            return []
+
+        # Drops an entry cut by a crash, the watermark was not moved past it
+        # so it is indexed again by the next catch up.
+        entry_size = 2 * offsets.itemsize
+        offsets.frombytes(data[: len(data) - len(data) % entry_size])
+
+        # Entries indexed twice, after a crash before the watermark was
+        # saved or for two teams sharing the file, are skipped.
+        unique: List[Tuple[int, int]] = []
+        for offset, id in zip(offsets[::2], offsets[1::2]):
+            if not unique or offset > unique[-1][0]:
+                unique.append((offset, id))
+        return unique
+
+    def add(
+        self,
+        entries: Iterable[Tuple[int, int, Dict[str, Any]]],
+        watermark: Dict[str, Any],
+    ) -> None:
+        """Index matches appended to the log and move the watermark.
+
+        Must be called holding the database lock.
+
+        Args:
+            entries (Iterable[Tuple[int, int, Dict[str, Any]]]): Offset and
+            id of every match in the log, with the match
+            watermark (Dict[str, Any]): The log indexed after these matches
+
+        Raises:
+            OSError: The index can't be written
+        """
+        team_offsets: Dict[str, array] = {}
+        for offset, id, match in entries:
+            for side in ("team_1", "team_2"):
+                name = match[side]["name"]
+                offsets = team_offsets.get(name)
+                if offsets is None:
+                    offsets = team_offsets[name] = array("Q")
+                offsets.append(offset)
+                offsets.append(id)
+
+        path_offsets: Dict[Path, array] = {}
+        for name, offsets in team_offsets.items():
+            path = self.team_path(name)
+            if path in path_offsets:
+                # Teams sharing a file, their entries are merged in log order
+                merged = path_offsets[path] + offsets
+                offsets = array(
+                    "Q", chain.from_iterable(sorted(zip(merged[::2], merged[1::2])))
+                )
+            path_offsets[path] = offsets
+
+        self.directory.mkdir(exist_ok=True)
+        for path, offsets in path_offsets.items():
+            with path.open("ab") as file:
+                offsets.tofile(file)
+
+        with self._watermark_path.open("w") as file:
+            json.dump(watermark, file)
+
+    def clear(self) -> None:
+        """Delete the index, it is built again from the log when needed.
+
+        Must be called holding the database lock.
+        """
+        import shutil
+
+        shutil.rmtree(self.directory, ignore_errors=True)
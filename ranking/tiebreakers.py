@@ -0,0 +1,101 @@
+from itertools import groupby
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from ranking import profiling
+from ranking.records import Match
+from ranking.standings import apply_record
+
+HEAD_TO_HEAD = "head_to_head"
+
+
+def goal_difference(stats: Dict[str, int]) -> int:
+    """Goals for minus goals against."""
+    return stats["goals_for"] - stats["goals_against"]
+
+
+def goals_scored(stats: Dict[str, int]) -> int:
+    """Goals for."""
+    return stats["goals_for"]
+
+
+# Tie-breakers computed from the aggregates of a single team, the higher
+# value ranks first. New tie-breakers can be plugged in by adding them here.
+TIE_BREAKERS: Dict[str, Callable[[Dict[str, int]], int]] = {
+    "goal_difference": goal_difference,
+    "goals_scored": goals_scored,
+}
+
+
+def is_tie_breaker(name: str) -> bool:
+    """Check if ``name`` is a known tie-breaker."""
+    return name == HEAD_TO_HEAD or name in TIE_BREAKERS
+
+
+@profiling.timed()
+def sort_standings(
+    table: Dict[str, Dict[str, int]],
+    tie_breakers: Sequence[str] = (),
+    matches: Optional[Callable[[], Iterable[Match]]] = None,
+) -> List[str]:
+    """Order the teams by points in descending order.
+
+    Teams with the same points are ordered by the tie-breakers chain and
+    then alphabetically by name. Everything but head-to-head is part of a
+    single composite sort key, so the ranking is one O(n log n) sort.
+
+    Head-to-head needs the matches between the tied teams, so it is
+    evaluated only for the groups still tied by the tie-breakers before it,
+    with a single pass over ``matches``.
+
+    Args:
+        table (Dict[str, Dict[str, int]]): Teams with their aggregates
+        tie_breakers (Sequence[str]): Names of the tie-breakers, in order
+        matches (Callable[[], Iterable[Match]], optional): Returns all the
+        match records, only needed for head-to-head.
+
+    Returns:
+        List[str]: The teams in ranking order
+    """
+    if HEAD_TO_HEAD in tie_breakers:
+        split = tie_breakers.index(HEAD_TO_HEAD)
+        before = [TIE_BREAKERS[name] for name in tie_breakers[:split]]
+        after = [
+            TIE_BREAKERS[name]
+            for name in tie_breakers[split + 1 :]
+            if name != HEAD_TO_HEAD
+        ]
+    else:
+        before = [TIE_BREAKERS[name] for name in tie_breakers]
+        after = []
+
+    def group_key(team):
+        stats = table[team]
+        return (-stats["points"], *(-key(stats) for key in before))
+
+    if HEAD_TO_HEAD not in tie_breakers:
+        return sorted(table, key=lambda team: (*group_key(team), team))
+
+    groups = [
+        list(group) for _, group in groupby(sorted(table, key=group_key), group_key)
+    ]
+    group_of = {
+        team: id for id, group in enumerate(groups) if len(group) > 1 for team in group
+    }
+
+    head_to_head = {}
+    if group_of and matches is not None:
+        for match in matches():
+            team_1 = match.team_1
+            if team_1 in group_of and group_of[team_1] == group_of.get(match.team_2):
+                apply_record(head_to_head, match)
+
+    def tied_key(team):
+        stats = table[team]
+        h2h_points = head_to_head[team]["points"] if team in head_to_head else 0
+        return (-h2h_points, *(-key(stats) for key in after), team)
+
+    ranking = []
+    for group in groups:
+        ranking.extend(sorted(group, key=tied_key) if len(group) > 1 else group)
+
+    return ranking
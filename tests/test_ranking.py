@@ -1,16 +1,56 @@
+import asyncio
 import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
 import pytest
+from pathlib import Path
 from typer.testing import CliRunner
 from ranking import (
+    DAEMON_ERROR,
+    DB_READ_ERROR,
+    DB_WRITE_ERROR,
+    EXPORT_DEPENDENCY_ERROR,
+    EXPORT_ERROR,
+    EXPORT_FORMAT_ERROR,
+    ERRORS,
+    GOAL_MODEL_ERROR,
+    GOALS_ERROR,
+    JSON_ERROR,
     MISSING_TEAM_ERROR,
     NO_SCORE_ERROR,
+    PARTITION_ERROR,
     SAME_TEAM_ERROR,
     SUCCESS,
+    TIE_BREAKER_ERROR,
     __app_name__,
     __version__,
+    aio,
+    bench,
+    binary_database,
     cli,
+    client,
+    config,
+    database,
+    engine,
+    export,
+    history,
+    journal,
+    parallel,
+    parser,
+    profiling,
     ranking,
+    ratings,
+    read_cache,
+    simulation,
+    team_index,
+    tiebreakers,
 )
+from ranking.records import Match
+from ranking.standings import calculate_standings
 
 """ 
 This runner is what will "invoke" or "call" your command line application, 
@@ -161,8 +201,1637 @@ def test_show_table_ranking(mock_matches_json):
     assert table_rank == table_expected
     assert error == error_expected
 
+
 def test_clean_db(mock_matches_json):
     ranking_controller = ranking.RankingController(mock_matches_json)
     matches_list, error = ranking_controller.clean_db()
     assert error == 0
     assert len(matches_list) == 0
+
+
+# Unittest for the append-only match log
+def test_add_appends_one_line(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.add(test_match_1["match"])
+    size = mock_matches_json.stat().st_size
+    ranking_controller.add(test_match_1["match"])
+    lines = mock_matches_json.read_text().splitlines()
+    assert len(lines) == 7
+    assert json.loads(lines[-1]) == test_match_1["teams"]
+    assert mock_matches_json.stat().st_size == size + len(lines[-1]) + 1
+
+
+def test_migrate_database(mock_matches_json):
+    legacy_matches = json.loads(mock_matches_json.read_text())
+    assert database.is_legacy_database(mock_matches_json)
+    assert database.migrate_database(mock_matches_json) == SUCCESS
+    assert not database.is_legacy_database(mock_matches_json)
+    assert database.migrate_database(mock_matches_json) == SUCCESS
+    read = database.DatabaseHandler(mock_matches_json).read_matches()
+    assert read == (legacy_matches, SUCCESS)
+
+
+# Unittest for the standings snapshot
+def test_standings_snapshot_updated_on_add(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.add(test_match_1["match"])
+    snapshot_path = database.sidecar_path(mock_matches_json, "standings.json")
+    snapshot = json.loads(snapshot_path.read_text())
+    assert snapshot["offset"] == mock_matches_json.stat().st_size
+    assert snapshot["teams"]["Lions"] == {
+        "points": 1,
+        "won": 0,
+        "drawn": 1,
+        "lost": 0,
+        "goals_for": 3,
+        "goals_against": 3,
+    }
+    standings, error = ranking_controller.show_standings()
+    assert error == SUCCESS
+    assert list(standings)[:2] == ["tarantulas", "lions"]
+    assert standings["tarantulas"]["goals_for"] == 4
+
+
+def edit_by_hand(db_path, old, new):
+    """Replace the first ``old`` in a database by ``new``, of the same size,
+    like a hand edit made a while after the last write."""
+    mtime = db_path.stat().st_mtime_ns
+    db_path.write_bytes(db_path.read_bytes().replace(old, new, 1))
+    os.utime(db_path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+def test_standings_snapshot_detects_external_edits(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.add(test_match_1["match"])
+    lines = mock_matches_json.read_text().splitlines(keepends=True)
+    # Replace the last match by another one with the same size
+    edit_by_hand(
+        mock_matches_json, lines[-1].encode(), lines[-1].replace("3", "4", 1).encode()
+    )
+    table_rank, error = ranking_controller.show_table_ranking()
+    assert error == SUCCESS
+    assert table_rank["Lions"] == 3
+    assert table_rank["Snakes"] == 0
+
+    # And the first one, far from the end of the log
+    edit_by_hand(mock_matches_json, b'"goals":3', b'"goals":0')
+    table_rank, error = ranking_controller.show_table_ranking()
+    assert error == SUCCESS
+    assert table_rank["lions"] == 4
+    assert (table_rank, error) == ranking_controller.rank_standings(
+        calculate_standings(database.DatabaseHandler(mock_matches_json).iter_matches())
+    )
+
+
+def test_standings_snapshot_reset_on_clean(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.show_table_ranking()
+    ranking_controller.clean_db()
+    assert ranking_controller.show_table_ranking() == ({}, SUCCESS)
+    ranking_controller.add(test_match_1["match"])
+    assert ranking_controller.show_table_ranking() == (
+        {"Lions": 1, "Snakes": 1},
+        SUCCESS,
+    )
+
+
+# Unittest for the ranking order and tie-breakers
+def test_sort_ranking_many_ties(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    teams = [(f"team {id:05}", id % 3) for id in range(5000, 0, -1)]
+    result = ranking_controller._sort_ranking(teams)
+    assert result == sorted(teams, key=lambda team: (-team[1], team[0]))
+
+
+@pytest.mark.parametrize(
+    "tie_breakers, expected",
+    [
+        pytest.param((), ["lions", "tigers", "wolves", "bears"]),
+        pytest.param(("goal_difference",), ["wolves", "tigers", "lions", "bears"]),
+        pytest.param(("goals_scored",), ["lions", "wolves", "tigers", "bears"]),
+        pytest.param(("head_to_head",), ["tigers", "wolves", "lions", "bears"]),
+    ],
+)
+def test_show_table_ranking_tie_breakers(tmp_path, tie_breakers, expected):
+    ranking_controller = ranking.RankingController(
+        tmp_path / "ranking.json", tie_breakers
+    )
+    database.init_database(tmp_path / "ranking.json")
+    for match in (
+        "lions 5, bears 4",
+        "tigers 1, lions 0",
+        "wolves 3, bears 0",
+        "wolves 2, tigers 2",
+        "lions 2, bears 2",
+    ):
+        ranking_controller.add(match)
+    table_rank, error = ranking_controller.show_table_ranking()
+    assert error == SUCCESS
+    assert list(table_rank) == expected
+
+
+def test_show_table_ranking_unknown_tie_breaker(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json, ["coin_toss"])
+    assert ranking_controller.show_table_ranking() == ({}, TIE_BREAKER_ERROR)
+
+
+# Unittest for the SQLite backend
+@pytest.fixture
+def mock_matches_sqlite(mock_matches_json):
+    matches = database.DatabaseHandler(mock_matches_json).read_matches().matches_list
+    db_file = mock_matches_json.with_suffix(".db")
+    database.get_database_handler(db_file).write_matches(matches)
+    return db_file
+
+
+@pytest.mark.parametrize(
+    "db_name, backend, expected",
+    [
+        pytest.param("ranking.json", None, database.JSON_BACKEND),
+        pytest.param("ranking.db", None, database.SQLITE_BACKEND),
+        pytest.param("ranking.SQLite3", None, database.SQLITE_BACKEND),
+        pytest.param("ranking.data", "sqlite", database.SQLITE_BACKEND),
+        pytest.param("ranking.rkb", None, database.BINARY_BACKEND),
+    ],
+)
+def test_backend_for_path(db_name, backend, expected):
+    assert database.backend_for_path(Path(db_name), backend) == expected
+
+
+def test_sqlite_show_table_ranking(mock_matches_json, mock_matches_sqlite):
+    json_controller = ranking.RankingController(mock_matches_json)
+    sqlite_controller = ranking.RankingController(mock_matches_sqlite)
+    assert sqlite_controller.show_standings() == json_controller.show_standings()
+    assert sqlite_controller.add(test_match_1["match"]) == (
+        test_match_1["teams"],
+        SUCCESS,
+    )
+    matches, error = sqlite_controller.get_all_matches()
+    assert len(matches) == 6
+    assert matches[-1] == test_match_1["teams"]
+
+
+def test_sqlite_read_team_matches(mock_matches_sqlite):
+    handler = database.get_database_handler(mock_matches_sqlite)
+    matches, error = handler.read_team_matches("snakes")
+    assert error == SUCCESS
+    assert [match["team_1"]["name"] for match in matches] == ["lions", "tarantulas"]
+
+
+def test_sqlite_clean_db(mock_matches_sqlite):
+    ranking_controller = ranking.RankingController(mock_matches_sqlite)
+    assert ranking_controller.clean_db() == ([], SUCCESS)
+    assert ranking_controller.show_table_ranking() == ({}, SUCCESS)
+
+
+# Unittest for the bulk import
+def test_import_command_reports_bad_lines(mock_cli_database):
+    result = runner.invoke(
+        cli.app, ["import", "-"], input="Lions 1\n\nLions 1, Lions 1\n"
+    )
+    assert result.exit_code == 0
+    assert "Line 1: MISSING_TEAM_ERROR 'Lions 1'" in result.stdout
+    assert "Line 3: SAME_TEAM_ERROR 'Lions 1, Lions 1'" in result.stdout
+    assert "0 matches imported, 2 lines rejected" in result.stdout
+
+
+def test_import_is_all_or_nothing(mock_cli_database):
+    # A line that is not UTF-8 is reported, after many valid lines
+    lines = b"Lions 1, Snakes 0\n" * 2500 + b"Lions \xff 1, Snakes 0\n"
+    result = runner.invoke(cli.app, ["import", "-"], input=lines)
+    assert result.exit_code == 0
+    assert "Line 2501: ENCODING_ERROR 'Lions \ufffd 1, Snakes 0'" in result.stdout
+    assert "2500 matches imported, 1 lines rejected" in result.stdout
+
+    # An input failing half way adds none of its matches
+    def failing_lines():
+        yield from ["Lions 1, Snakes 0"] * 2500
+        raise OSError("Input error")
+
+    size = mock_cli_database.stat().st_size
+    controller = ranking.RankingController(mock_cli_database)
+    with pytest.raises(OSError):
+        controller.import_matches(failing_lines())
+    assert mock_cli_database.stat().st_size == size
+
+    # And so does an append failing after writing some of its chunks
+    def failing_matches():
+        yield from [test_match_1["teams"]] * 2500
+        raise OSError("Disk error")
+
+    handler = database.get_database_handler(mock_cli_database)
+    assert handler.append_matches(failing_matches()) == (0, DB_WRITE_ERROR)
+    assert mock_cli_database.stat().st_size == size
+    assert len(controller.get_all_matches().match) == 2505
+
+
+def test_import_command_formats(tmp_path, mock_cli_database):
+    matches = tmp_path / "matches.xml"
+    matches.write_text("Lions 3, Snakes 3\n")
+    # Only an unknown extension falls back to text, not an unknown --format
+    result = runner.invoke(cli.app, ["import", str(matches), "--format", "xml"])
+    assert result.exit_code == 1
+    assert "Unknown format 'xml', use text, csv, jsonl" in result.stdout
+    result = runner.invoke(cli.app, ["import", str(matches)])
+    assert result.exit_code == 0
+    assert "1 matches imported, 0 lines rejected" in result.stdout
+    assert len(ranking.RankingController(mock_cli_database).get_all_matches()[0]) == 6
+
+
+@pytest.mark.parametrize(
+    "format, lines",
+    [
+        pytest.param(
+            ranking.TEXT_FORMAT,
+            ["Lions 3, Snakes 3", "Lions aa, Giants 4", "", "Giants 2, Bears 0"],
+        ),
+        pytest.param(
+            ranking.CSV_FORMAT,
+            ["team_1,goals_1,team_2,goals_2", "Lions,3,Snakes,3", "Lions,aa,Giants,4"]
+            + ["", '"Giants 2, Bears 0"'],
+        ),
+        pytest.param(
+            ranking.JSONL_FORMAT,
+            [json.dumps(test_match_1["teams"]), '{"team_1": "Lions"}', ""]
+            + ['"Giants 2, Bears 0"'],
+        ),
+    ],
+)
+def test_import_matches(mock_matches_json, format, lines):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    imported, errors, error = ranking_controller.import_matches(lines, format)
+    assert error == SUCCESS
+    assert imported == 2
+    assert len(errors) == 1
+    assert errors[0].line_number == lines.index(errors[0].line) + 1
+    matches, _ = ranking_controller.get_all_matches()
+    assert matches[-2:] == [
+        test_match_1["teams"],
+        {
+            "team_1": {"name": "Giants", "goals": 2},
+            "team_2": {"name": "Bears", "goals": 0},
+        },
+    ]
+    table_rank, _ = ranking_controller.show_table_ranking()
+    assert table_rank["Giants"] == 3
+
+
+def test_import_matches_sqlite(mock_matches_sqlite):
+    ranking_controller = ranking.RankingController(mock_matches_sqlite)
+    lines = [f"team {id} {id % 3}, rival {id} 1" for id in range(1000)]
+    assert ranking_controller.import_matches(lines) == (1000, [], SUCCESS)
+    matches, _ = ranking_controller.get_all_matches()
+    assert len(matches) == 1005
+
+
+def test_add_without_comma(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    assert ranking_controller.add("Lions 1") == ("Lions 1", MISSING_TEAM_ERROR)
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("  FC   Lions 3 ,Snakes\t1 ", ("FC Lions", 3, "Snakes", 1)),
+        ("Lions 1, Snakes 2, Giants 3", MISSING_TEAM_ERROR),
+        ("3, Snakes 2", MISSING_TEAM_ERROR),
+        ("Lions 3, Snakes", NO_SCORE_ERROR),
+        ("Lions ², Snakes 1", NO_SCORE_ERROR),
+        ("Lions  1, Lions 1", SAME_TEAM_ERROR),
+        ("Lions 65535, Snakes 0", ("Lions", 65535, "Snakes", 0)),
+        ("Lions 5000000000, Snakes 1", GOALS_ERROR),
+    ],
+)
+def test_parse_match(line, expected):
+    match, error = parser.parse_match(line)
+    if isinstance(expected, int):
+        assert (match, error) == (line, expected)
+    else:
+        team_1, team_2 = match["team_1"], match["team_2"]
+        assert (team_1["name"], team_1["goals"], team_2["name"], team_2["goals"]) == (
+            expected
+        )
+        assert error == SUCCESS
+
+
+def test_parse_many():
+    lines = ["Lions 3, Snakes 3\n", "\n", "Lions 1\n", "Tarantulas 1, Lions 0"]
+    matches, errors = parser.parse_many(lines, start=10)
+    assert [match["team_1"]["name"] for match in matches] == ["Lions", "Tarantulas"]
+    assert matches[0]["team_1"]["name"] is matches[1]["team_2"]["name"]
+    assert errors == [(12, "Lions 1", MISSING_TEAM_ERROR)]
+    assert parser.parse_many(["Lions 70000, Snakes 1"]).errors == [
+        (1, "Lions 70000, Snakes 1", GOALS_ERROR)
+    ]
+
+
+# Unittest for the columnar standings engine
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_standings_with_huge_goals(monkeypatch, mock_matches_json, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(engine, "np", None)
+    monkeypatch.setattr(database, "ENGINE_MIN_RECORDS", 0)
+    # Written before the parser limited the goals
+    handler = database.DatabaseHandler(mock_matches_json)
+    handler.append_matches(
+        [
+            {
+                "team_1": {"name": "lions", "goals": 5_000_000_000},
+                "team_2": {"name": "snakes", "goals": 1},
+            }
+        ]
+    )
+    snapshot = database.sidecar_path(mock_matches_json, "standings.json")
+    snapshot.unlink()
+    table, error = database.DatabaseHandler(mock_matches_json).read_standings()
+    assert error == SUCCESS
+    assert table["lions"]["goals_for"] == 5_000_000_008
+
+    handler.append_matches(
+        [
+            {
+                "team_1": {"name": "lions", "goals": 2**70},
+                "team_2": {"name": "snakes", "goals": 1},
+            }
+        ]
+    )
+    snapshot.unlink()
+    assert database.DatabaseHandler(mock_matches_json).read_standings() == (
+        {},
+        DB_READ_ERROR,
+    )
+
+
+@pytest.mark.parametrize("path", ["score_histogram", "bincount", "python"])
+def test_compute_standings(monkeypatch, path):
+    if path == "python":
+        monkeypatch.setattr(engine, "np", None)
+    else:
+        pytest.importorskip("numpy")
+    if path == "bincount":
+        monkeypatch.setattr(engine, "SCORE_HISTOGRAM_BINS", 0)
+    rng = random.Random(0)
+    matches = [
+        {
+            "team_1": {"name": f"team {rng.randrange(20)}", "goals": rng.randrange(5)},
+            "team_2": {"name": f"rival {rng.randrange(20)}", "goals": rng.randrange(5)},
+        }
+        for _ in range(500)
+    ]
+    columns = engine.ColumnarMatches.from_matches(matches)
+    assert len(columns) == 500
+    assert engine.compute_standings(columns) == calculate_standings(matches)
+
+
+def test_standings_snapshot_skips_engine(monkeypatch, mock_matches_json):
+    handler = database.DatabaseHandler(mock_matches_json, cache_size=0)
+    handler.append_matches([parser.parse_match("lions 1, bears 0").match])
+    expected = handler.read_standings().table
+
+    # Neither a current snapshot nor a few records after it need NumPy
+    monkeypatch.setattr(engine, "compute_standings", None)
+    assert handler.read_standings() == (expected, SUCCESS)
+    database.DatabaseHandler(mock_matches_json).append_matches(
+        [parser.parse_match("bears 2, snakes 2").match]
+    )
+    table, error = handler.read_standings()
+    assert error == SUCCESS
+    assert table["bears"] == {
+        "points": 1,
+        "won": 0,
+        "drawn": 1,
+        "lost": 1,
+        "goals_for": 2,
+        "goals_against": 3,
+    }
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_show_table_ranking_engine(monkeypatch, mock_matches_json, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(engine, "np", None)
+    monkeypatch.setattr(database, "ENGINE_MIN_RECORDS", 0)
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.add(test_match_1["match"])
+    database.sidecar_path(mock_matches_json, "standings.json").unlink()
+    table_rank, error = ranking_controller.show_table_ranking()
+    assert error == SUCCESS
+    assert table_rank == {
+        "tarantulas": 6,
+        "lions": 5,
+        "FC awesome": 1,
+        "Lions": 1,
+        "Snakes": 1,
+        "snakes": 1,
+        "grouches": 0,
+    }
+
+
+# Startup time of the CLI fast path
+STARTUP_IMPORT_BUDGET_US = 100_000
+
+
+def run_with_import_times(args, config_home):
+    env = dict(os.environ, XDG_CONFIG_HOME=str(config_home))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "ranking", *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=Path(__file__).parent.parent,
+    )
+    import_times = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.split("|")[1].strip().isdigit():
+            _, cumulative, module = line.split("|")
+            import_times[module.strip()] = int(cumulative)
+            if not module[1:].startswith(" "):
+                total += int(cumulative)
+    return result, import_times, total
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Uses XDG_CONFIG_HOME")
+@pytest.mark.parametrize(
+    "args, output",
+    [
+        pytest.param(["--version"], f"{__app_name__} v{__version__}"),
+        pytest.param(["add", "Lions 3, Snakes 3"], "Match was added succesfully"),
+    ],
+)
+def test_fast_path_startup(tmp_path, args, output):
+    db_path = tmp_path / "ranking.json"
+    database.init_database(db_path)
+    (tmp_path / __app_name__).mkdir()
+    (tmp_path / __app_name__ / "config.ini").write_text(
+        f"[General]\ndatabase = {db_path}\n"
+    )
+    result, import_times, total = run_with_import_times(args, tmp_path)
+    assert result.returncode == 0
+    assert result.stdout == output + "\n"
+    for module in ("typer", "click", "colorama", "ranking.cli", "numpy", "sqlite3"):
+        assert module not in import_times
+    assert total < STARTUP_IMPORT_BUDGET_US
+
+
+@pytest.fixture
+def ranking_daemon(mock_matches_json, monkeypatch):
+    from ranking import server
+
+    # Unix socket paths are limited to about 100 characters
+    socket_dir = Path(os.environ.get("TMPDIR", "/tmp"))
+    socket_path = socket_dir / f"ranking-test-{os.getpid()}.sock"
+    monkeypatch.setattr(config, "SOCKET_PATH", socket_path)
+
+    daemon = server.RankingServer(mock_matches_json)
+    ready = threading.Event()
+    thread = threading.Thread(
+        target=lambda: server.asyncio.run(daemon.serve(socket_path, ready.set))
+    )
+    thread.start()
+    ready.wait(5)
+    yield daemon
+    daemon.stop()
+    thread.join(5)
+    assert not socket_path.exists()
+
+
+@pytest.mark.skipif(not client.is_supported(), reason="Needs Unix sockets")
+def test_daemon_group_commits_concurrent_adds(mock_matches_json, ranking_daemon):
+    matches = [f"team {id} {id % 4}, rivals {id % 3}" for id in range(50)]
+    errors = []
+    threads = [
+        threading.Thread(
+            target=lambda match: errors.append(
+                client.request({"command": "add", "match": match})["error"]
+            ),
+            args=(match,),
+        )
+        for match in matches
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == [SUCCESS] * len(matches)
+    assert ranking_daemon.commits < len(matches)
+    matches_list, _ = ranking.RankingController(mock_matches_json).get_all_matches()
+    assert len(matches_list) == 5 + len(matches)
+    standings, _ = ranking.RankingController(mock_matches_json).show_standings()
+    rivals = standings["rivals"]
+    assert rivals["won"] + rivals["drawn"] + rivals["lost"] == len(matches)
+
+
+@pytest.mark.skipif(not client.is_supported(), reason="Needs Unix sockets")
+def test_daemon_forwards_cli_commands(mock_matches_json, ranking_daemon):
+    result = runner.invoke(cli.app, ["add", "lions 2, grouches 0"])
+    assert result.exit_code == 0
+    assert ranking_daemon.commits == 1
+
+    result = runner.invoke(cli.app, ["table_rank"])
+    assert result.exit_code == 0
+    assert "lions" in result.stdout
+    response = client.request({"command": "table_rank"})
+    assert response == {
+        "result": {
+            "lions": 8,
+            "tarantulas": 6,
+            "FC awesome": 1,
+            "snakes": 1,
+            "grouches": 0,
+        },
+        "error": SUCCESS,
+    }
+
+    # Writes from outside the daemon are picked up by its next read
+    ranking.RankingController(mock_matches_json).add("grouches 4, snakes 0")
+    response = client.request({"command": "table_rank"})
+    assert response["result"]["grouches"] == 3
+
+    # Even when the daemon writes after them
+    ranking.RankingController(mock_matches_json).import_matches(
+        ["zebras 2, yaks 0", "zebras 1, yaks 0"]
+    )
+    result = runner.invoke(cli.app, ["add", "lions 1, snakes 0"])
+    assert result.exit_code == 0
+    response = client.request({"command": "table_rank"})
+    assert response["error"] == SUCCESS
+    assert (
+        response["result"]
+        == ranking.RankingController(mock_matches_json).show_table_ranking()[0]
+    )
+    assert response["result"]["zebras"] == 6
+
+    result = runner.invoke(cli.app, ["clean"])
+    assert result.exit_code == 0
+    assert client.request({"command": "all_matches"})["error"] == DAEMON_ERROR
+    assert ranking.RankingController(mock_matches_json).get_all_matches() == (
+        [],
+        SUCCESS,
+    )
+
+
+def test_async_controller(mock_matches_json):
+    async def scenario():
+        async with aio.AsyncRankingController(mock_matches_json) as controller:
+            handler = controller._db_handler
+            reads = []
+            read_standings = handler._handler.read_standings
+            handler._handler.read_standings = lambda *args: (
+                reads.append(args) or read_standings(*args)
+            )
+
+            matches = [f"team {id} {id % 4}, rivals {id % 3}" for id in range(20)]
+            added = await asyncio.gather(*map(controller.add, matches))
+            assert [error for _, error in added] == [SUCCESS] * len(matches)
+            assert handler.writes == 1
+            assert await controller.add("Lions 1") == ("Lions 1", MISSING_TEAM_ERROR)
+
+            tables = await asyncio.gather(
+                *(controller.show_table_ranking() for _ in range(5))
+            )
+            assert len(reads) == 1
+            assert all(table == tables[0] for table in tables)
+            assert (
+                tables[0]
+                == ranking.RankingController(mock_matches_json).show_table_ranking()
+            )
+
+            # A read requested after an add sees the match
+            await controller.add("grouches 9, lions 0")
+            table, _ = await controller.show_table_ranking()
+            assert table["grouches"] == 3
+
+            # The ratings of the matches cleaned are forgotten
+            sync_controller = ranking.RankingController(mock_matches_json)
+            assert "grouches" in sync_controller.get_ratings().table
+            ratings_path = database.sidecar_path(mock_matches_json, "ratings.json")
+            assert ratings_path.exists()
+
+            matches, error = await controller.clean_db()
+            assert (matches, error) == ([], SUCCESS)
+            assert await controller.get_all_matches() == ([], SUCCESS)
+            assert not ratings_path.exists()
+            assert sync_controller.get_ratings() == ({}, SUCCESS)
+
+    asyncio.run(scenario())
+
+
+CONCURRENT_WRITER = """
+import sys
+from pathlib import Path
+from ranking.ranking import RankingController
+
+controller = RankingController(Path(sys.argv[1]))
+for id in range(int(sys.argv[3])):
+    _, error = controller.add(f"writer {sys.argv[2]} {id % 5}, rivals {id % 3}")
+    assert not error
+"""
+
+
+def test_concurrent_writers_lose_no_match(mock_matches_json):
+    writers, matches = 8, 25
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                CONCURRENT_WRITER,
+                str(mock_matches_json),
+                str(writer),
+                str(matches),
+            ],
+            cwd=Path(__file__).parent.parent,
+        )
+        for writer in range(writers)
+    ]
+    assert [process.wait() for process in processes] == [0] * writers
+
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    matches_list, error = ranking_controller.get_all_matches()
+    assert error == SUCCESS
+    assert len(matches_list) == 5 + writers * matches
+    standings, _ = ranking_controller.show_standings()
+    assert standings == calculate_standings(matches_list)
+
+
+def test_add_repairs_torn_record(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.add("lions 1, bears 0")
+    with mock_matches_json.open("a") as db:
+        db.write('{"team_1":{"name":"bears","go')
+
+    _, error = ranking_controller.add("bears 2, lions 2")
+    assert error == SUCCESS
+    matches_list, error = ranking_controller.get_all_matches()
+    assert error == SUCCESS
+    assert len(matches_list) == 7
+
+
+def test_write_matches_is_atomic(monkeypatch, mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.add("lions 1, bears 0")
+    before = mock_matches_json.read_bytes()
+    dump_match = database._dump_match
+
+    def failing_dump(match):
+        if match["team_1"]["name"] == "tarantulas":
+            raise OSError("disk full")
+        return dump_match(match)
+
+    monkeypatch.setattr(database, "_dump_match", failing_dump)
+    matches_list, _ = ranking_controller.get_all_matches()
+    _, error = database.DatabaseHandler(mock_matches_json).write_matches(matches_list)
+    assert error == DB_WRITE_ERROR
+    assert mock_matches_json.read_bytes() == before
+    assert sorted(os.listdir(mock_matches_json.parent)) == [
+        "ranking.json",
+        "ranking.json.lock",
+        "ranking.standings.json",
+    ]
+
+
+@pytest.fixture
+def mock_cli_database(mock_matches_json, monkeypatch):
+    monkeypatch.setattr(
+        cli.fastpath, "find_database", lambda: (mock_matches_json, None, None)
+    )
+    return mock_matches_json
+
+
+@pytest.mark.parametrize(
+    "team, offset, limit, expected",
+    [
+        pytest.param(None, 0, None, [1, 2, 3, 4, 5]),
+        pytest.param(None, 1, 2, [2, 3]),
+        pytest.param("lions", 0, None, [1, 3, 5]),
+        pytest.param("lions", 1, 1, [3]),
+    ],
+)
+def test_iter_matches(mock_matches_json, team, offset, limit, expected):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    matches = list(ranking_controller.iter_matches(team, offset, limit))
+    assert [id for id, _ in matches] == expected
+
+
+@pytest.mark.parametrize("format", ["csv", "jsonl"])
+def test_show_all_matches_command_round_trip(mock_cli_database, tmp_path, format):
+    result = runner.invoke(cli.app, ["all_matches", "--format", format])
+    assert result.exit_code == 0
+
+    export_path = tmp_path / f"export.{format}"
+    export_path.write_text(result.stdout)
+    copy_path = tmp_path / "copy.json"
+    database.init_database(copy_path)
+    copy_controller = ranking.RankingController(copy_path)
+    with export_path.open() as lines:
+        assert copy_controller.import_matches(lines, format) == (5, [], SUCCESS)
+    assert (
+        copy_controller.get_all_matches()
+        == ranking.RankingController(mock_cli_database).get_all_matches()
+    )
+
+
+def test_show_all_matches_command_table(monkeypatch, mock_cli_database):
+    monkeypatch.setattr(cli, "TABLE_WIDTH_ROWS", 2)
+    ranking.RankingController(mock_cli_database).add(
+        "the very long name of a team 2, lions 0"
+    )
+    result = runner.invoke(cli.app, ["all_matches", "--team", "lions", "-o", "1"])
+    assert result.exit_code == 0
+    lines = result.stdout.strip().splitlines()
+    assert lines[2] == "ID | Team 1 | Team 2     | Score"
+    assert lines[4:-1] == [
+        "3  | lions  | FC awesome | 1 - 1",
+        "5  | lions  | grouches   | 4 - 0",
+        # Past TABLE_WIDTH_ROWS long names stretch their row only
+        "6  | the very long name of a team | lions      | 2 - 0",
+    ]
+
+
+def test_team_index(mock_matches_json):
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    matches, error = ranking_controller.get_team_matches("lions")
+    assert error == SUCCESS
+    # With their ids in the database, like in all_matches
+    assert [(id, match["team_2"]["name"]) for id, match in matches] == [
+        (1, "snakes"),
+        (3, "FC awesome"),
+        (5, "grouches"),
+    ]
+
+    # The migration to the match log drops the index, the next query builds
+    # it and then adds keep it up to date.
+    index = team_index.TeamIndex(mock_matches_json)
+    ranking_controller.add("snakes 2, lions 1")
+    assert index.watermark() is None
+    assert len(ranking_controller.get_team_matches("snakes").match) == 3
+    ranking_controller.add("lions 0, snakes 0")
+    assert index.watermark()["offset"] == mock_matches_json.stat().st_size
+    matches, _ = ranking_controller.get_head_to_head("lions", "snakes")
+    assert [(id, match["team_1"]["goals"]) for id, match in matches] == [
+        (1, 3),
+        (6, 2),
+        (7, 0),
+    ]
+
+    # A hand edit anywhere in the log builds the index again
+    edit_by_hand(mock_matches_json, b'"snakes","goals":1}', b'"lions","goals":10}')
+    matches, _ = ranking_controller.get_team_matches("lions")
+    assert [id for id, _ in matches] == [1, 3, 4, 5, 6, 7]
+
+    ranking_controller.clean_db()
+    assert not index.directory.exists()
+    assert ranking_controller.get_team_matches("lions") == ([], SUCCESS)
+
+
+def test_team_index_shared_files(monkeypatch, mock_matches_json):
+    monkeypatch.setattr(
+        team_index.TeamIndex, "team_path", lambda self, team: self.directory / "all"
+    )
+    ranking_controller = ranking.RankingController(mock_matches_json)
+    ranking_controller.add("tarantulas 0, lions 0")
+    matches, error = ranking_controller.get_head_to_head("tarantulas", "lions")
+    assert (len(matches), error) == (1, SUCCESS)
+    matches, _ = ranking_controller.get_team_matches("tarantulas")
+    assert len(matches) == 3
+
+
+def test_sqlite_head_to_head(mock_matches_sqlite):
+    ranking_controller = ranking.RankingController(mock_matches_sqlite)
+    matches, error = ranking_controller.get_head_to_head("FC awesome", "lions")
+    assert error == SUCCESS
+    assert matches == [
+        (
+            3,
+            {
+                "team_1": {"name": "lions", "goals": 1},
+                "team_2": {"name": "FC awesome", "goals": 1},
+            },
+        )
+    ]
+
+
+def test_team_commands(mock_cli_database):
+    result = runner.invoke(cli.app, ["team", "tarantulas"])
+    assert result.exit_code == 0
+    assert "2 played, 2 won, 0 drawn, 0 lost, 4 goals for, 1 against, 6 points" in (
+        result.stdout
+    )
+    result = runner.invoke(cli.app, ["h2h", " snakes", "lions  "])
+    assert result.exit_code == 0
+    # The ids of the matches in the database, like in all_matches
+    assert "1  | lions  | snakes | 3 - 3" in result.stdout
+    assert "snakes 0 won, lions 0 won, 1 drawn" in result.stdout
+
+    result = runner.invoke(cli.app, ["h2h", "Lions", " Lions "])
+    assert result.exit_code == 1
+    assert ERRORS[SAME_TEAM_ERROR] in result.stdout
+
+
+@pytest.fixture
+def mock_matches_binary(mock_matches_json):
+    db_path = mock_matches_json.with_name("ranking.rkb")
+    assert database.convert_database(mock_matches_json, db_path) == (5, SUCCESS)
+    return db_path
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_binary_database(
+    monkeypatch, mock_matches_json, mock_matches_binary, use_numpy
+):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(engine, "np", None)
+    assert mock_matches_binary.stat().st_size == 16 + 4096 + 5 * 12
+
+    json_controller = ranking.RankingController(mock_matches_json)
+    binary_controller = ranking.RankingController(mock_matches_binary)
+    for controller in (json_controller, binary_controller):
+        controller.add("lions 2, bears 1")
+        controller.import_matches(
+            [f"team {id} {id % 3}, bears {id % 2}" for id in range(1000)]
+        )
+
+    # The names of the new teams don't fit, the dictionary was doubled twice
+    teams, _, start = binary_database._read_header(mock_matches_binary.read_bytes())
+    assert (len(teams), start) == (1006, 16 + 4 * 4096)
+
+    assert binary_controller.get_all_matches() == json_controller.get_all_matches()
+    assert binary_controller.show_standings() == json_controller.show_standings()
+    assert binary_controller.get_team_matches(
+        "bears"
+    ) == json_controller.get_team_matches("bears")
+    assert binary_controller.get_head_to_head(
+        "lions", "snakes"
+    ) == json_controller.get_head_to_head("lions", "snakes")
+    assert binary_controller.get_team_matches("nobody") == ([], SUCCESS)
+
+    # A record cut by a crash is ignored, then dropped by the next add
+    with mock_matches_binary.open("ab") as db:
+        db.write(b"\x01\x02\x03")
+    assert len(binary_controller.get_all_matches().match) == 1006
+    binary_controller.add("bears 0, lions 0")
+    assert len(binary_controller.get_all_matches().match) == 1007
+
+    binary_controller.clean_db()
+    assert binary_controller.get_all_matches() == ([], SUCCESS)
+
+
+def test_binary_database_round_trip(mock_matches_json, mock_matches_binary):
+    json_path = mock_matches_json.with_name("copy.json")
+    assert database.convert_database(mock_matches_binary, json_path) == (5, SUCCESS)
+    assert (
+        ranking.RankingController(json_path).get_all_matches()
+        == ranking.RankingController(mock_matches_json).get_all_matches()
+    )
+
+
+def test_binary_database_format_error(tmp_path):
+    db_path = tmp_path / "ranking.rkb"
+    db_path.write_text("[]")
+    ranking_controller = ranking.RankingController(db_path)
+    assert ranking_controller.show_table_ranking() == ({}, JSON_ERROR)
+    assert ranking_controller.add("lions 1, bears 0").error == JSON_ERROR
+
+
+def test_journal(monkeypatch, mock_matches_binary):
+    journal_path = database.sidecar_path(mock_matches_binary, "journal")
+    size = mock_matches_binary.stat().st_size
+    controller = ranking.RankingController(mock_matches_binary)
+    expected = controller.get_all_matches().match
+
+    # An add only appends to the journal, the next read folds it
+    assert controller.add("lions 2, bears 1").error == SUCCESS
+    assert journal_path.exists() and mock_matches_binary.stat().st_size == size
+    expected.append(
+        {
+            "team_1": {"name": "lions", "goals": 2},
+            "team_2": {"name": "bears", "goals": 1},
+        }
+    )
+    assert controller.get_all_matches() == (expected, SUCCESS)
+    assert not journal_path.exists()
+    assert mock_matches_binary.stat().st_size == size + 12
+
+    # A clean is journaled too, and so are the adds after it
+    _, view = binary_database.BinaryDatabaseHandler(mock_matches_binary)._map()
+    inode = mock_matches_binary.stat().st_ino
+    controller.clean_db()
+    controller.add("lions 0, wolves 1")
+    assert journal_path.exists() and mock_matches_binary.stat().st_size == size + 12
+    assert controller.compact() == SUCCESS
+    assert not journal_path.exists()
+    # The records dropped by the fold are in a new file, not cut from the one
+    # still mapped by readers
+    assert mock_matches_binary.stat().st_ino != inode
+    assert len(list(binary_database.RECORD.iter_unpack(view))) == 6
+    assert [match["team_2"]["name"] for match in controller.get_all_matches()[0]] == [
+        "wolves"
+    ]
+
+    # A long journal is folded by the add that grows it
+    monkeypatch.setattr(binary_database, "JOURNAL_COMPACT_BYTES", 500)
+    for id in range(10):
+        controller.add(f"team {id} 1, wolves 0")
+    assert journal_path.stat().st_size <= 500
+    assert len(controller.get_all_matches().match) == 11
+
+    # A match that doesn't fit in a record is refused before it's journaled
+    assert controller.add("lions 70000, bears 0").error == GOALS_ERROR
+    too_many_goals = {
+        "team_1": {"name": "lions", "goals": 70000},
+        "team_2": {"name": "bears", "goals": 0},
+    }
+    handler = database.get_database_handler(mock_matches_binary)
+    assert handler.append_matches([too_many_goals]).error == DB_WRITE_ERROR
+    assert controller.compact() == SUCCESS
+
+
+class Crash(BaseException):
+    """Stops a write like a power cut would."""
+
+
+@pytest.mark.parametrize("crash_point", ["fold", "clear"])
+@pytest.mark.parametrize("seed", range(5))
+def test_journal_crash(monkeypatch, tmp_path, crash_point, seed):
+    rng = random.Random(seed)
+    db_path = tmp_path / "ranking.rkb"
+    database.init_database(db_path)
+    journal_path = database.sidecar_path(db_path, "journal")
+    monkeypatch.setattr(binary_database, "JOURNAL_COMPACT_BYTES", 300)
+    monkeypatch.setattr(binary_database, "DICTIONARY_CAPACITY", 64)
+    fold = binary_database.BinaryDatabaseHandler._fold
+    clear = journal.Journal.clear
+    crashes = sorted(rng.sample(range(5, 60), 3))
+
+    def crashing_fold(handler, *args):
+        before = db_path.read_bytes()
+        folded = fold(handler, *args)
+        if crash_point == "fold" and crashes and len(acknowledged) >= crashes[0]:
+            # Blocks not flushed yet are lost, either version of each remains
+            after = db_path.read_bytes()
+            size = rng.choice([len(before), len(after)])
+            db_path.write_bytes(
+                b"".join(
+                    rng.choice([before, after])[start : start + 64].ljust(
+                        min(64, size - start), b"\0"
+                    )
+                    for start in range(0, size, 64)
+                )
+            )
+            raise Crash()
+        return folded
+
+    def crashing_clear(journal):
+        if crash_point == "clear" and crashes and len(acknowledged) >= crashes[0]:
+            raise Crash()
+        clear(journal)
+
+    monkeypatch.setattr(binary_database.BinaryDatabaseHandler, "_fold", crashing_fold)
+    monkeypatch.setattr(journal.Journal, "clear", crashing_clear)
+
+    acknowledged = []
+    for id in range(80):
+        match = {
+            "team_1": {"name": f"team {id}", "goals": id % 4},
+            "team_2": {"name": f"team {id // 2}", "goals": id % 3},
+        }
+        # A fresh handler, like a new process after the crash
+        handler = database.get_database_handler(db_path)
+        try:
+            if handler.append_matches([match]).error == SUCCESS:
+                acknowledged.append(match)
+        except Crash:
+            crashes.pop(0)
+            # Journaled before the fold, so it was already durable
+            acknowledged.append(match)
+        if id % 7 == 0 and journal_path.exists():
+            # An operation cut by a crash in the middle of its append
+            with journal_path.open("ab") as file:
+                file.write(b'{"add":[{"team_1":')
+
+    assert not crashes
+    handler = database.get_database_handler(db_path)
+    assert handler.read_matches() == (acknowledged, SUCCESS)
+    assert not journal_path.exists()
+
+
+def test_bench_compare():
+    baseline = {"results": {"add@1000": 0.010, "sort@1000": 0.0001, "old": 1.0}}
+    results = {"results": {"add@1000": 0.020, "sort@1000": 0.0005, "new": 1.0}}
+    # Only slowdowns over the threshold and the noise floor are regressions
+    assert bench.compare(results, baseline) == [("add@1000", 0.010, 0.020)]
+    assert bench.compare(results, baseline, threshold=1.5) == []
+
+
+def test_bench_command(tmp_path):
+    output = tmp_path / "bench.json"
+    result = runner.invoke(cli.app, ["bench", "-s", "50", "-r", "1", "-o", output])
+    assert result.exit_code == 0
+    results = bench.load(output)
+    assert {"add@50", "show_table_ranking@50", "_sort_ranking@50"} <= set(
+        results["results"]
+    )
+    assert "startup --version" in results["results"]
+
+    for name in results["results"]:
+        results["results"][name] = 1e-6
+    bench.save(results, output)
+    result = runner.invoke(
+        cli.app, ["bench", "-s", "50", "-r", "1", "--baseline", output]
+    )
+    assert result.exit_code == 1
+    assert "startup --version is" in result.stdout
+
+
+def test_profile_option(mock_cli_database, tmp_path):
+    profile_runner = CliRunner(mix_stderr=False)
+    result = profile_runner.invoke(
+        cli.app, ["--profile-format", "json", "table_rank", "-t", "head_to_head"]
+    )
+    assert result.exit_code == 0
+    assert "Standings" in result.stdout
+    profile = json.loads(result.stderr)
+    assert {
+        "RankingController.show_table_ranking",
+        "DatabaseHandler.read_standings",
+        "DatabaseHandler.iter_matches",
+        "render",
+    } <= set(profile["phases"])
+    matches_read = profile["counters"]["DatabaseHandler.iter_matches items"]
+    assert (
+        matches_read == 5 * profile["phases"]["DatabaseHandler.iter_matches"]["calls"]
+    )
+    assert not profiling.is_enabled()
+
+    stats_path = tmp_path / "all_matches.prof"
+    result = profile_runner.invoke(
+        cli.app, ["--profile", "--profile-stats", stats_path, "all_matches"]
+    )
+    assert result.exit_code == 0
+    assert "lions" in result.stdout
+    assert result.stderr.splitlines()[0].split() == ["Phase", "Calls", "ms"]
+    assert stats_path.stat().st_size > 0
+
+
+def test_partitions(tmp_path):
+    db_path = tmp_path / "ranking.rkb"
+    database.init_database(db_path)
+    assert database.partition_path(db_path) == db_path
+    assert database.partition_path(db_path, "premier", "2026") == (
+        tmp_path / "ranking.leagues" / "premier" / "2026.rkb"
+    )
+    for name in ("../premier", "_", "2025.26", ""):
+        with pytest.raises(ValueError):
+            database.partition_path(db_path, name)
+    assert database.create_partition(db_path, "a/b")[1] == PARTITION_ERROR
+
+    for league, season, match in [
+        (None, None, "lions 1, snakes 0"),
+        ("premier", "2026", "lions 3, tarantulas 0"),
+        ("premier", None, "snakes 2, lions 2"),
+        (None, "2026", "grouches 0, lions 1"),
+    ]:
+        path, error = database.create_partition(db_path, league, season)
+        assert error == SUCCESS
+        assert ranking.RankingController(path).add(match).error == SUCCESS
+
+    partitions = database.list_partitions(db_path)
+    assert [(league, season) for league, season, _ in partitions] == [
+        (None, None),
+        (None, "2026"),
+        ("premier", None),
+        ("premier", "2026"),
+    ]
+    assert [table for _, (table, _) in ranking.rank_partitions(db_path, workers=2)] == [
+        {"lions": 3, "snakes": 0},
+        {"lions": 3, "grouches": 0},
+        {"lions": 1, "snakes": 1},
+        {"lions": 3, "tarantulas": 0},
+    ]
+
+
+def test_partition_commands(mock_cli_database):
+    result = runner.invoke(cli.app, ["add", "-L", "premier", "-S", "2026", "a 2, b 1"])
+    assert result.exit_code == 0
+    result = runner.invoke(cli.app, ["table_rank", "-L", "premier", "-S", "2026"])
+    assert result.exit_code == 0
+    assert "lions" not in result.stdout
+    assert "| a" in result.stdout
+
+    result = runner.invoke(cli.app, ["all_matches", "--league", "liga"])
+    assert result.exit_code == 0
+    assert "There are no matches of league liga yet" in result.stdout
+
+    result = runner.invoke(cli.app, ["tables", "-w", "1"])
+    assert result.exit_code == 0
+    assert "Standings of the main database" in result.stdout
+    assert "Standings of league premier season 2026" in result.stdout
+
+
+@pytest.mark.parametrize("suffix", [".json", ".db", ".rkb"])
+def test_standings_as_of(monkeypatch, tmp_path, suffix):
+    monkeypatch.setattr(history, "CHECKPOINT_INTERVAL", 7)
+    db_path = tmp_path / f"ranking{suffix}"
+    database.init_database(db_path)
+    matches = list(bench.synthetic_matches(50, teams=6))
+    database.get_database_handler(db_path).append_matches(matches)
+    controller = ranking.RankingController(db_path)
+
+    def expected(count):
+        table = calculate_standings(matches[:count])
+        return {
+            team: table[team]["points"] for team in tiebreakers.sort_standings(table)
+        }
+
+    for count in (30, 0, 3, 50, 200, 22):
+        assert controller.show_table_ranking_as_of(count) == (expected(count), SUCCESS)
+    checkpoints = history.Checkpoints(db_path, 7).load()
+    assert [checkpoint["count"] for checkpoint in checkpoints] == [
+        7,
+        14,
+        21,
+        28,
+        35,
+        42,
+        49,
+    ]
+
+    # Adds keep the checkpoints
+    assert controller.add("team 1 3, team 2 0").error == SUCCESS
+    matches.append(Match("team 1", 3, "team 2", 0).to_dict())
+    assert history.Checkpoints(db_path, 7).load() == checkpoints
+    assert controller.show_table_ranking_as_of(51) == (expected(51), SUCCESS)
+
+    # Checkpoints of matches that are gone are not used
+    rewritten = matches[::-1]
+    database.get_database_handler(db_path).write_matches(rewritten)
+    matches = rewritten
+    assert controller.show_table_ranking_as_of(45) == (expected(45), SUCCESS)
+
+    # And so are those of a log edited by hand
+    if suffix == ".json":
+        controller.show_table_ranking_as_of(50)
+        # The first match is won by the other team, or drawn
+        first = matches[0]
+        goals = first["team_1"]["goals"]
+        new_goals = first["team_2"]["goals"] + (goals <= first["team_2"]["goals"])
+        edit_by_hand(db_path, b'"goals":%d' % goals, b'"goals":%d' % new_goals)
+        first["team_1"]["goals"] = new_goals
+        assert controller.show_table_ranking_as_of(45) == (expected(45), SUCCESS)
+
+
+def test_rank_history(mock_matches_json):
+    matches = list(bench.synthetic_matches(300, teams=8))
+    for tie_breakers in [(), ("goal_difference", "goals_scored")]:
+        points = history.rank_history(matches, "team 3", tie_breakers)
+        assert points
+        for point in points:
+            table = calculate_standings(matches[: point.match])
+            ranking_order = tiebreakers.sort_standings(table, tie_breakers)
+            assert point.rank == ranking_order.index("team 3") + 1
+            assert point.points == table["team 3"]["points"]
+
+    controller = ranking.RankingController(mock_matches_json)
+    assert controller.get_rank_history("snakes") == (
+        [(1, 2, 1), (2, 3, 1), (3, 4, 1), (4, 4, 1)],
+        SUCCESS,
+    )
+    controller = ranking.RankingController(mock_matches_json, ["head_to_head"])
+    assert controller.get_rank_history("snakes").error == TIE_BREAKER_ERROR
+
+
+@pytest.mark.parametrize("suffix", [".json", ".db", ".rkb"])
+def test_parallel_standings(monkeypatch, tmp_path, suffix):
+    monkeypatch.setattr(parallel, "MIN_SHARD_MATCHES", 10)
+    monkeypatch.setattr(parallel, "MIN_SHARD_BYTES", 100)
+    db_path = tmp_path / f"ranking{suffix}"
+    database.init_database(db_path)
+    matches = list(bench.synthetic_matches(200, teams=12))
+    database.get_database_handler(db_path).append_matches(matches)
+    controller = ranking.RankingController(db_path)
+    expected = ranking.RankingController(db_path).show_table_ranking()
+
+    database.sidecar_path(db_path, "standings.json").unlink(missing_ok=True)
+    rank, error = controller.show_table_ranking(workers=3)
+    assert (list(rank.items()), error) == (list(expected.table.items()), SUCCESS)
+    assert database.get_database_handler(db_path).read_standings(
+        3
+    ).table == calculate_standings(matches)
+
+    # The snapshot saved by the workers is caught up by the next read
+    controller.add("team 1 2, team 2 0")
+    matches.append(database.get_database_handler(db_path).read_matches()[0][-1])
+    assert database.get_database_handler(
+        db_path
+    ).read_standings().table == calculate_standings(matches)
+
+
+@pytest.mark.parametrize("suffix", [".json", ".db", ".rkb"])
+def test_iter_records(tmp_path, suffix):
+    db_path = tmp_path / f"ranking{suffix}"
+    database.init_database(db_path)
+    matches = list(bench.synthetic_matches(50, teams=6))
+    matches.append(
+        {
+            "team_1": {"name": 'FC "Ñandú"', "goals": 1},
+            "team_2": {"name": "team 0", "goals": 2},
+        }
+    )
+    handler = database.get_database_handler(db_path)
+    handler.append_matches(matches)
+
+    records = list(handler.iter_records())
+    assert records == [Match.from_dict(match) for match in handler.iter_matches()]
+    assert [record.to_dict() for record in records] == matches
+    assert records[-1] == ('FC "Ñandú"', 1, "team 0", 2)
+    # Names are interned, one string per team
+    names = [name for record in records for name in (record.team_1, record.team_2)]
+    assert len({id(name) for name in names if name == "team 0"}) == 1
+
+
+@pytest.mark.parametrize("suffix", [".json", ".db", ".rkb"])
+def test_ratings(tmp_path, suffix):
+    db_path = tmp_path / f"ranking{suffix}"
+    database.init_database(db_path)
+    handler = database.get_database_handler(db_path)
+    matches = list(map(Match.from_dict, bench.synthetic_matches(200, teams=10)))
+    handler.append_matches(match.to_dict() for match in matches)
+    settings = ratings.RatingSettings(k_factor=32, goal_difference=True)
+
+    def expected(matches):
+        table = {}
+        for match in matches:
+            ratings.rate_match(table, match, settings)
+        return table
+
+    assert ratings.replay(matches, settings) == pytest.approx(expected(matches))
+    controller = ranking.RankingController(db_path)
+    table, error = controller.get_ratings(settings)
+    assert (table, error) == (pytest.approx(expected(matches)), SUCCESS)
+    assert list(table.values()) == sorted(table.values(), reverse=True)
+
+    # An add rates its match alone
+    ratings_path = database.sidecar_path(db_path, "ratings.json")
+    assert controller.add("team 1 3, team 2 0").error == SUCCESS
+    matches.append(Match("team 1", 3, "team 2", 0))
+    assert json.loads(ratings_path.read_text())["count"] == len(matches)
+    assert controller.get_ratings(settings).table == pytest.approx(expected(matches))
+
+    # Matches added by someone else are caught up, a rewrite is rated again
+    extra = Match("team 4", 1, "team 5", 1)
+    database.get_database_handler(db_path).append_matches([extra.to_dict()])
+    matches.append(extra)
+    assert controller.get_ratings(settings).table == pytest.approx(expected(matches))
+    matches = matches[::-1]
+    database.get_database_handler(db_path).write_matches(
+        [match.to_dict() for match in matches]
+    )
+    assert controller.get_ratings(settings).table == pytest.approx(expected(matches))
+
+    # And so is a hand edit of any match
+    if suffix == ".json":
+        edit_by_hand(db_path, b'"goals":%d' % matches[0].goals_1, b'"goals":9')
+        matches[0] = matches[0]._replace(goals_1=9)
+        table = controller.get_ratings(settings).table
+        assert table == pytest.approx(expected(matches))
+
+    # Other settings rate all the matches again
+    settings = ratings.RatingSettings()
+    assert controller.get_ratings().table == pytest.approx(expected(matches))
+    assert controller.get_ratings(settings, recalibrate=True).table == pytest.approx(
+        expected(matches)
+    )
+
+    controller.clean_db()
+    assert not ratings_path.exists()
+    assert controller.get_ratings() == ({}, SUCCESS)
+
+
+def test_ratings_command(mock_cli_database, monkeypatch, tmp_path):
+    config_file = tmp_path / "config.ini"
+    config_file.write_text("[Ratings]\nk_factor = 32\nhome_advantage = 0\n")
+    monkeypatch.setattr(cli.config, "CONFIG_FILE_PATH", config_file)
+
+    result = runner.invoke(cli.app, ["ratings", "--format", "jsonl"])
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [line["rank"] for line in lines] == list(range(1, len(lines) + 1))
+    settings = ratings.RatingSettings(k_factor=32, home_advantage=0)
+    expected = ranking.RankingController(mock_cli_database).get_ratings(settings)
+    assert {line["team"]: line["rating"] for line in lines} == pytest.approx(
+        expected.table
+    )
+
+    result = runner.invoke(cli.app, ["ratings", "--k-factor", "10", "--recalibrate"])
+    assert result.exit_code == 0
+    assert "Rank  | Team" in result.stdout
+
+    config_file.write_text("[Ratings]\nk_factor = many\n")
+    assert runner.invoke(cli.app, ["ratings"]).exit_code == 1
+
+
+def test_parse_fixtures():
+    fixtures, errors = simulation.parse_fixtures(
+        [
+            "Lions,  Snakes\n",
+            "\n",
+            " FC  awesome , bears",
+            "lions",
+            "bears, bears",
+            "a, b, c",
+        ]
+    )
+    assert fixtures == [("Lions", "Snakes"), ("FC awesome", "bears")]
+    assert [(error.line_number, error.error) for error in errors] == [
+        (4, MISSING_TEAM_ERROR),
+        (5, SAME_TEAM_ERROR),
+        (6, MISSING_TEAM_ERROR),
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_simulation(monkeypatch, tmp_path, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(engine, "np", None)
+    db_path = tmp_path / "ranking.json"
+    database.init_database(db_path)
+    database.get_database_handler(db_path).append_matches(
+        bench.synthetic_matches(30, teams=8)
+    )
+
+    # Without fixtures left every final table is the table rank now
+    for tie_breakers in [(), ("goal_difference",), ("head_to_head", "goals_scored")]:
+        controller = ranking.RankingController(db_path, tie_breakers)
+        projections, error = controller.simulate([], runs=3, seed=1)
+        assert error == SUCCESS
+        assert [projection.team for projection in projections] == list(
+            controller.show_table_ranking().table
+        )
+        for position, projection in enumerate(projections):
+            assert projection.positions[position] == 1.0
+
+    controller = ranking.RankingController(db_path, ["head_to_head"])
+    fixtures = [("team 1", "team 2"), ("team 3", "newcomers"), ("team 2", "team 4")]
+    projections, error = controller.simulate(fixtures, runs=2000, seed=7)
+    assert error == SUCCESS
+    assert len(projections) == 9
+    for projection in projections:
+        assert sum(projection.positions) == pytest.approx(1.0)
+    for position in range(9):
+        assert sum(
+            projection.positions[position] for projection in projections
+        ) == pytest.approx(1.0)
+    assert controller.simulate(fixtures, runs=2000, seed=7).projections == projections
+    assert controller.simulate(fixtures, runs=2000, seed=8).projections != projections
+
+    # Batches have their own seeds, the workers don't change the results
+    monkeypatch.setattr(simulation, "BATCH_RUNS", 700)
+    assert controller.simulate(fixtures, runs=2000, seed=7, workers=2) == (
+        controller.simulate(fixtures, runs=2000, seed=7)
+    )
+
+    assert controller.simulate(fixtures, model="dice").error == GOAL_MODEL_ERROR
+    controller = ranking.RankingController(db_path, ["coin_toss"])
+    assert controller.simulate(fixtures).error == TIE_BREAKER_ERROR
+
+
+def test_simulation_goal_model():
+    table = calculate_standings(
+        [
+            {
+                "team_1": {"name": "lions", "goals": 4},
+                "team_2": {"name": "snakes", "goals": 0},
+            },
+            {
+                "team_1": {"name": "snakes", "goals": 1},
+                "team_2": {"name": "bears", "goals": 1},
+            },
+        ]
+    )
+    fixtures = [simulation.Fixture("lions", "bears"), simulation.Fixture("a", "b")]
+    (lions, bears), (team_a, team_b) = simulation.goal_rates(table, fixtures)
+    assert lions > bears and team_a == team_b == pytest.approx(1.5)
+    assert simulation.goal_rates(table, fixtures, simulation.AVERAGE_MODEL) == [
+        (1.5, 1.5),
+        (1.5, 1.5),
+    ]
+
+    # The chances of a result of the Poisson scores, added up by hand
+    np = pytest.importorskip("numpy")
+    win, draw = simulation._result_chances(np, np.array([1.6]), np.array([0.7]))
+
+    def chance(goals, rate):
+        return rate**goals * math.exp(-rate) / math.factorial(goals)
+
+    scores = [(goals_1, goals_2) for goals_1 in range(40) for goals_2 in range(40)]
+    assert win[0] == pytest.approx(
+        sum(chance(g1, 1.6) * chance(g2, 0.7) for g1, g2 in scores if g1 > g2)
+    )
+    assert draw[0] == pytest.approx(
+        sum(chance(g1, 1.6) * chance(g2, 0.7) for g1, g2 in scores if g1 == g2)
+    )
+
+
+def test_simulate_command(mock_cli_database, tmp_path):
+    fixtures = tmp_path / "fixtures.txt"
+    fixtures.write_text("lions, snakes\ngrouches, tarantulas\n")
+    args = ["simulate", str(fixtures), "--runs", "500", "--seed", "3"]
+
+    result = runner.invoke(cli.app, [*args, "--format", "jsonl"])
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert lines[0]["team"] == "tarantulas"
+    assert sum(line["title"] for line in lines) == pytest.approx(1.0)
+    assert sum(line["relegation"] for line in lines) == pytest.approx(3.0)
+    assert runner.invoke(cli.app, [*args, "--format", "jsonl"]).stdout == result.stdout
+
+    result = runner.invoke(cli.app, [*args, "--relegation", "1"])
+    assert result.exit_code == 0
+    assert "Title" in result.stdout and "lions" in result.stdout
+
+    fixtures.write_text("lions, lions\n")
+    result = runner.invoke(cli.app, args)
+    assert result.exit_code == 1
+    assert "SAME_TEAM_ERROR" in result.stdout
+
+
+@pytest.mark.parametrize("suffix", [".json", ".db", ".rkb"])
+def test_export(monkeypatch, tmp_path, suffix):
+    db_path = tmp_path / f"ranking{suffix}"
+    database.init_database(db_path)
+    handler = database.get_database_handler(db_path)
+    matches = list(map(Match.from_dict, bench.synthetic_matches(250, teams=10)))
+    handler.append_matches(match.to_dict() for match in matches[:200])
+    controller = ranking.RankingController(db_path)
+    # Several chunks
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 64)
+
+    def read_csv(path):
+        import csv
+
+        with path.open() as file:
+            return list(csv.reader(file))
+
+    output = tmp_path / "matches.csv"
+    assert controller.export_matches(output, "csv") == (200, 200, SUCCESS)
+    rows = read_csv(output)
+    assert rows[0] == list(export.MATCH_COLUMNS)
+    assert rows[1:] == [
+        [str(id), team_1, str(goals_1), team_2, str(goals_2)]
+        for id, (team_1, goals_1, team_2, goals_2) in enumerate(matches[:200], 1)
+    ]
+
+    # Only the matches added since the marker
+    handler.append_matches(match.to_dict() for match in matches[200:])
+    output = tmp_path / "matches.jsonl"
+    assert controller.export_matches(output, "jsonl", 200) == (50, 250, SUCCESS)
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert lines[0] == {"id": 201, **matches[200]._asdict()}
+    assert [line["id"] for line in lines] == list(range(201, 251))
+    assert controller.export_matches(output, "jsonl", 250) == (0, 250, SUCCESS)
+    assert output.read_text() == ""
+
+    output = tmp_path / "standings.csv"
+    table, _ = controller.show_standings()
+    assert controller.export_standings(output, "csv") == (len(table), 0, SUCCESS)
+    rows = read_csv(output)
+    assert rows[0] == list(export.STANDINGS_COLUMNS)
+    assert [row[1] for row in rows[1:]] == list(table)
+    assert rows[1][2:] == [str(table[rows[1][1]][key]) for key in export.STATS]
+
+
+def test_export_errors(monkeypatch, mock_matches_json, tmp_path):
+    controller = ranking.RankingController(mock_matches_json)
+    output = tmp_path / "matches.csv"
+    assert controller.export_matches(output, "xlsx").error == EXPORT_FORMAT_ERROR
+    assert controller.export_matches(tmp_path / "missing" / "matches.csv", "csv") == (
+        0,
+        0,
+        EXPORT_ERROR,
+    )
+    monkeypatch.setattr(export, "pa", None)
+    assert controller.export_matches(output, "parquet").error == (
+        EXPORT_DEPENDENCY_ERROR
+    )
+
+    # A failed export leaves the previous file
+    output.write_text("previous export")
+    mock_matches_json.write_text('[{"team_1": 1}]')
+    assert controller.export_matches(output, "csv").error == JSON_ERROR
+    assert output.read_text() == "previous export"
+    mock_matches_json.unlink()
+    assert controller.export_matches(output, "csv").error == DB_READ_ERROR
+
+
+def test_export_arrow(mock_matches_json, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    controller = ranking.RankingController(mock_matches_json)
+    assert controller.export_matches(tmp_path / "m.arrow", "arrow", 2).error == SUCCESS
+    table = pyarrow.ipc.open_file(tmp_path / "m.arrow").read_all()
+    assert table.column("id").to_pylist() == [3, 4, 5]
+    assert table.column("team_1").to_pylist() == ["lions", "tarantulas", "lions"]
+
+    assert controller.export_standings(tmp_path / "s.parquet", "parquet").error == (
+        SUCCESS
+    )
+    table = pyarrow.parquet.read_table(tmp_path / "s.parquet")
+    assert table.column_names == list(export.STANDINGS_COLUMNS)
+    assert table.column("team").to_pylist()[0] == "tarantulas"
+
+
+def test_export_command(mock_cli_database, tmp_path):
+    output = tmp_path / "matches.jsonl"
+    result = runner.invoke(cli.app, ["export", str(output)])
+    assert result.exit_code == 0
+    assert "5 matches exported, continue with --since 5" in result.stdout
+    assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == [
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+
+    result = runner.invoke(cli.app, ["export", "--since", "3"])
+    assert result.exit_code == 0
+    assert result.stdout.splitlines()[:3] == [
+        ",".join(export.MATCH_COLUMNS),
+        "4,tarantulas,3,snakes,1",
+        "5,lions,4,grouches,0",
+    ]
+
+    result = runner.invoke(cli.app, ["export", "--standings", "-f", "jsonl"])
+    assert result.exit_code == 0
+    assert json.loads(result.stdout.splitlines()[0])["team"] == "tarantulas"
+
+    result = runner.invoke(cli.app, ["export", "--standings", "--since", "3"])
+    assert result.exit_code == 1
+    result = runner.invoke(cli.app, ["export", "-f", "xlsx"])
+    assert result.exit_code == 1
+    assert ERRORS[EXPORT_FORMAT_ERROR] in result.stdout
+
+
+def test_read_cache(monkeypatch, mock_matches_json):
+    controller = ranking.RankingController(mock_matches_json)
+    handler = controller._db_handler
+    reads = []
+    iter_matches = handler.iter_matches
+    monkeypatch.setattr(
+        handler, "iter_matches", lambda: reads.append(1) or iter_matches()
+    )
+
+    matches, _ = controller.get_all_matches()
+    matches.append("not a match")
+    assert controller.get_all_matches() == (matches[:-1], SUCCESS)
+    assert len(reads) == 1
+
+    table, _ = handler.read_standings()
+    table["lions"]["points"] = 100
+    assert controller.show_table_ranking().table["lions"] == 5
+
+    # Own writes and writes of another process invalidate the cache
+    reads.clear()
+    controller.add("lions 1, snakes 0")
+    assert len(controller.get_all_matches().match) == 6
+    ranking.RankingController(mock_matches_json).add("lions 1, snakes 0")
+    assert len(controller.get_all_matches().match) == 7
+    assert controller.show_table_ranking().table["lions"] == 11
+    assert len(reads) == 2
+
+    uncached = ranking.RankingController(mock_matches_json, cache_size=0)
+    uncached.get_all_matches()
+    assert (
+        uncached._db_handler._cache.get(
+            "matches", read_cache.file_signature(mock_matches_json)
+        )
+        is None
+    )
+
+
+def test_read_cache_size():
+    cache = read_cache.ReadCache(max_size=100)
+    cache.put("matches", (1, 1, 1), ["a"], 60)
+    cache.put("standings", (1, 1, 1), {}, 60)
+    assert cache.get("matches", (1, 1, 1)) is None
+    assert cache.get("standings", (1, 1, 1)) == {}
+    assert cache.get("standings", (2, 1, 1)) is None
+    cache.put("matches", (1, 1, 1), ["a"] * 1000, 1000)
+    assert cache.get("matches", (1, 1, 1)) is None
+
+
+def test_parallel_split():
+    assert parallel.split(0, 10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert parallel.split(0, 10, 3, min_size=4) == [(0, 5), (5, 10)]
+    assert parallel.split(7, 7, 4) == [(7, 7)]